@@ -1,168 +1,139 @@
-from flask import Flask, render_template, request, flash, redirect, url_for, jsonify, current_app
-import logging
-from datetime import datetime
-from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from models.models import db, User, TennisCourt, Booking, Match
+import time
+from datetime import timedelta
+from typing import Any, Mapping, Optional, Union
+import click
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+from flask_login import LoginManager
+from models.models import db
 from config import Config
-import os
+from utils.db_engine import configure_engines, install_sqlite_pragmas
 
-# Initialize Flask app
-app = Flask(__name__)
-app.config.from_object(Config)
+# Flask-Login, bound to each app by create_app
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
 
-# Initialize database
-db.init_app(app)
+def create_app(config: Optional[Union[object, Mapping[str, Any]]] = None) -> Flask:
+    """
+    Build a configured application.
 
-# Initialize Flask-Login
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
-
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
-# Create database tables
-with app.app_context():
-    db.create_all()
-
-# Routes
-# Add current datetime to all templates
-@app.context_processor
-def inject_now():
-    return {'now': datetime.now()}
-
-@app.route('/')
-def index():
-    """Homepage showing nearby tennis courts"""
-    return render_template('index.html')
-
-@app.route('/courts')
-def courts():
-    """API endpoint to get nearby tennis courts"""
+    Nothing here touches the database: the engine connects on the first query and
+    services build their indexes and caches on first use. Tables are created by the
+    `flask init-db` command (or init_db.py), not at startup.
+
+    Args:
+        config: Config object or mapping of settings, applied over the defaults in Config
+
+    Returns:
+        Flask: Application with routes, extensions and CLI commands registered
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if isinstance(config, Mapping):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    # Initialize database: pool settings, the optional read replica and SQLite pragmas
+    configure_engines(app.config)
+    db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(db.engines.values(), app.config)
+
+    # Request latency, SQL and cache metrics
+    if app.config['METRICS_ENABLED']:
+        from utils.metrics import instrument_app
+        instrument_app(app)
+
+    # Initialize Flask-Login; users are served from the snapshot cache and the
+    # database is only hit on a miss
+    from services.user_cache import get_user_cache
+    login_manager.init_app(app)
+    login_manager.user_loader(lambda user_id: get_user_cache().load(int(user_id)))
+
+    # Routes pull in the services, which register their commit hooks on import
+    from routes import bp
+    app.register_blueprint(bp)
+
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(jobs_worker_command)
+    app.cli.add_command(rebuild_utilization_command)
+    app.cli.add_command(archive_reservations_command)
+    app.cli.add_command(set_admin_command)
+    return app
+
+@click.command('init-db')
+@with_appcontext
+@click.option('--sample-courts/--no-sample-courts', default=True,
+              help='Add the sample courts when the court table is empty')
+def init_db_command(sample_courts):
+    """Create missing database tables."""
+    from init_db import init_db
+    init_db(sample_courts)
+
+@click.command('jobs-worker')
+@with_appcontext
+@click.option('--threads', type=int, help='Worker threads (default: JOB_WORKER_THREADS, at least 1)')
+@click.option('--once', is_flag=True, help='Run the jobs that are due and exit')
+def jobs_worker_command(threads, once):
+    """Run queued background jobs."""
+    from services.jobs import get_job_worker
+    worker = get_job_worker(threads or max(1, current_app.config['JOB_WORKER_THREADS']))
+    if once:
+        click.echo(f"Ran {worker.run_pending()} jobs")
+        return
+    worker.start()
     try:
-        # Get query parameters (for future implementation of location-based filtering)
-        lat = request.args.get('lat', type=float)
-        lng = request.args.get('lng', type=float)
-        
-        # For now, return all courts
-        courts = TennisCourt.query.all()
-        
-        if not courts:
-            current_app.logger.warning("No tennis courts found in database")
-            return jsonify([])
-        
-        # Convert courts to JSON format
-        courts_data = []
-        for court in courts:
-            try:
-                court_data = {
-                    'id': court.id,
-                    'name': court.name,
-                    'address': court.address,
-                    'latitude': float(court.latitude),
-                    'longitude': float(court.longitude),
-                    'price_per_hour': float(court.price_per_hour)
-                }
-                courts_data.append(court_data)
-            except (ValueError, AttributeError) as e:
-                current_app.logger.error(f"Error processing court {court.id}: {str(e)}")
-                continue
-        
-        return jsonify(courts_data)
-    except Exception as e:
-        current_app.logger.error(f"Error fetching courts: {str(e)}")
-        return jsonify({'error': 'Failed to fetch tennis courts'}), 500
-
-@app.route('/book/<int:court_id>', methods=['GET', 'POST'])
-@login_required
-def book_court(court_id):
-    """Book a tennis court"""
-    court = TennisCourt.query.get_or_404(court_id)
-    
-    if request.method == 'POST':
-        try:
-            booking = Booking(
-                user_id=current_user.id,
-                tennis_court_id=court_id,
-                booking_time=request.form['booking_time'],
-                duration=int(request.form['duration']),
-                status='confirmed'
-            )
-            db.session.add(booking)
-            db.session.commit()
-            flash('Court booked successfully!', 'success')
-            return redirect(url_for('index'))
-        except Exception as e:
-            flash('Error booking court. Please try again.', 'error')
-            
-    return render_template('booking.html', court=court)
-
-@app.route('/setup-match', methods=['GET', 'POST'])
-@login_required
-def setup_match():
-    """Set up a match with another player"""
-    if request.method == 'POST':
-        try:
-            opponent = User.query.filter_by(email=request.form['opponent_email']).first()
-            if not opponent:
-                flash('Opponent not found.', 'error')
-                return redirect(url_for('setup_match'))
-                
-            match = Match(
-                court_id=request.form['court_id'],
-                player1_id=current_user.id,
-                player2_id=opponent.id,
-                match_time=request.form['match_time'],
-                duration=int(request.form['duration'])
-            )
-            db.session.add(match)
-            db.session.commit()
-            flash('Match setup successfully!', 'success')
-            return redirect(url_for('index'))
-        except Exception as e:
-            flash('Error setting up match. Please try again.', 'error')
-            
-    courts = TennisCourt.query.all()
-    return render_template('match_setup.html', courts=courts)
-
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    """User login"""
-    if request.method == 'POST':
-        user = User.query.filter_by(email=request.form['email']).first()
-        if user and user.check_password(request.form['password']):
-            login_user(user)
-            flash('Logged in successfully.', 'success')
-            return redirect(url_for('index'))
-        flash('Invalid email or password.', 'error')
-    return render_template('login.html')
-
-@app.route('/register', methods=['GET', 'POST'])
-def register():
-    """User registration"""
-    if request.method == 'POST':
-        try:
-            user = User(
-                username=request.form['username'],
-                email=request.form['email']
-            )
-            user.set_password(request.form['password'])
-            db.session.add(user)
-            db.session.commit()
-            flash('Registration successful! Please login.', 'success')
-            return redirect(url_for('login'))
-        except Exception as e:
-            flash('Error during registration. Please try again.', 'error')
-    return render_template('register.html')
-
-@app.route('/logout')
-@login_required
-def logout():
-    """User logout"""
-    logout_user()
-    flash('Logged out successfully.', 'success')
-    return redirect(url_for('index'))
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        worker.stop()
+
+@click.command('rebuild-utilization')
+@with_appcontext
+@click.option('--batch-size', type=int, default=50000, help='Reservations read per batch')
+def rebuild_utilization_command(batch_size):
+    """Recompute the court utilization rollups from all reservations."""
+    from services.utilization import rebuild_utilization
+    click.echo(f"Counted {rebuild_utilization(batch_size)} reservations")
+
+@click.command('archive-reservations')
+@with_appcontext
+@click.option('--days', type=int, help='Archive reservations that ended this many days ago '
+                                       '(default: ARCHIVE_AFTER_DAYS)')
+@click.option('--batch-size', type=int, help='Reservations moved per transaction (default: ARCHIVE_BATCH_SIZE)')
+@click.option('--max-batches', type=int, help='Stop after this many batches per table')
+def archive_reservations_command(days, batch_size, max_batches):
+    """Move finished reservations into the archive tables."""
+    from services.archive import archive_reservations
+    moved = archive_reservations(timedelta(days=days or current_app.config['ARCHIVE_AFTER_DAYS']),
+                                 batch_size or current_app.config['ARCHIVE_BATCH_SIZE'], max_batches)
+    click.echo(f"Archived {moved['booking']} bookings and {moved['match']} matches")
+
+@click.command('set-admin')
+@with_appcontext
+@click.argument('email')
+@click.option('--revoke', is_flag=True, help='Remove admin access instead of granting it')
+def set_admin_command(email, revoke):
+    """Grant or revoke admin access (e.g. to the reports) for a user."""
+    from models.models import User
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        raise click.ClickException(f"No user with email {email}")
+    user.is_admin = not revoke
+    db.session.commit()
+    click.echo(f"{'Revoked' if revoke else 'Granted'} admin access for {email}")
+
+_app: Optional[Flask] = None
+
+def __getattr__(name):
+    # `app:app` (gunicorn) and older scripts still get a default app, built on first access
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8081, debug=Config.DEBUG)
+    create_app().run(host='0.0.0.0', port=8081, debug=Config.DEBUG)
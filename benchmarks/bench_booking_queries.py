@@ -0,0 +1,158 @@
+"""
+Regression benchmark for the reservation overlap and "my upcoming reservations" queries.
+
+Fills a scratch SQLite database with a large reservation history, checks that both
+queries are answered from the composite indexes (EXPLAIN QUERY PLAN must not show a
+table scan of booking or match) and times them. Prints the plans and latencies as
+JSON and exits with status 1 if a plan regresses or p99 exceeds --max-p99-ms.
+
+Usage:
+    python benchmarks/bench_booking_queries.py [--bookings 1000000] [--courts 500] [--users 20000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench-booking-queries-'), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE}'
+
+from sqlalchemy import insert, select  # noqa: E402
+from app import create_app  # noqa: E402
+from models.models import db, Booking, Match, TennisCourt, User  # noqa: E402
+from services.court_calendar import RESERVATION_LOOKBACK  # noqa: E402
+from services.reservations import overlapping_reservations, upcoming_reservations  # noqa: E402
+
+app = create_app()
+
+EPOCH = datetime(2030, 1, 1, 6)
+BATCH = 50000
+
+def _fill(bookings: int, courts: int, users: int, rng: random.Random):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(User), [
+            {'username': f'user{number}', 'email': f'user{number}@example.com'} for number in range(users)
+        ])
+        db.session.execute(insert(TennisCourt), [
+            {'name': f'Court {number}', 'address': f'{number} Bench Road', 'latitude': 0.0,
+             'longitude': 0.0, 'price_per_hour': 10.0} for number in range(courts)
+        ])
+        db.session.commit()
+
+        # Back-to-back reservations per court, one in four of them a match
+        per_court = bookings // courts
+        booking_rows, match_rows = [], []
+        for court_id in range(1, courts + 1):
+            start = EPOCH
+            for _ in range(per_court):
+                duration = rng.choice((30, 60, 90, 120))
+                end = start + timedelta(minutes=duration)
+                if rng.random() < 0.25:
+                    match_rows.append({'court_id': court_id, 'player1_id': rng.randint(1, users),
+                                       'player2_id': rng.randint(1, users), 'match_time': start,
+                                       'duration': duration, 'end_time': end, 'status': 'scheduled'})
+                else:
+                    booking_rows.append({'user_id': rng.randint(1, users), 'tennis_court_id': court_id,
+                                         'booking_time': start, 'duration': duration, 'end_time': end,
+                                         'status': 'confirmed'})
+                start = end + timedelta(minutes=rng.choice((0, 15, 30, 60)))
+            if len(booking_rows) >= BATCH:
+                db.session.execute(insert(Booking), booking_rows)
+                booking_rows = []
+            if len(match_rows) >= BATCH:
+                db.session.execute(insert(Match), match_rows)
+                match_rows = []
+        if booking_rows:
+            db.session.execute(insert(Booking), booking_rows)
+        if match_rows:
+            db.session.execute(insert(Match), match_rows)
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+        return per_court
+
+def _plan(statement) -> list:
+    compiled = statement.compile(dialect=db.engine.dialect)
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', parameters)
+        return [row[-1] for row in rows]
+
+def _scans_table(plan: list) -> bool:
+    return any(step.startswith('SCAN') and 'INDEX' not in step for step in plan)
+
+def _timed(function, arguments) -> dict:
+    latencies = []
+    for args in arguments:
+        started = time.perf_counter()
+        function(*args)
+        latencies.append(time.perf_counter() - started)
+        db.session.expunge_all()
+    latencies.sort()
+    return {
+        'queries': len(latencies),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=1000000, help='Reservations to generate')
+    parser.add_argument('--courts', type=int, default=500)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=500, help='Timed queries per kind')
+    parser.add_argument('--max-p99-ms', type=float, default=25.0)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    started = time.perf_counter()
+    per_court = _fill(args.bookings, args.courts, args.users, rng)
+    fill_seconds = time.perf_counter() - started
+    span = timedelta(hours=per_court * 1.5)
+
+    with app.app_context():
+        start, end = EPOCH + span / 2, EPOCH + span / 2 + timedelta(hours=1)
+        plans = {
+            'overlap_bookings': _plan(select(Booking).where(
+                Booking.tennis_court_id == 1, Booking.booking_time > start - RESERVATION_LOOKBACK,
+                Booking.booking_time < end, Booking.end_time > start, Booking.status != 'cancelled')),
+            'overlap_matches': _plan(select(Match).where(
+                Match.court_id == 1, Match.match_time > start - RESERVATION_LOOKBACK,
+                Match.match_time < end, Match.end_time > start, Match.status != 'cancelled')),
+            'upcoming_bookings': _plan(select(Booking).where(
+                Booking.user_id == 1, Booking.booking_time >= start).order_by(Booking.booking_time).limit(20)),
+            'upcoming_matches': _plan(select(Match).where(
+                Match.player2_id == 1, Match.match_time >= start).order_by(Match.match_time).limit(20)),
+        }
+
+        def random_window():
+            at = EPOCH + timedelta(minutes=15 * rng.randrange(int(span.total_seconds() // 900)))
+            return rng.randint(1, args.courts), at, at + timedelta(minutes=rng.choice((30, 60, 90)))
+
+        timings = {
+            'overlap': _timed(overlapping_reservations, [random_window() for _ in range(args.queries)]),
+            'upcoming': _timed(upcoming_reservations,
+                               [(rng.randint(1, args.users), EPOCH + span * rng.random(), 20)
+                                for _ in range(args.queries)]),
+        }
+
+    regressions = [name for name, plan in plans.items() if _scans_table(plan)]
+    regressions += [f'{name} p99' for name, timing in timings.items() if timing['p99_ms'] > args.max_p99_ms]
+    print(json.dumps({
+        'reservations': per_court * args.courts,
+        'fill_seconds': round(fill_seconds, 1),
+        'plans': plans,
+        'timings': timings,
+        'regressions': regressions
+    }, indent=2))
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Benchmark the memory-mapped court catalog snapshot against loading TennisCourt objects.
+
+Seeds --courts courts into a scratch SQLite database and compares, for a worker
+process, the Python heap retained by the catalog (tracemalloc; mapped pages of the
+snapshot file are shared page cache and not counted) and the time to look up
+--lookups courts by id and to list one page of --page courts:
+
+- orm: every TennisCourt loaded into the session, as the read paths did before
+- snapshot: get_catalog_snapshot(), attached from the file written on first use
+
+Usage:
+    python benchmarks/bench_catalog_snapshot.py [--courts 100000] [--lookups 10000] [--page 500]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+SCRATCH = tempfile.mkdtemp(prefix='bench-catalog-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(SCRATCH, 'bench.db')}"
+os.environ['CATALOG_SNAPSHOT_DIR'] = os.path.join(SCRATCH, 'snapshots')
+
+from app import create_app  # noqa: E402
+from models.models import db, TennisCourt  # noqa: E402
+from services.catalog_cache import bump_catalog_version  # noqa: E402
+from services.catalog_snapshot import get_catalog_snapshot, reset_catalog_snapshot  # noqa: E402
+
+def seed(count: int):
+    rows = [{'name': f'Court {number}', 'address': f'{number} Bench Road, Springfield',
+             'latitude': 40 + random.random(), 'longitude': -74 + random.random(),
+             'price_per_hour': 20.0 + number % 30} for number in range(count)]
+    with db.engine.begin() as connection:
+        connection.execute(TennisCourt.__table__.insert(), rows)
+        bump_catalog_version(connection)
+
+def measure(load, lookup, page, args) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    catalog = load()
+    load_seconds = time.perf_counter() - started
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    ids = [random.randint(1, args.courts) for _ in range(args.lookups)]
+    started = time.perf_counter()
+    for court_id in ids:
+        lookup(catalog, court_id)
+    lookup_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    page(catalog)
+    page_seconds = time.perf_counter() - started
+    return {
+        'load_ms': round(load_seconds * 1000, 1),
+        'retained_mb': round(retained / 2 ** 20, 2),
+        'lookup_us': round(lookup_seconds / args.lookups * 1e6, 2),
+        'page_ms': round(page_seconds * 1000, 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--courts', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--page', type=int, default=500)
+    args = parser.parse_args()
+
+    app = create_app({'METRICS_ENABLED': False})
+    report = {'courts': args.courts}
+    with app.app_context():
+        db.create_all()
+        seed(args.courts)
+
+        report['orm'] = measure(
+            lambda: {court.id: court for court in TennisCourt.query.all()},
+            lambda courts, court_id: courts[court_id].name,
+            lambda courts: [courts[court_id].name for court_id in sorted(courts)[:args.page]],
+            args
+        )
+        db.session.remove()
+
+        # The first worker to see a catalog version writes its file; later ones only map it
+        started = time.perf_counter()
+        get_catalog_snapshot()
+        report['snapshot_write_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        reset_catalog_snapshot()
+        report['snapshot'] = measure(
+            get_catalog_snapshot,
+            lambda snapshot, court_id: snapshot.get(court_id)['name'],
+            lambda snapshot: snapshot.select(limit=args.page),
+            args
+        )
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
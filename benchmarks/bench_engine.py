@@ -0,0 +1,156 @@
+"""
+Compare database engine setups under a mixed read/write load.
+
+Builds one synthetic SQLite database, then for every scenario starts a fresh process
+on its own copy of it: reader clients load the court list of /setup-match while writer
+clients book courts through /book/<id>, all for --seconds. Scenarios:
+
+    rollback  SQLite defaults (rollback journal, synchronous=FULL), no replica
+    wal       WAL journal, synchronous=NORMAL and a busy timeout
+    replica   As wal, with the court list read from a replica copy of the database
+
+Prints reads and writes per second, p95 latency and error counts per scenario as JSON.
+
+Usage:
+    python benchmarks/bench_engine.py [--courts 2000] [--readers 8] [--writers 4] [--seconds 10]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = {
+    'rollback': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_BUSY_TIMEOUT_MS': ''},
+    'wal': {},
+    'replica': {}
+}
+PASSWORD = 'bench-password'
+HASH_METHOD = 'pbkdf2:sha256:1000'
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--courts', type=int, default=2000)
+    parser.add_argument('--readers', type=int, default=8, help='Concurrent reading clients')
+    parser.add_argument('--writers', type=int, default=4, help='Concurrent booking clients')
+    parser.add_argument('--seconds', type=float, default=10.0, help='Duration of each scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--run-scenario', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def _generate(path, args):
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+    from app import create_app
+    from models.models import db, TennisCourt, User
+
+    rng = random.Random(args.seed)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SQLITE_JOURNAL_MODE': 'DELETE'})
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(TennisCourt), [
+            {'name': f'Court {number}', 'address': f'{number} Bench Road',
+             'latitude': 40.7 + rng.uniform(-0.5, 0.5), 'longitude': -74.0 + rng.uniform(-0.5, 0.5),
+             'price_per_hour': 20.0} for number in range(args.courts)
+        ])
+        password_hash = generate_password_hash(PASSWORD, HASH_METHOD)
+        db.session.execute(insert(User), [
+            {'username': f'user{number}', 'email': f'user{number}@example.com', 'password_hash': password_hash}
+            for number in range(args.readers + args.writers)
+        ])
+        db.session.commit()
+        db.engine.dispose()
+
+def _run_scenario(args):
+    from app import create_app
+
+    scenario = args.run_scenario
+    config = {'PASSWORD_HASH_METHOD': HASH_METHOD, 'PASSWORD_HASH_WORKERS': 0, 'METRICS_ENABLED': False,
+              **SCENARIOS[scenario]}
+    app = create_app(config)
+    deadline = time.perf_counter() + args.seconds
+    samples = []
+    lock = threading.Lock()
+
+    def client_loop(number, kind):
+        rng = random.Random(args.seed * 1000 + number)
+        client = app.test_client()
+        client.post('/login', data={'email': f'user{number}@example.com', 'password': PASSWORD})
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if kind == 'read':
+                response = client.get('/setup-match')
+            else:
+                day = date.today() + timedelta(days=rng.randint(1, 60))
+                start = datetime.combine(day, datetime.min.time()) + timedelta(minutes=15 * rng.randrange(24, 80))
+                response = client.post(f'/book/{rng.randint(1, args.courts)}', data={
+                    'booking_time': start.strftime('%Y-%m-%d %H:%M'), 'duration': 60
+                })
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples.append((kind, elapsed, response.status_code))
+
+    threads = [threading.Thread(target=client_loop, args=(number, 'read')) for number in range(args.readers)]
+    threads += [threading.Thread(target=client_loop, args=(args.readers + number, 'write'))
+                for number in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = {}
+    for kind in ('read', 'write'):
+        latencies = sorted(elapsed for sample_kind, elapsed, _ in samples if sample_kind == kind)
+        statuses = Counter(str(status) for sample_kind, _, status in samples if sample_kind == kind)
+        result[kind] = {
+            'per_second': round(len(latencies) / args.seconds, 1),
+            'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+            'status_codes': dict(statuses)
+        }
+    print(json.dumps(result))
+
+def main():
+    args = _parse_args()
+    if args.run_scenario:
+        _run_scenario(args)
+        return 0
+
+    scratch = tempfile.mkdtemp(prefix='bench-engine-')
+    base = os.path.join(scratch, 'base.db')
+    _generate(base, args)
+
+    report = {'courts': args.courts, 'readers': args.readers, 'writers': args.writers,
+              'seconds': args.seconds, 'scenarios': {}}
+    for scenario in [name.strip() for name in args.scenarios.split(',') if name.strip()]:
+        primary = os.path.join(scratch, f'{scenario}.db')
+        shutil.copyfile(base, primary)
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{primary}', FLASK_DEBUG='false')
+        env.pop('DATABASE_REPLICA_URL', None)
+        if scenario == 'replica':
+            replica = os.path.join(scratch, f'{scenario}-replica.db')
+            shutil.copyfile(base, replica)
+            env['DATABASE_REPLICA_URL'] = f'sqlite:///{replica}'
+        command = [sys.executable, os.path.abspath(__file__), '--run-scenario', scenario,
+                   '--courts', str(args.courts), '--readers', str(args.readers),
+                   '--writers', str(args.writers), '--seconds', str(args.seconds), '--seed', str(args.seed)]
+        result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(result.stderr, file=sys.stderr)
+            return 1
+        report['scenarios'][scenario] = json.loads(result.stdout.strip().splitlines()[-1])
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
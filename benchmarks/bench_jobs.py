@@ -0,0 +1,138 @@
+"""
+Benchmark the background job queue and its effect on POST /book latency.
+
+Queue: enqueues --jobs no-op jobs into a scratch SQLite job table, then drains them
+with --threads worker threads claiming --batch-size jobs at a time, and reports
+enqueue and drain throughput and enqueue-to-completion latency (which includes the
+time jobs waited while the backlog was being written).
+
+Booking: sends --bookings POST /book requests while worker threads deliver the
+confirmations, with notification delivery slowed down by --delivery-ms to stand in
+for a mail server. The /book percentiles should stay flat however slow delivery is.
+
+Usage:
+    python benchmarks/bench_jobs.py [--jobs 5000] [--threads 2] [--batch-size 50]
+        [--bookings 300] [--delivery-ms 200]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench-jobs-'), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE}'
+
+from app import create_app  # noqa: E402
+from models.models import db, TennisCourt, User  # noqa: E402
+import services.notifications as notifications  # noqa: E402
+from services.jobs import DatabaseJobQueue, JobWorker, job  # noqa: E402
+
+finished = {}
+
+@job('bench_noop', batch=True)
+def _noop(payloads):
+    now = time.perf_counter()
+    for payload in payloads:
+        finished[payload['n']] = now
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))] * 1000, 2) if values else None
+
+def bench_queue(app, args) -> dict:
+    queue = DatabaseJobQueue()
+    enqueued = {}
+    with app.app_context():
+        started = time.perf_counter()
+        for number in range(args.jobs):
+            enqueued[number] = time.perf_counter()
+            queue.enqueue('bench_noop', {'n': number})
+        enqueue_seconds = time.perf_counter() - started
+
+    worker = JobWorker(app, queue, args.threads, args.batch_size, poll_interval=0.05)
+    started = time.perf_counter()
+    worker.start()
+    while len(finished) < args.jobs and time.perf_counter() - started < 300:
+        time.sleep(0.05)
+    drain_seconds = time.perf_counter() - started
+    worker.stop()
+    latencies = [finished[number] - enqueued[number] for number in finished]
+    return {
+        'jobs': args.jobs,
+        'enqueue_per_second': round(args.jobs / enqueue_seconds, 1),
+        'drain_per_second': round(len(finished) / drain_seconds, 1),
+        'latency_p50_ms': _percentile(latencies, 0.50),
+        'latency_p99_ms': _percentile(latencies, 0.99)
+    }
+
+def bench_booking(app, args) -> dict:
+    delivered = []
+    deliver = notifications.deliver
+
+    def slow_deliver(email, subject, body):
+        time.sleep(args.delivery_ms / 1000)
+        delivered.append(time.perf_counter())
+        deliver(email, subject, body)
+
+    notifications.deliver = slow_deliver
+    client = app.test_client()
+    client.post('/login', data={'email': 'bench@example.com', 'password': 'bench-password'})
+    latencies = []
+    first_day = date.today() + timedelta(days=1)
+    for number in range(args.bookings):
+        start = datetime.combine(first_day + timedelta(days=number // 10), datetime.min.time()) + \
+            timedelta(hours=8 + number % 10)
+        started = time.perf_counter()
+        response = client.post(f'/book/{1 + number % args.courts}', data={
+            'booking_time': start.strftime('%Y-%m-%d %H:%M'), 'duration': 60
+        })
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 302:
+            raise SystemExit(f'Booking {number} failed with status {response.status_code}')
+    sent = time.perf_counter()
+    while len(delivered) < args.bookings and time.perf_counter() - sent < 600:
+        time.sleep(0.05)
+    notifications.deliver = deliver
+    return {
+        'bookings': args.bookings,
+        'delivery_ms': args.delivery_ms,
+        'book_p50_ms': _percentile(latencies, 0.50),
+        'book_p99_ms': _percentile(latencies, 0.99),
+        'confirmations_delivered': len(delivered),
+        'confirmations_drained_seconds_after_last_booking': round(time.perf_counter() - sent, 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--bookings', type=int, default=300)
+    parser.add_argument('--courts', type=int, default=10)
+    parser.add_argument('--delivery-ms', type=float, default=200.0)
+    args = parser.parse_args()
+
+    app = create_app({'PASSWORD_HASH_WORKERS': 0, 'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+                      'JOB_WORKER_THREADS': args.threads, 'JOB_BATCH_SIZE': args.batch_size,
+                      'JOB_POLL_SECONDS': 0.05, 'METRICS_ENABLED': False})
+    with app.app_context():
+        db.create_all()
+        for number in range(args.courts):
+            db.session.add(TennisCourt(name=f'Court {number}', address=f'{number} Bench Road',
+                                       latitude=40.7, longitude=-74.0, price_per_hour=20.0))
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench-password')
+        db.session.add(user)
+        db.session.commit()
+
+    report = {'queue': bench_queue(app, args), 'booking': bench_booking(app, args)}
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Measure login throughput and the latency of unrelated requests during a login storm.
+
+Runs the app against a scratch SQLite database through the Flask test client, once
+with password hashing inline on the request threads and once on the process pool,
+and prints the results as JSON.
+
+Usage:
+    python benchmarks/bench_login.py [--logins 64] [--threads 16]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench-login-'), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE}'
+
+from app import create_app  # noqa: E402
+from models.models import db, User  # noqa: E402
+import services.passwords as passwords  # noqa: E402
+
+app = create_app()
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+def run(workers: int, logins: int, threads: int) -> dict:
+    passwords._hasher = passwords.PasswordHasher(app.config['PASSWORD_HASH_METHOD'], workers,
+                                                 max_pending=logins, queue_timeout=60)
+    with app.app_context():
+        if not User.query.filter_by(email='bench@example.com').first():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('secret')
+            db.session.add(user)
+            db.session.commit()
+
+    done = threading.Event()
+    latencies = []
+
+    def unrelated():
+        client = app.test_client()
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get('/login')
+            latencies.append(time.perf_counter() - started)
+
+    def login(count):
+        client = app.test_client()
+        for _ in range(count):
+            client.post('/login', data={'email': 'bench@example.com', 'password': 'secret'})
+            client.get('/logout')
+
+    prober = threading.Thread(target=unrelated)
+    prober.start()
+    started = time.perf_counter()
+    pool = [threading.Thread(target=login, args=(logins // threads,)) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+    passwords._hasher.shutdown()
+
+    return {
+        'workers': workers,
+        'logins': logins // threads * threads,
+        'logins_per_second': round(logins // threads * threads / elapsed, 2),
+        'unrelated_requests': len(latencies),
+        'unrelated_p50_ms': round(_percentile(latencies, 0.5) * 1000, 2),
+        'unrelated_p99_ms': round(_percentile(latencies, 0.99) * 1000, 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+    results = [run(0, args.logins, args.threads), run(args.workers, args.logins, args.threads)]
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark opponent suggestions over a densely populated region.
+
+Fills a scratch SQLite database with players whose homes are spread over a
+metropolitan area, each with a few weekly availability windows, plus courts in
+the same area. Then times find_opponents() for random players. Prints the index
+build time and query latency percentiles as JSON.
+
+Usage:
+    python benchmarks/bench_matchmaking.py [--players 100000] [--courts 500] [--queries 200]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench-matchmaking-'), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE}'
+
+from sqlalchemy import insert  # noqa: E402
+from app import create_app  # noqa: E402
+from models.models import db, PlayerAvailability, TennisCourt, User  # noqa: E402
+from services.matchmaking import find_opponents, get_player_index, reset_player_index  # noqa: E402
+
+app = create_app()
+
+CENTER = (40.7128, -74.0060)
+# Roughly 50 km across
+SPREAD_DEGREES = 0.25
+
+def _fill(players: int, courts: int, rng: random.Random):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(TennisCourt), [
+            {'name': f'Court {number}', 'address': f'{number} Bench Road',
+             'latitude': CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+             'longitude': CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+             'price_per_hour': 20.0} for number in range(courts)
+        ])
+        for first in range(0, players, 20000):
+            db.session.execute(insert(User), [
+                {'username': f'player{number}', 'email': f'player{number}@example.com',
+                 'home_latitude': CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+                 'home_longitude': CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES)}
+                for number in range(first, min(players, first + 20000))
+            ])
+        windows = []
+        for user_id in range(1, players + 1):
+            for weekday in rng.sample(range(7), rng.randint(1, 3)):
+                start = rng.randrange(6 * 60, 20 * 60, 30)
+                windows.append({'user_id': user_id, 'weekday': weekday, 'start_minute': start,
+                                'end_minute': min(start + rng.choice((60, 120, 180)), 24 * 60)})
+        for first in range(0, len(windows), 50000):
+            db.session.execute(insert(PlayerAvailability), windows[first:first + 50000])
+        db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=100000)
+    parser.add_argument('--courts', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--radius', type=float, default=15.0)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    started = time.perf_counter()
+    _fill(args.players, args.courts, rng)
+    fill_seconds = time.perf_counter() - started
+
+    with app.app_context():
+        reset_player_index()
+        started = time.perf_counter()
+        index = get_player_index()
+        build_seconds = time.perf_counter() - started
+
+        start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=1)
+        latencies = []
+        suggestions = 0
+        for _ in range(args.queries):
+            user_id = rng.randint(1, args.players)
+            began = time.perf_counter()
+            found = find_opponents(user_id, start, start + timedelta(days=7), 60, args.radius, 10)
+            latencies.append(time.perf_counter() - began)
+            suggestions += len(found)
+            db.session.expunge_all()
+
+    latencies.sort()
+
+    def percentile(fraction):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 2)
+
+    print(json.dumps({
+        'players': len(index),
+        'courts': args.courts,
+        'radius_km': args.radius,
+        'fill_seconds': round(fill_seconds, 1),
+        'index_build_seconds': round(build_seconds, 2),
+        'queries': len(latencies),
+        'mean_suggestions': round(suggestions / len(latencies), 1),
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Stress the reservation path with many workers booking one popular court.
+
+Every worker repeatedly reserves random 15-minute-aligned slots on the same court
+over a few days, skipping the in-memory pre-check so every race reaches the database.
+Afterwards the committed reservations are checked for overlaps. Prints throughput,
+conflict counts and the number of double bookings (which must be 0) as JSON.
+
+Usage:
+    python benchmarks/bench_reservations.py [--workers 16] [--attempts 200] [--processes]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench-reservations-'), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE}'
+
+from app import create_app  # noqa: E402
+from models.models import db, Booking, Match, TennisCourt, User  # noqa: E402
+from services.reservations import SlotTaken, reserve  # noqa: E402
+
+app = create_app()
+
+DAY = datetime(2030, 6, 3)
+
+def _setup(workers: int) -> int:
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        court = TennisCourt(name='Centre Court', address='1 Bench Road', latitude=0.0,
+                            longitude=0.0, price_per_hour=10.0)
+        db.session.add(court)
+        for number in range(workers):
+            db.session.add(User(username=f'player{number}', email=f'player{number}@example.com'))
+        db.session.commit()
+        return court.id
+
+def _hammer(worker: int, court_id: int, attempts: int, days: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    counts = {'reserved': 0, 'conflicts': 0, 'errors': 0}
+    with app.app_context():
+        for _ in range(attempts):
+            start = DAY + timedelta(days=rng.randrange(days), hours=6, minutes=15 * rng.randrange(16 * 4 - 4))
+            duration = rng.choice((30, 45, 60))
+            if rng.random() < 0.5:
+                reservation = Booking(user_id=worker + 1, tennis_court_id=court_id, booking_time=start,
+                                      duration=duration, status='confirmed')
+            else:
+                reservation = Match(court_id=court_id, player1_id=worker + 1, player2_id=1,
+                                    match_time=start, duration=duration)
+            try:
+                reserve(reservation)
+                counts['reserved'] += 1
+            except SlotTaken:
+                counts['conflicts'] += 1
+            except Exception:
+                db.session.rollback()
+                counts['errors'] += 1
+    return counts
+
+def _process_worker(args):
+    # Connections inherited through fork must not be shared with the parent
+    with app.app_context():
+        db.engine.dispose(close=False)
+    return _hammer(*args)
+
+def _double_bookings(court_id: int) -> int:
+    with app.app_context():
+        spans = [(b.booking_time, b.booking_time + timedelta(minutes=b.duration))
+                 for b in Booking.query.filter_by(tennis_court_id=court_id)]
+        spans += [(m.match_time, m.match_time + timedelta(minutes=m.duration))
+                  for m in Match.query.filter_by(court_id=court_id)]
+    spans.sort()
+    return sum(1 for (_, end), (start, _) in zip(spans, spans[1:]) if start < end)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--attempts', type=int, default=200)
+    parser.add_argument('--days', type=int, default=7, help='Days the reservations are spread over')
+    parser.add_argument('--processes', action='store_true', help='Use processes instead of threads')
+    args = parser.parse_args()
+
+    court_id = _setup(args.workers)
+    jobs = [(worker, court_id, args.attempts, args.days, worker) for worker in range(args.workers)]
+    started = time.perf_counter()
+    if args.processes:
+        with multiprocessing.get_context('fork').Pool(args.workers) as pool:
+            results = pool.map(_process_worker, jobs)
+    else:
+        results = [None] * args.workers
+
+        def run(index):
+            results[index] = _hammer(*jobs[index])
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(args.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    totals = {key: sum(result[key] for result in results) for key in results[0]}
+    print(json.dumps({
+        'mode': 'processes' if args.processes else 'threads',
+        'workers': args.workers,
+        'attempts': args.workers * args.attempts,
+        'attempts_per_second': round(args.workers * args.attempts / elapsed, 1),
+        **totals,
+        'double_bookings': _double_bookings(court_id)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
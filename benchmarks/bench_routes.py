@@ -0,0 +1,287 @@
+"""
+Load-test the main Flask routes against a synthetic dataset.
+
+Generates courts, users, bookings and matches at the requested scale into a scratch
+SQLite database, then drives /courts, /book/<id>, /setup-match, /login and /register
+with concurrent clients through the Flask test client. For every route it reports
+throughput, p50/p95/p99 latency, status codes and SQL statements per request as JSON,
+tagged with the current git commit so runs can be compared.
+
+Usage:
+    python benchmarks/bench_routes.py [--courts 200] [--users 1000] [--bookings 20000]
+        [--matches 5000] [--clients 8] [--requests 400] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROUTES = ('courts', 'book', 'setup_match', 'login', 'register')
+PASSWORD = 'bench-password'
+
+# Synthetic courts are spread over a box around this point
+CENTER = (40.7128, -74.0060)
+SPREAD_DEGREES = 0.5
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--courts', type=int, default=200)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--matches', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent clients per route')
+    parser.add_argument('--requests', type=int, default=400, help='Requests per route')
+    parser.add_argument('--routes', default=','.join(ROUTES), help='Comma-separated subset of ' + ', '.join(ROUTES))
+    parser.add_argument('--hash-method', default='pbkdf2:sha256:600000',
+                        help='Password hash method (lower the cost for quick runs)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    return parser.parse_args()
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class QueryCounter:
+    """Counts SQL statements executed by the current thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+def _reservation_rows(count, courts, users, first_day, rng, kind):
+    """Back-to-back reservations from first_day onwards, within default opening hours."""
+    per_court = max(1, count // courts)
+    rows = []
+    for court_id in range(1, courts + 1):
+        day, minute = first_day, 6 * 60
+        for _ in range(per_court):
+            duration = rng.choice((30, 60, 90))
+            if minute + duration > 22 * 60:
+                day, minute = day + timedelta(days=1), 6 * 60
+            start = datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)
+            end = start + timedelta(minutes=duration)
+            if kind == 'booking':
+                rows.append({'user_id': rng.randint(1, users), 'tennis_court_id': court_id,
+                             'booking_time': start, 'duration': duration, 'end_time': end,
+                             'status': 'confirmed'})
+            else:
+                rows.append({'court_id': court_id, 'player1_id': rng.randint(1, users),
+                             'player2_id': rng.randint(1, users), 'match_time': start,
+                             'duration': duration, 'end_time': end, 'status': 'scheduled'})
+            minute += duration + rng.choice((0, 15, 30, 60))
+    return rows
+
+def _generate(args, rng):
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+    from app import app, db
+    from models.models import Booking, Match, TennisCourt, User
+    from services.reservations import backfill_court_slots
+
+    started = time.perf_counter()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(TennisCourt), [
+            {'name': f'Court {number}', 'address': f'{number} Bench Road',
+             'latitude': CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+             'longitude': CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+             'price_per_hour': rng.choice((15.0, 20.0, 25.0, 30.0))} for number in range(args.courts)
+        ])
+        # Every synthetic user shares one hash; computing thousands would dominate setup
+        password_hash = generate_password_hash(PASSWORD, args.hash_method)
+        db.session.execute(insert(User), [
+            {'username': f'user{number}', 'email': f'user{number}@example.com',
+             'password_hash': password_hash} for number in range(args.users)
+        ])
+        # Bookings fill the next weeks; matches follow on a later, separate range of days
+        first_day = date.today() + timedelta(days=1)
+        bookings = _reservation_rows(args.bookings, args.courts, args.users, first_day, rng, 'booking')
+        if bookings:
+            db.session.execute(insert(Booking), bookings)
+        last_booking = max((row['booking_time'] for row in bookings), default=datetime.now())
+        matches = _reservation_rows(args.matches, args.courts, args.users,
+                                    last_booking.date() + timedelta(days=1), rng, 'match')
+        if matches:
+            db.session.execute(insert(Match), matches)
+        db.session.commit()
+        backfill_court_slots()
+    return time.perf_counter() - started
+
+def _login(client, user_number):
+    client.post('/login', data={'email': f'user{user_number}@example.com', 'password': PASSWORD})
+
+def _request_factory(route, args, rng_lock, rng):
+    """Return (setup(client, client_number), send(client, request_number)) for a route."""
+    def pick(function, *values):
+        with rng_lock:
+            return function(*values)
+
+    def random_start():
+        day = date.today() + timedelta(days=pick(rng.randint, 1, 60))
+        minute = 15 * pick(rng.randrange, 6 * 4, 20 * 4)
+        return datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)
+
+    def no_setup(client, client_number):
+        pass
+
+    def logged_in(client, client_number):
+        _login(client, client_number % args.users)
+
+    if route == 'courts':
+        def send(client, number):
+            lat = CENTER[0] + pick(rng.uniform, -SPREAD_DEGREES, SPREAD_DEGREES)
+            lng = CENTER[1] + pick(rng.uniform, -SPREAD_DEGREES, SPREAD_DEGREES)
+            radius = pick(rng.choice, (2, 5, 10))
+            return client.get(f'/courts?lat={lat:.4f}&lng={lng:.4f}&radius={radius}')
+        return no_setup, send
+    if route == 'book':
+        def send(client, number):
+            return client.post(f'/book/{pick(rng.randint, 1, args.courts)}', data={
+                'booking_time': random_start().strftime('%Y-%m-%d %H:%M'),
+                'duration': pick(rng.choice, (30, 60, 90))
+            })
+        return logged_in, send
+    if route == 'setup_match':
+        def send(client, number):
+            return client.post('/setup-match', data={
+                'opponent_email': f'user{pick(rng.randrange, args.users)}@example.com',
+                'court_id': pick(rng.randint, 1, args.courts),
+                'match_time': random_start().strftime('%Y-%m-%d %H:%M'),
+                'duration': pick(rng.choice, (30, 60, 90))
+            })
+        return logged_in, send
+    if route == 'login':
+        def send(client, number):
+            user_number = pick(rng.randrange, args.users)
+            return client.post('/login', data={'email': f'user{user_number}@example.com',
+                                               'password': PASSWORD})
+        return no_setup, send
+    if route == 'register':
+        run_id = f'{os.getpid()}-{int(time.time())}'
+
+        def send(client, number):
+            return client.post('/register', data={'username': f'new-{run_id}-{number}',
+                                                  'email': f'new-{run_id}-{number}@example.com',
+                                                  'password': PASSWORD})
+        return no_setup, send
+    raise ValueError(f'Unknown route {route}')
+
+def _run_route(route, args, counter, rng):
+    from app import app
+
+    setup, send = _request_factory(route, args, threading.Lock(), rng)
+    numbers = iter(range(args.requests))
+    numbers_lock = threading.Lock()
+    samples = []
+    samples_lock = threading.Lock()
+
+    def client_loop(client_number):
+        client = app.test_client()
+        setup(client, client_number)
+        while True:
+            with numbers_lock:
+                number = next(numbers, None)
+            if number is None:
+                return
+            counter.reset()
+            started = time.perf_counter()
+            response = send(client, number)
+            elapsed = time.perf_counter() - started
+            with samples_lock:
+                samples.append((elapsed, response.status_code, counter.count))
+
+    threads = [threading.Thread(target=client_loop, args=(client_number,))
+               for client_number in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies = sorted(sample[0] for sample in samples)
+    queries = [sample[2] for sample in samples]
+
+    def percentile(fraction):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 3)
+
+    return {
+        'requests': len(samples),
+        'requests_per_second': round(len(samples) / wall, 1),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'status_codes': dict(Counter(str(sample[1]) for sample in samples)),
+        'sql_per_request': round(sum(queries) / len(queries), 2),
+        'sql_max_per_request': max(queries)
+    }
+
+def main():
+    args = _parse_args()
+    routes = [route.strip() for route in args.routes.split(',') if route.strip()]
+    unknown = set(routes) - set(ROUTES)
+    if unknown:
+        print(f"Unknown routes: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    # The app reads its configuration at import time
+    scratch = tempfile.mkdtemp(prefix='bench-routes-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    os.environ['PASSWORD_HASH_METHOD'] = args.hash_method
+    os.environ['FLASK_DEBUG'] = 'false'
+
+    from sqlalchemy import event
+    from app import app, db
+
+    rng = random.Random(args.seed)
+    setup_seconds = _generate(args, rng)
+    counter = QueryCounter()
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', counter)
+
+    results = {route: _run_route(route, args, counter, rng) for route in routes}
+    report = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'scale': {'courts': args.courts, 'users': args.users, 'bookings': args.bookings,
+                  'matches': args.matches},
+        'clients': args.clients,
+        'setup_seconds': round(setup_seconds, 2),
+        'routes': results
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
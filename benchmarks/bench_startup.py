@@ -0,0 +1,151 @@
+"""
+Startup regression benchmark: module import time, app creation and first-request latency.
+
+Prepares a scratch SQLite database with `--courts` synthetic courts, then starts
+`--runs` fresh interpreters. Each one imports the app module, calls create_app and
+sends the first request to each probed route followed by a warm repeat, recording
+how many database connections were opened before the first request. Medians and
+maxima are printed as JSON; the exit status is 1 if startup opened a connection
+or a median exceeds --max-import-ms, --max-create-ms or --max-first-request-ms.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--courts 2000] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CENTER = (40.7128, -74.0060)
+SPREAD_DEGREES = 0.5
+PROBES = ('/', f'/courts?lat={CENTER[0]}&lng={CENTER[1]}&radius=10', '/login')
+
+# Runs in a fresh interpreter; prints one JSON line of timings
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+connections = []
+event.listen(Pool, 'connect', lambda *args: connections.append(1))
+app = app_module.create_app()
+created = time.perf_counter()
+opened_at_startup = len(connections)
+client = app.test_client()
+first, warm = {}, {}
+for path in sys.argv[1:]:
+    for timings in (first, warm):
+        request_started = time.perf_counter()
+        status = client.get(path).status_code
+        timings[path] = (time.perf_counter() - request_started) * 1000
+        if status >= 500:
+            raise SystemExit(f'{path} returned {status}')
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_app_ms': (created - imported) * 1000,
+                  'connections_at_startup': opened_at_startup, 'first_request_ms': first,
+                  'warm_request_ms': warm}))
+"""
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters to start')
+    parser.add_argument('--courts', type=int, default=2000)
+    parser.add_argument('--max-import-ms', type=float, default=600.0)
+    parser.add_argument('--max-create-ms', type=float, default=500.0)
+    parser.add_argument('--max-first-request-ms', type=float, default=250.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    return parser.parse_args()
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _prepare(courts, rng):
+    from sqlalchemy import insert
+    from app import create_app
+    from init_db import init_db
+    from models.models import db, TennisCourt
+
+    with create_app().app_context():
+        init_db(sample_courts=False)
+        db.session.execute(insert(TennisCourt), [
+            {'name': f'Court {number}', 'address': f'{number} Bench Road',
+             'latitude': CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+             'longitude': CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+             'price_per_hour': 20.0} for number in range(courts)
+        ])
+        db.session.commit()
+
+def _summary(values):
+    return {'median': round(statistics.median(values), 2), 'max': round(max(values), 2)}
+
+def main():
+    args = _parse_args()
+    scratch = tempfile.mkdtemp(prefix='bench-startup-')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'bench.db')}",
+               FLASK_DEBUG='false', RESPONSE_CACHE_DIR='', USER_CACHE_DIR='',
+               PYTHONPATH=os.pathsep.join(filter(None, (ROOT, os.environ.get('PYTHONPATH')))))
+    os.environ.update(env)
+    _prepare(args.courts, random.Random(args.seed))
+
+    runs = []
+    for _ in range(args.runs):
+        result = subprocess.run([sys.executable, '-c', CHILD, *PROBES], cwd=ROOT, env=env,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            print(result.stderr, file=sys.stderr)
+            return 1
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    import_ms = _summary([run['import_ms'] for run in runs])
+    create_ms = _summary([run['create_app_ms'] for run in runs])
+    first = {path: _summary([run['first_request_ms'][path] for run in runs]) for path in PROBES}
+    warm = {path: _summary([run['warm_request_ms'][path] for run in runs]) for path in PROBES}
+    connections = max(run['connections_at_startup'] for run in runs)
+
+    regressions = []
+    if connections:
+        regressions.append('connections at startup')
+    if import_ms['median'] > args.max_import_ms:
+        regressions.append('import')
+    if create_ms['median'] > args.max_create_ms:
+        regressions.append('create_app')
+    regressions += [f'first request {path}' for path, timing in first.items()
+                    if timing['median'] > args.max_first_request_ms]
+
+    report = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'runs': args.runs,
+        'courts': args.courts,
+        'import_ms': import_ms,
+        'create_app_ms': create_ms,
+        'connections_at_startup': connections,
+        'first_request_ms': first,
+        'warm_request_ms': warm,
+        'regressions': regressions
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
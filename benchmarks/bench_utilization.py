@@ -0,0 +1,106 @@
+"""
+Benchmark /reports/utilization over years of reservation history.
+
+Writes --years of bookings and matches (--per-day a court) for --courts courts
+straight into a scratch SQLite database, builds the rollups with
+rebuild_utilization(), and times the report for one court and for every court
+over the whole history, by day and by month, plus the previous week by hour.
+
+Usage:
+    python benchmarks/bench_utilization.py [--courts 20] [--years 3] [--per-day 8]
+        [--requests 50]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench-utilization-'), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE}'
+
+from app import create_app  # noqa: E402
+from models.models import db, Booking, Match, TennisCourt, User  # noqa: E402
+from services.utilization import rebuild_utilization  # noqa: E402
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))] * 1000, 2)
+
+def seed(args) -> int:
+    for number in range(args.courts):
+        db.session.add(TennisCourt(name=f'Court {number}', address=f'{number} Bench Road',
+                                   latitude=40.7, longitude=-74.0, price_per_hour=20.0 + number))
+    for number in range(2):
+        user = User(username=f'bench{number}', email=f'bench{number}@example.com')
+        user.set_password('bench-password')
+        db.session.add(user)
+    db.session.commit()
+
+    # Core inserts skip the mapper events, so the rollups are only built by the rebuild
+    first_day = date.today() - timedelta(days=365 * args.years)
+    bookings, matches = [], []
+    for offset in range(365 * args.years):
+        day = datetime.combine(first_day + timedelta(days=offset), datetime.min.time())
+        for court_id in range(1, args.courts + 1):
+            for slot in range(args.per_day):
+                start = day + timedelta(hours=8 + slot, minutes=30 * (slot % 2))
+                if slot % 4 == 3:
+                    matches.append({'court_id': court_id, 'player1_id': 1, 'player2_id': 2,
+                                    'match_time': start, 'duration': 60,
+                                    'end_time': start + timedelta(minutes=60), 'status': 'completed'})
+                else:
+                    bookings.append({'user_id': 1, 'tennis_court_id': court_id, 'booking_time': start,
+                                     'duration': 90, 'end_time': start + timedelta(minutes=90),
+                                     'status': 'cancelled' if slot % 5 == 4 else 'confirmed'})
+    db.session.execute(db.insert(Booking), bookings)
+    db.session.execute(db.insert(Match), matches)
+    db.session.commit()
+    return len(bookings) + len(matches)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--courts', type=int, default=20)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--per-day', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app({'PASSWORD_HASH_WORKERS': 0, 'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+                      'METRICS_ENABLED': False})
+    report = {}
+    with app.app_context():
+        db.create_all()
+        report['reservations'] = seed(args)
+        started = time.perf_counter()
+        rebuild_utilization()
+        report['rebuild_seconds'] = round(time.perf_counter() - started, 2)
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'bench0@example.com', 'password': 'bench-password'})
+    first_day = (date.today() - timedelta(days=365 * args.years)).isoformat()
+    last_week = (date.today() - timedelta(days=7)).isoformat()
+    scenarios = {
+        'one_court_by_day': f'/reports/utilization?court=1&from={first_day}',
+        'all_courts_by_day': f'/reports/utilization?from={first_day}',
+        'all_courts_by_month': f'/reports/utilization?from={first_day}&granularity=month',
+        'all_courts_last_week_by_hour': f'/reports/utilization?from={last_week}&granularity=hour'
+    }
+    for name, url in scenarios.items():
+        latencies = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            response = client.get(url)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise SystemExit(f'{url} failed with status {response.status_code}')
+        report[name] = {'p50_ms': _percentile(latencies, 0.50), 'p99_ms': _percentile(latencies, 0.99)}
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,6 +12,23 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///tennis.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool per engine (ignored for in-memory SQLite)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() in ('true', '1', 't')
+    
+    # Pragmas applied to every SQLite connection; an empty value leaves the
+    # SQLite default in place
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '20000'))
+    
+    # Optional read replica used by read-only catalog views
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+    
     # Maps API (for example, if using Google Maps)
     MAPS_API_KEY = os.getenv('MAPS_API_KEY', '')
     
@@ -20,3 +37,98 @@ class Config:
     
     # Tennis court search radius (in kilometers)
     COURT_SEARCH_RADIUS = 10
+    
+    # Edge length (in degrees) of the grid cells used by the court spatial index
+    SPATIAL_INDEX_CELL_DEGREES = float(os.getenv('SPATIAL_INDEX_CELL_DEGREES', '0.05'))
+    
+    # Limits for the free-slot search endpoints
+    SLOT_SEARCH_MAX_DAYS = 14
+    SLOT_SEARCH_MAX_COURTS = 500
+    
+    # Serialized court catalog responses kept per process, and an optional
+    # directory shared by all workers
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '256'))
+    RESPONSE_CACHE_DIR = os.getenv('RESPONSE_CACHE_DIR')
+    
+    # Memory-mapped court catalog snapshots shared by all workers on a host; by
+    # default a directory under the system temp directory named after the database
+    CATALOG_SNAPSHOT_DIR = os.getenv('CATALOG_SNAPSHOT_DIR')
+    
+    # Map marker clustering: courts are aggregated into cells of CLUSTER_CELL_PIXELS
+    # up to CLUSTER_MAX_ZOOM, and returned individually when zoomed in further
+    CLUSTER_MAX_ZOOM = int(os.getenv('CLUSTER_MAX_ZOOM', '14'))
+    CLUSTER_CELL_PIXELS = 64
+    
+    # /courts keyset pagination and NDJSON streaming
+    COURTS_PAGE_MAX = 1000
+    COURTS_STREAM_BATCH_SIZE = 500
+    
+    # /me/schedule page sizes
+    SCHEDULE_PAGE_SIZE = 20
+    SCHEDULE_PAGE_MAX = 100
+    
+    # /reports/utilization range limits, in days
+    REPORT_MAX_DAYS = 3660
+    REPORT_MAX_HOURLY_DAYS = 31
+    
+    # Recurring and bulk bookings: reservations per request (occurrences x courts)
+    RECURRING_MAX_RESERVATIONS = int(os.getenv('RECURRING_MAX_RESERVATIONS', '500'))
+    RECURRING_MAX_COURTS = 20
+    
+    # Archival: reservations that ended more than ARCHIVE_AFTER_DAYS ago are moved to
+    # the archive tables by `flask --app app archive-reservations`. Keep it above the
+    # eight weeks of history matchmaking derives availability from
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '1000'))
+    
+    # Geocoding: 'google' uses MAPS_API_KEY, 'offline' never calls out. Results are
+    # kept in an in-process LRU and, when GEOCODE_CACHE_PATH is set, in a SQLite file
+    # (google only). Addresses that could not be found are retried after GEOCODE_MISS_TTL seconds
+    GEOCODER_BACKEND = os.getenv('GEOCODER_BACKEND', 'google' if os.getenv('MAPS_API_KEY') else 'offline')
+    GEOCODE_CACHE_PATH = os.getenv('GEOCODE_CACHE_PATH', 'geocode_cache.db')
+    GEOCODE_CACHE_SIZE = 10000
+    GEOCODE_MISS_TTL = int(os.getenv('GEOCODE_MISS_TTL', str(7 * 24 * 3600)))
+    GEOCODE_MAX_WORKERS = int(os.getenv('GEOCODE_MAX_WORKERS', '8'))
+    
+    # Snapshots of logged-in users kept per process (and optionally in a
+    # directory shared by all workers) so requests skip the user query. Changes
+    # reach the other workers' copies only after USER_CACHE_TTL seconds
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300'))
+    USER_CACHE_DIR = os.getenv('USER_CACHE_DIR')
+    
+    # Password hashing runs in a process pool (0 workers hashes inline). Hashes
+    # made with another method are upgraded on the next successful login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', '32'))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', '2'))
+    
+    # Request metrics served on /metrics; slower requests are logged with their SQL breakdown
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('true', '1', 't')
+    SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', '1.0'))
+    SLOW_REQUEST_TOP_STATEMENTS = 5
+    
+    # Matchmaking: search radius around a player's home, nearest matching players
+    # ranked, courts tried per pair and how often the player index is rebuilt to
+    # pick up derived availability
+    MATCHMAKING_RADIUS_KM = float(os.getenv('MATCHMAKING_RADIUS_KM', '15'))
+    MATCHMAKING_MAX_RADIUS_KM = 100
+    MATCHMAKING_MEETING_COURTS = 5
+    MATCHMAKING_CANDIDATE_POOL = 100
+    MATCHMAKING_INDEX_TTL = int(os.getenv('MATCHMAKING_INDEX_TTL', '600'))
+    
+    # Background jobs: 'database' keeps them in the job table, 'memory' in the process
+    # (tests). Worker threads start with the first job a process enqueues; with 0 they
+    # only run in a separate `flask --app app jobs-worker` process. Failed jobs are
+    # retried with exponential backoff until JOB_MAX_ATTEMPTS, then kept for
+    # JOB_FAILED_RETENTION_DAYS (0 keeps them forever)
+    JOB_QUEUE_BACKEND = os.getenv('JOB_QUEUE_BACKEND', 'database')
+    JOB_WORKER_THREADS = int(os.getenv('JOB_WORKER_THREADS', '2'))
+    JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', '50'))
+    JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '1.0'))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+    JOB_BACKOFF_SECONDS = 5.0
+    JOB_BACKOFF_MAX_SECONDS = 600.0
+    JOB_LOCK_TIMEOUT = 300.0
+    JOB_FAILED_RETENTION_DAYS = int(os.getenv('JOB_FAILED_RETENTION_DAYS', '30'))
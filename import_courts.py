@@ -0,0 +1,27 @@
+import argparse
+import sys
+from app import create_app
+from models.models import db
+from services.court_import import import_courts
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import tennis courts from a CSV or JSON Lines feed.')
+    parser.add_argument('path', help='CSV or JSONL file with name, address, latitude, longitude, '
+                                     'available_hours and price_per_hour columns')
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help='Feed format (default: from extension)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per batch')
+    parser.add_argument('--strict', action='store_true', help='Abort on the first invalid row')
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        db.create_all()
+        try:
+            stats = import_courts(args.path, args.format, args.batch_size, args.strict)
+        except Exception as e:
+            print(f"Import failed, no courts were changed: {str(e)}", file=sys.stderr)
+            return 1
+    print(f"Import finished: {stats}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import argparse
+import sys
+from datetime import timedelta
+from sqlalchemy import bindparam, func, inspect, select, text, update
+from app import create_app
+from models.models import db, Booking, CourtUsageDay, Match
+from services.reservations import backfill_court_slots
+from services.utilization import rebuild_utilization
+
+def add_missing_columns():
+    """
+    Add columns declared on the models that existing tables do not have yet.
+
+    Columns are added as nullable without defaults, which every backend supports;
+    backfills below fill in the values the models require.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                name = db.engine.dialect.identifier_preparer.quote(table.name)
+                column_name = db.engine.dialect.identifier_preparer.quote(column.name)
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(text(f'ALTER TABLE {name} ADD COLUMN {column_name} {column_type}'))
+                print(f"Added {table.name}.{column.name}")
+
+def widen_string_columns():
+    """
+    Grow string columns that are declared longer on the models than in the database.
+
+    SQLite does not enforce string lengths, so only other backends are altered.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        return
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = db.engine.dialect.identifier_preparer
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            lengths = {column['name']: getattr(column['type'], 'length', None)
+                       for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                declared = getattr(column.type, 'length', None)
+                current = lengths.get(column.name)
+                if declared is None or current is None or current >= declared:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                if db.engine.dialect.name == 'mysql':
+                    null = 'NULL' if column.nullable else 'NOT NULL'
+                    statement = (f'ALTER TABLE {preparer.quote(table.name)} MODIFY {preparer.quote(column.name)} '
+                                 f'{column_type} {null}')
+                else:
+                    statement = (f'ALTER TABLE {preparer.quote(table.name)} ALTER COLUMN '
+                                 f'{preparer.quote(column.name)} TYPE {column_type}')
+                connection.execute(text(statement))
+                print(f"Widened {table.name}.{column.name} from {current} to {declared} characters")
+
+def backfill_end_times(batch_size: int = 10000):
+    """
+    Fill in end_time for rows written before the column existed.
+
+    Each batch is committed on its own, so the backfill can be interrupted and resumed.
+
+    Args:
+        batch_size (int): Rows updated per transaction
+    """
+    for model, start_column in ((Booking, 'booking_time'), (Match, 'match_time')):
+        table = model.__table__
+        start = table.c[start_column]
+        statement = update(table).where(table.c.id == bindparam('row_id')).values(
+            end_time=bindparam('new_end_time')
+        )
+        filled = 0
+        while True:
+            with db.engine.begin() as connection:
+                rows = connection.execute(
+                    select(table.c.id, start, table.c.duration)
+                    .where(table.c.end_time.is_(None)).limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                connection.execute(statement, [
+                    {'row_id': row_id, 'new_end_time': row_start + timedelta(minutes=duration or 60)}
+                    for row_id, row_start, duration in rows
+                ])
+            filled += len(rows)
+        print(f"Backfilled end_time on {filled} {table.name} rows")
+
+def _duplicate_keys(table, columns, limit: int = 10):
+    """Return up to `limit` values of `columns` that more than one row of `table` shares."""
+    key = [table.c[column] for column in columns]
+    with db.engine.connect() as connection:
+        return connection.execute(
+            select(*key).group_by(*key).having(func.count() > 1).limit(limit)
+        ).all()
+
+def create_missing_indexes():
+    """
+    Create indexes declared on the models that the database does not have yet.
+
+    A unique index is skipped with a warning while existing rows still violate it;
+    resolve the listed duplicates and run the migration again.
+    """
+    # Runs after db.create_all(), so every table exists
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.unique:
+                columns = [column.name for column in index.columns]
+                duplicates = _duplicate_keys(table, columns)
+                if duplicates:
+                    print(f"Skipped unique index {index.name}: {table.name} rows share "
+                          f"({', '.join(columns)}), e.g. {', '.join(map(str, map(tuple, duplicates)))}")
+                    continue
+            index.create(db.engine)
+            existing.add(index.name)
+
+def main():
+    parser = argparse.ArgumentParser(description='Upgrade an existing database to the current schema.')
+    parser.add_argument('--batch-size', type=int, default=10000, help='Rows backfilled per transaction')
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        try:
+            db.create_all()
+            add_missing_columns()
+            widen_string_columns()
+            backfill_end_times(args.batch_size)
+            create_missing_indexes()
+            print(f"Claimed {backfill_court_slots(args.batch_size)} court slots")
+            # Rollups are only built here when they have never been built
+            if db.session.query(CourtUsageDay.id).first() is None:
+                print(f"Built utilization rollups from {rebuild_utilization()} reservations")
+        except Exception as e:
+            print(f"Migration failed: {str(e)}", file=sys.stderr)
+            return 1
+    print("Migration finished.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,27 +1,38 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from utils.db_engine import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(255))  # scrypt hashes run to about 160 characters
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    home_latitude = db.Column(db.Float)  # Optional home location used for matchmaking
+    home_longitude = db.Column(db.Float)
+    is_admin = db.Column(db.Boolean, default=False)  # Grants access to the reports
     
     # Relationships
     bookings = db.relationship('Booking', backref='user', lazy=True)
+    availability = db.relationship('PlayerAvailability', backref='user', lazy=True,
+                                   cascade='all, delete-orphan')
     matches_as_player1 = db.relationship('Match', backref='player1', lazy=True, foreign_keys='Match.player1_id')
     matches_as_player2 = db.relationship('Match', backref='player2', lazy=True, foreign_keys='Match.player2_id')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        from services.passwords import get_password_hasher
+        self.password_hash = get_password_hasher().hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        from services.passwords import get_password_hasher
+        return get_password_hasher().verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        from services.passwords import get_password_hasher
+        return get_password_hasher().needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -39,6 +50,13 @@ class TennisCourt(db.Model):
     bookings = db.relationship('Booking', backref='court', lazy=True)
     matches = db.relationship('Match', backref='court', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_tennis_court_location', 'latitude', 'longitude'),
+        # Court imports upsert on (name, address); a unique index rather than a
+        # constraint so migrate_db can add it to existing tables on every backend
+        db.Index('uq_tennis_court_name_address', 'name', 'address', unique=True),
+    )
+
     def __repr__(self):
         return f'<TennisCourt {self.name}>'
 
@@ -48,9 +66,15 @@ class Booking(db.Model):
     tennis_court_id = db.Column(db.Integer, db.ForeignKey('tennis_court.id'), nullable=False)
     booking_time = db.Column(db.DateTime, nullable=False)
     duration = db.Column(db.Integer, nullable=False)  # Duration in minutes
+    end_time = db.Column(db.DateTime, nullable=False)  # booking_time + duration, kept in sync on flush
     status = db.Column(db.String(20), default='pending')  # pending, confirmed, cancelled
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_booking_court_time', 'tennis_court_id', 'booking_time', 'end_time'),
+        db.Index('ix_booking_user_time', 'user_id', 'booking_time'),
+    )
+
     def __repr__(self):
         return f'<Booking {self.id} - Court {self.tennis_court_id}>'
 
@@ -61,8 +85,173 @@ class Match(db.Model):
     player2_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     match_time = db.Column(db.DateTime, nullable=False)
     duration = db.Column(db.Integer, default=60)  # Duration in minutes
+    end_time = db.Column(db.DateTime, nullable=False)  # match_time + duration, kept in sync on flush
     status = db.Column(db.String(20), default='scheduled')  # scheduled, completed, cancelled
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_match_court_time', 'court_id', 'match_time', 'end_time'),
+        db.Index('ix_match_player1_time', 'player1_id', 'match_time'),
+        db.Index('ix_match_player2_time', 'player2_id', 'match_time'),
+    )
+
     def __repr__(self):
         return f'<Match {self.id} - {self.player1_id} vs {self.player2_id}>'
+
+def _end_time_listener(start_attr):
+    def listener(mapper, connection, target):
+        start = getattr(target, start_attr)
+        duration = target.duration
+        if duration is None:
+            duration = target.duration = mapper.columns['duration'].default.arg
+        if start is not None:
+            target.end_time = start + timedelta(minutes=duration)
+    return listener
+
+# Stored end times let overlap queries compare indexed columns instead of computing per row
+for _model, _start_attr in ((Booking, 'booking_time'), (Match, 'match_time')):
+    db.event.listen(_model, 'before_insert', _end_time_listener(_start_attr))
+    db.event.listen(_model, 'before_update', _end_time_listener(_start_attr))
+
+class BookingArchive(db.Model):
+    # Same columns as Booking; finished bookings are moved here by services.archive
+    id = db.Column(db.Integer, primary_key=True)  # ID the booking had in the hot table
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    tennis_court_id = db.Column(db.Integer, db.ForeignKey('tennis_court.id'), nullable=False)
+    booking_time = db.Column(db.DateTime, nullable=False)
+    duration = db.Column(db.Integer, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    user = db.relationship('User', viewonly=True)
+    court = db.relationship('TennisCourt', viewonly=True)
+
+    __table_args__ = (
+        db.Index('ix_booking_archive_user_time', 'user_id', 'booking_time'),
+    )
+
+    def __repr__(self):
+        return f'<BookingArchive {self.id} - Court {self.tennis_court_id}>'
+
+class MatchArchive(db.Model):
+    # Same columns as Match; finished matches are moved here by services.archive
+    id = db.Column(db.Integer, primary_key=True)  # ID the match had in the hot table
+    court_id = db.Column(db.Integer, db.ForeignKey('tennis_court.id'), nullable=False)
+    player1_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    player2_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    match_time = db.Column(db.DateTime, nullable=False)
+    duration = db.Column(db.Integer)
+    end_time = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    court = db.relationship('TennisCourt', viewonly=True)
+    player1 = db.relationship('User', viewonly=True, foreign_keys=[player1_id])
+    player2 = db.relationship('User', viewonly=True, foreign_keys=[player2_id])
+
+    __table_args__ = (
+        db.Index('ix_match_archive_player1_time', 'player1_id', 'match_time'),
+        db.Index('ix_match_archive_player2_time', 'player2_id', 'match_time'),
+    )
+
+    def __repr__(self):
+        return f'<MatchArchive {self.id} - {self.player1_id} vs {self.player2_id}>'
+
+class PlayerAvailability(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = Monday
+    start_minute = db.Column(db.Integer, nullable=False)  # Minutes after midnight
+    end_minute = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<PlayerAvailability {self.user_id} day {self.weekday} {self.start_minute}-{self.end_minute}>'
+
+class CourtSlot(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    court_id = db.Column(db.Integer, db.ForeignKey('tennis_court.id'), nullable=False)
+    slot_start = db.Column(db.DateTime, nullable=False)  # Start of a 15-minute slot
+    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'))
+    match_id = db.Column(db.Integer, db.ForeignKey('match.id'))
+
+    # A slot can only be claimed once, so overlapping reservations fail to commit
+    __table_args__ = (
+        db.UniqueConstraint('court_id', 'slot_start', name='uq_court_slot'),
+        db.Index('ix_court_slot_booking', 'booking_id'),
+        db.Index('ix_court_slot_match', 'match_id'),
+    )
+
+    def __repr__(self):
+        return f'<CourtSlot {self.court_id} @ {self.slot_start}>'
+
+class CatalogVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)  # Bumped on every TennisCourt change
+
+    def __repr__(self):
+        return f'<CatalogVersion {self.version}>'
+
+class CourtCalendarVersion(db.Model):
+    court_id = db.Column(db.Integer, db.ForeignKey('tennis_court.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)  # Bumped on every reservation change on the court
+
+    def __repr__(self):
+        return f'<CourtCalendarVersion {self.court_id} {self.version}>'
+
+class CourtUsageHour(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    court_id = db.Column(db.Integer, db.ForeignKey('tennis_court.id'), nullable=False)
+    hour = db.Column(db.DateTime, nullable=False)  # Start of the hour
+    booking_minutes = db.Column(db.Integer, nullable=False, default=0)  # Minutes of active bookings in the hour
+    match_minutes = db.Column(db.Integer, nullable=False, default=0)
+    reservations = db.Column(db.Integer, nullable=False, default=0)  # Active reservations starting in the hour
+
+    # Maintained by services.utilization on every reservation change
+    __table_args__ = (
+        db.UniqueConstraint('court_id', 'hour', name='uq_court_usage_hour'),
+        db.Index('ix_court_usage_hour_hour', 'hour'),
+    )
+
+    def __repr__(self):
+        return f'<CourtUsageHour {self.court_id} @ {self.hour}>'
+
+class CourtUsageDay(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    court_id = db.Column(db.Integer, db.ForeignKey('tennis_court.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    booking_minutes = db.Column(db.Integer, nullable=False, default=0)
+    match_minutes = db.Column(db.Integer, nullable=False, default=0)
+    reservations = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('court_id', 'day', name='uq_court_usage_day'),
+        db.Index('ix_court_usage_day_day', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<CourtUsageDay {self.court_id} @ {self.day}>'
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)  # Name of the registered job handler
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON arguments
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Not picked up before this time
+    locked_by = db.Column(db.String(64))  # Claim token of the worker running the job
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Workers claim due jobs in run_at order
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+        db.Index('ix_job_locked_by', 'locked_by'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
@@ -0,0 +1,657 @@
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app, stream_with_context
+import json
+from datetime import datetime, date, timedelta
+from flask_login import login_user, logout_user, login_required, current_user
+from models.models import db, User, TennisCourt, Booking, Match, PlayerAvailability
+from services.maps_api import get_maps_service
+from services.matchmaking import find_opponents
+from services.availability import SLOT_MINUTES, find_free_slots
+from services.catalog_cache import cached_catalog_response, current_catalog_version
+from services.catalog_snapshot import get_catalog_snapshot
+from services.clustering import get_cluster_grid
+from services.jobs import enqueue_on_commit
+import services.notifications  # noqa: F401  (registers the notification jobs)
+from services.opening_hours import get_opening_hours
+from services.passwords import PasswordHasherBusy
+from services.recurrence import RecurrenceRule
+from services.reservations import (SlotTaken, find_conflicts, past_reservations, reservation_key, reserve,
+                                   reserve_many, upcoming_reservations)
+from services.utilization import utilization_report
+from utils.db_engine import replica_reads
+from utils.helpers import (admin_required, parse_datetime, handle_booking_conflict, is_slot_aligned,
+                           is_valid_booking_time)
+from utils.metrics import CONTENT_TYPE, get_metrics
+
+bp = Blueprint('main', __name__)
+
+# Routes
+# Add current datetime to all templates
+@bp.app_context_processor
+def inject_now():
+    return {'now': datetime.now()}
+
+@bp.route('/')
+def index():
+    """Homepage showing nearby tennis courts"""
+    return render_template('index.html')
+
+def _parse_bbox(value):
+    """Parse a minLat,minLng,maxLat,maxLng query argument"""
+    try:
+        min_lat, min_lng, max_lat, max_lng = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError('bbox must be minLat,minLng,maxLat,maxLng')
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+        raise ValueError('bbox is out of range')
+    return min_lat, min_lng, max_lat, max_lng
+
+def _courts_data(lat, lng, radius, k, bbox=None, after=None, limit=None):
+    """Build the /courts response data for one query shape"""
+    if lat is not None and lng is not None:
+        return get_maps_service().get_nearby_tennis_courts(lat, lng, radius, limit=k)
+    
+    # Without a location, return all courts (or one page of them) from the shared snapshot
+    courts_data = get_catalog_snapshot().select(bbox, after, limit)
+    
+    if not courts_data and after is None:
+        current_app.logger.warning("No tennis courts found in database")
+    
+    if limit is None:
+        return courts_data
+    return {
+        'courts': courts_data,
+        'next': courts_data[-1]['id'] if len(courts_data) == limit else None
+    }
+
+def _stream_courts(bbox, after, limit):
+    """Yield courts as newline-delimited JSON, one page of the snapshot at a time"""
+    snapshot = get_catalog_snapshot()
+    batch_size = current_app.config['COURTS_STREAM_BATCH_SIZE']
+    sent = 0
+    while limit is None or sent < limit:
+        page = snapshot.select(bbox, after, batch_size if limit is None else min(batch_size, limit - sent))
+        for court in page:
+            yield json.dumps(court, separators=(',', ':')) + '\n'
+        if len(page) < batch_size:
+            break
+        sent += len(page)
+        after = page[-1]['id']
+
+@bp.route('/courts')
+@replica_reads
+def courts():
+    """API endpoint to get nearby tennis courts"""
+    try:
+        # Location-based filtering is served from the in-memory spatial index
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        radius = request.args.get('radius', type=float)
+        k = request.args.get('k', type=int)
+        
+        # Viewport filtering and keyset pagination on the court id
+        try:
+            bbox = _parse_bbox(request.args['bbox']) if 'bbox' in request.args else None
+            after = request.args.get('after', type=int)
+            limit = request.args.get('limit', type=int)
+            if limit is not None and not 0 < limit <= current_app.config['COURTS_PAGE_MAX']:
+                raise ValueError(f"limit must be between 1 and {current_app.config['COURTS_PAGE_MAX']}")
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if lat is not None and lng is not None:
+            if (radius is not None and radius <= 0) or (k is not None and k <= 0):
+                return jsonify({'error': 'radius and k must be positive'}), 400
+            if radius is None and k is None:
+                radius = current_app.config['COURT_SEARCH_RADIUS']
+            bbox = after = limit = None
+        else:
+            lat = lng = radius = k = None
+            
+            if (request.args.get('format') == 'ndjson' or
+                    request.accept_mimetypes.best == 'application/x-ndjson'):
+                return current_app.response_class(
+                    stream_with_context(_stream_courts(bbox, after, limit)),
+                    mimetype='application/x-ndjson'
+                )
+        
+        # Responses are cached per catalog version and carry an ETag. Coordinates and
+        # viewports are nearly unique per client, so those responses stay out of the
+        # shared file cache, where every one of them would be a file
+        shape = f"courts:{lat}:{lng}:{radius}:{k}:{bbox}:{after}:{limit}"
+        return cached_catalog_response(shape, lambda: _courts_data(lat, lng, radius, k, bbox, after, limit),
+                                       shared=lat is None and bbox is None)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching courts: {str(e)}")
+        return jsonify({'error': 'Failed to fetch tennis courts'}), 500
+
+@bp.route('/courts/clusters')
+@replica_reads
+def court_clusters():
+    """API endpoint returning court clusters for a map viewport"""
+    try:
+        bbox = _parse_bbox(request.args.get('bbox'))
+        zoom = request.args.get('zoom', type=int)
+        if zoom is None or zoom < 0:
+            raise ValueError('zoom must be a non-negative integer')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        # Picks up catalog changes made by other workers before reading the grid
+        version = current_catalog_version()
+        if zoom <= current_app.config['CLUSTER_MAX_ZOOM']:
+            return jsonify({'zoom': zoom, 'clusters': get_cluster_grid().clusters(bbox, zoom), 'courts': []})
+        
+        # Zoomed in far enough to show every court individually
+        return jsonify({'zoom': zoom, 'clusters': [], 'courts': get_catalog_snapshot(version).select(bbox)})
+    except Exception as e:
+        current_app.logger.error(f"Error clustering courts: {str(e)}")
+        return jsonify({'error': 'Failed to cluster tennis courts'}), 500
+
+def _slot_search_args():
+    """Parse the date/days/duration arguments shared by the slot search endpoints."""
+    raw_date = request.args.get('date')
+    first_day = date.fromisoformat(raw_date) if raw_date else date.today()
+    days = request.args.get('days', 1, type=int)
+    duration = request.args.get('duration', 60, type=int)
+    if not 1 <= days <= current_app.config['SLOT_SEARCH_MAX_DAYS'] or not 0 < duration <= 24 * 60:
+        raise ValueError('days or duration out of range')
+    return first_day, days, duration
+
+@bp.route('/courts/<int:court_id>/slots')
+@replica_reads
+def court_slots(court_id):
+    """API endpoint listing the bookable start times of a court"""
+    try:
+        first_day, days, duration = _slot_search_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        slots = find_free_slots([court_id], first_day, days, duration)
+        if court_id not in slots:
+            return jsonify({'error': 'Court not found'}), 404
+        return jsonify({'court_id': court_id, 'duration': duration, 'slots': slots[court_id]})
+    except Exception as e:
+        current_app.logger.error(f"Error finding free slots for court {court_id}: {str(e)}")
+        return jsonify({'error': 'Failed to find free slots'}), 500
+
+@bp.route('/courts/slots')
+@replica_reads
+def courts_slots():
+    """API endpoint listing the bookable start times of several courts"""
+    try:
+        first_day, days, duration = _slot_search_args()
+        court_ids = [int(court_id) for court_id in request.args.get('ids', '').split(',') if court_id]
+        if not 0 < len(court_ids) <= current_app.config['SLOT_SEARCH_MAX_COURTS']:
+            raise ValueError('ids must list between 1 and '
+                             f"{current_app.config['SLOT_SEARCH_MAX_COURTS']} courts")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        slots = find_free_slots(court_ids, first_day, days, duration)
+        return jsonify({
+            'duration': duration,
+            'courts': {str(court_id): by_day for court_id, by_day in slots.items()}
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error finding free slots: {str(e)}")
+        return jsonify({'error': 'Failed to find free slots'}), 500
+
+@bp.route('/book/<int:court_id>', methods=['GET', 'POST'])
+@login_required
+def book_court(court_id):
+    """Book a tennis court"""
+    court = TennisCourt.query.get_or_404(court_id)
+    
+    if request.method == 'POST':
+        try:
+            booking_time = parse_datetime(request.form['booking_time'])
+            duration = int(request.form['duration'])
+            if booking_time is None:
+                flash('Invalid booking time.', 'error')
+                return render_template('booking.html', court=court)
+            if not is_slot_aligned(booking_time, duration):
+                flash(f'Bookings must start and end on a {SLOT_MINUTES}-minute boundary.', 'error')
+                return render_template('booking.html', court=court)
+            if not is_valid_booking_time(booking_time, duration,
+                                         hours=get_opening_hours(court.id, court.available_hours)):
+                flash('The court is not open for that time.', 'error')
+                return render_template('booking.html', court=court)
+            if handle_booking_conflict(booking_time, court_id, duration):
+                flash('This court is already booked at that time.', 'error')
+                return render_template('booking.html', court=court)
+            
+            booking = Booking(
+                user_id=current_user.id,
+                tennis_court_id=court_id,
+                booking_time=booking_time,
+                duration=duration,
+                status='confirmed'
+            )
+            # The confirmation job commits with the booking (outbox)
+            reserve(booking, commit=False)
+            enqueue_on_commit('booking_confirmation', {'booking_id': booking.id})
+            db.session.commit()
+            flash('Court booked successfully!', 'success')
+            return redirect(url_for('main.index'))
+        except SlotTaken:
+            flash('This court is already booked at that time.', 'error')
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error booking court {court_id}: {str(e)}")
+            flash('Error booking court. Please try again.', 'error')
+            
+    return render_template('booking.html', court=court)
+
+@bp.route('/book/recurring', methods=['POST'])
+@login_required
+def book_recurring():
+    """Book one or more courts for every occurrence of a recurrence rule, in one transaction"""
+    data = request.get_json(silent=True) or {}
+    try:
+        court_ids = data.get('courts')
+        if not isinstance(court_ids, list) or not court_ids:
+            raise ValueError('courts must be a non-empty list of court IDs')
+        court_ids = list(dict.fromkeys(int(court_id) for court_id in court_ids))
+        if len(court_ids) > current_app.config['RECURRING_MAX_COURTS']:
+            raise ValueError(f"at most {current_app.config['RECURRING_MAX_COURTS']} courts per request")
+        start = datetime.fromisoformat(data['start'])
+        duration = int(data['duration'])
+        if not 0 < duration <= 24 * 60:
+            raise ValueError('duration out of range')
+        # Occurrences keep the time of day of the first one, so checking it covers all
+        if not is_slot_aligned(start, duration):
+            raise ValueError(f'start and duration must be multiples of {SLOT_MINUTES} minutes')
+        rule = RecurrenceRule.parse(data['rule']) if data.get('rule') else None
+        limit = current_app.config['RECURRING_MAX_RESERVATIONS'] // len(court_ids)
+        starts = rule.occurrences(start, limit) if rule is not None else [start]
+        skip_conflicts = bool(data.get('skip_conflicts', False))
+    except OverflowError:
+        return jsonify({'error': 'rule reaches past the last representable date'}), 400
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    courts = {court.id: court for court in TennisCourt.query.filter(TennisCourt.id.in_(court_ids))}
+    missing = [court_id for court_id in court_ids if court_id not in courts]
+    if missing:
+        return jsonify({'error': f"Courts not found: {', '.join(map(str, missing))}"}), 404
+
+    try:
+        now = datetime.now()
+        length = timedelta(minutes=duration)
+        occurrences = []
+        for court_id in court_ids:
+            hours = get_opening_hours(court_id, courts[court_id].available_hours)
+            for occurrence in starts:
+                reason = None
+                if occurrence <= now:
+                    reason = 'past'
+                elif not hours.is_open(occurrence, duration):
+                    reason = 'closed'
+                occurrences.append({'court_id': court_id, 'start': occurrence, 'reason': reason})
+        open_occurrences = [entry for entry in occurrences if entry['reason'] is None]
+        conflicts = find_conflicts([(entry['court_id'], entry['start'], entry['start'] + length)
+                                    for entry in open_occurrences])
+        for entry, reason in zip(open_occurrences, conflicts):
+            entry['reason'] = reason
+
+        free = [entry for entry in occurrences if entry['reason'] is None]
+        conflicting = len(occurrences) - len(free)
+        if free and (skip_conflicts or not conflicting):
+            bookings = reserve_many([
+                Booking(user_id=current_user.id, tennis_court_id=entry['court_id'],
+                        booking_time=entry['start'], duration=duration, status='confirmed')
+                for entry in free
+            ], commit=False)
+            for entry, booking in zip(free, bookings):
+                entry['booking_id'] = booking.id
+            enqueue_on_commit('booking_series_confirmation', {'booking_ids': [booking.id for booking in bookings]})
+            db.session.commit()
+        else:
+            free = []
+    except SlotTaken as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error booking recurring reservations: {str(e)}")
+        return jsonify({'error': 'Failed to book the reservations'}), 500
+
+    results = []
+    for entry in occurrences:
+        result = {'court_id': entry['court_id'], 'start': entry['start'].isoformat(),
+                  'end': (entry['start'] + length).isoformat()}
+        if 'booking_id' in entry:
+            result.update(status='booked', booking_id=entry['booking_id'])
+        elif entry['reason'] is None:
+            result['status'] = 'not_booked'
+        else:
+            result.update(status='conflict', reason=entry['reason'])
+        results.append(result)
+    return jsonify({'booked': len(free), 'conflicts': conflicting, 'occurrences': results}), \
+        201 if free else 409
+
+@bp.route('/setup-match', methods=['GET', 'POST'])
+@login_required
+@replica_reads
+def setup_match():
+    """Set up a match with another player"""
+    if request.method == 'POST':
+        try:
+            opponent = User.query.filter_by(email=request.form['opponent_email']).first()
+            if not opponent:
+                flash('Opponent not found.', 'error')
+                return redirect(url_for('main.setup_match'))
+                
+            court_id = int(request.form['court_id'])
+            match_time = parse_datetime(request.form['match_time'])
+            duration = int(request.form['duration'])
+            if match_time is None:
+                flash('Invalid match time.', 'error')
+                return redirect(url_for('main.setup_match'))
+            if not is_slot_aligned(match_time, duration):
+                flash(f'Matches must start and end on a {SLOT_MINUTES}-minute boundary.', 'error')
+                return redirect(url_for('main.setup_match'))
+            if not is_valid_booking_time(match_time, duration, hours=get_opening_hours(court_id)):
+                flash('The court is not open for that time.', 'error')
+                return redirect(url_for('main.setup_match'))
+            if handle_booking_conflict(match_time, court_id, duration):
+                flash('This court is already booked at that time.', 'error')
+                return redirect(url_for('main.setup_match'))
+                
+            match = Match(
+                court_id=court_id,
+                player1_id=current_user.id,
+                player2_id=opponent.id,
+                match_time=match_time,
+                duration=duration
+            )
+            reserve(match, commit=False)
+            enqueue_on_commit('match_invitation', {'match_id': match.id})
+            db.session.commit()
+            flash('Match setup successfully!', 'success')
+            return redirect(url_for('main.index'))
+        except SlotTaken:
+            flash('This court is already booked at that time.', 'error')
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error setting up match: {str(e)}")
+            flash('Error setting up match. Please try again.', 'error')
+            
+    courts = get_catalog_snapshot().select()
+    return render_template('match_setup.html', courts=courts)
+
+def _schedule_cursor(reservation):
+    """Encode the key of a reservation as a /me/schedule cursor"""
+    start, kind, reservation_id = reservation_key(reservation)
+    return f"{start.isoformat()}_{kind}_{reservation_id}"
+
+def _parse_schedule_cursor(value):
+    """Parse a /me/schedule cursor back into a (start, kind, id) key"""
+    try:
+        start, kind, reservation_id = value.rsplit('_', 2)
+        if kind not in ('booking', 'match'):
+            raise ValueError
+        return datetime.fromisoformat(start), kind, int(reservation_id)
+    except ValueError:
+        raise ValueError('after is not a valid schedule cursor')
+
+def _schedule_entry(reservation, user_id):
+    """Serialize a booking or match as seen by one of its players"""
+    start, kind, reservation_id = reservation_key(reservation)
+    entry = {
+        'kind': kind,
+        'id': reservation_id,
+        'start': start.isoformat(),
+        'end': reservation.end_time.isoformat(),
+        'duration': reservation.duration,
+        'status': reservation.status,
+        'court': {
+            'id': reservation.court.id,
+            'name': reservation.court.name,
+            'address': reservation.court.address
+        },
+        'opponent': None
+    }
+    if kind == 'match':
+        opponent = reservation.player2 if reservation.player1_id == user_id else reservation.player1
+        entry['opponent'] = {'id': opponent.id, 'username': opponent.username}
+    return entry
+
+@bp.route('/me/schedule')
+@login_required
+def my_schedule():
+    """The current user's bookings and matches in time order, one page at a time"""
+    wants_json = (request.args.get('format') == 'json' or
+                  request.accept_mimetypes.best == 'application/json')
+    try:
+        after = _parse_schedule_cursor(request.args['after']) if 'after' in request.args else None
+        limit = request.args.get('limit', current_app.config['SCHEDULE_PAGE_SIZE'], type=int)
+        if not 0 < limit <= current_app.config['SCHEDULE_PAGE_MAX']:
+            raise ValueError(f"limit must be between 1 and {current_app.config['SCHEDULE_PAGE_MAX']}")
+    except ValueError as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash(str(e), 'error')
+        return redirect(url_for('main.my_schedule'))
+
+    try:
+        # One extra row tells whether there is a next page
+        reservations = upcoming_reservations(current_user.id, datetime.now(), limit + 1, after)
+        page = reservations[:limit]
+        entries = [_schedule_entry(reservation, current_user.id) for reservation in page]
+        next_cursor = _schedule_cursor(page[-1]) if len(reservations) > limit else None
+    except Exception as e:
+        current_app.logger.error(f"Error loading schedule: {str(e)}")
+        if wants_json:
+            return jsonify({'error': 'Failed to load schedule'}), 500
+        flash('Error loading your schedule. Please try again.', 'error')
+        return redirect(url_for('main.index'))
+
+    if wants_json:
+        return jsonify({'reservations': entries, 'next': next_cursor})
+    return render_template('schedule.html', entries=entries, next_cursor=next_cursor, limit=limit)
+
+@bp.route('/me/history')
+@login_required
+def my_history():
+    """The current user's past bookings and matches, newest first, including archived ones"""
+    wants_json = (request.args.get('format') == 'json' or
+                  request.accept_mimetypes.best == 'application/json')
+    try:
+        before = _parse_schedule_cursor(request.args['before']) if 'before' in request.args else None
+        limit = request.args.get('limit', current_app.config['SCHEDULE_PAGE_SIZE'], type=int)
+        if not 0 < limit <= current_app.config['SCHEDULE_PAGE_MAX']:
+            raise ValueError(f"limit must be between 1 and {current_app.config['SCHEDULE_PAGE_MAX']}")
+    except ValueError as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash(str(e), 'error')
+        return redirect(url_for('main.my_history'))
+
+    try:
+        # One extra row tells whether there is a next page
+        reservations = past_reservations(current_user.id, datetime.now(), limit + 1, before)
+        page = reservations[:limit]
+        entries = [_schedule_entry(reservation, current_user.id) for reservation in page]
+        next_cursor = _schedule_cursor(page[-1]) if len(reservations) > limit else None
+    except Exception as e:
+        current_app.logger.error(f"Error loading history: {str(e)}")
+        if wants_json:
+            return jsonify({'error': 'Failed to load history'}), 500
+        flash('Error loading your history. Please try again.', 'error')
+        return redirect(url_for('main.index'))
+
+    if wants_json:
+        return jsonify({'reservations': entries, 'next': next_cursor})
+    return render_template('schedule.html', entries=entries, next_cursor=next_cursor, limit=limit,
+                           history=True)
+
+def _parse_window(window):
+    """Parse a {"weekday": 0, "start": "HH:MM", "end": "HH:MM"} availability window"""
+    try:
+        weekday = int(window['weekday'])
+        start_hour, start_minute = (int(part) for part in window['start'].split(':'))
+        end_hour, end_minute = (int(part) for part in window['end'].split(':'))
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError('windows must have weekday, start and end ("HH:MM")')
+    start, end = start_hour * 60 + start_minute, end_hour * 60 + end_minute
+    if not 0 <= weekday <= 6 or not 0 <= start < end <= 24 * 60:
+        raise ValueError('window is out of range')
+    return weekday, start, end
+
+@bp.route('/me/availability', methods=['GET', 'PUT'])
+@login_required
+def my_availability():
+    """Get or replace the current user's home location and weekly availability"""
+    user = db.session.get(User, current_user.id)
+    if request.method == 'PUT':
+        data = request.get_json(silent=True) or {}
+        try:
+            home = data.get('home')
+            if home is not None:
+                latitude, longitude = float(home['lat']), float(home['lng'])
+                if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+                    raise ValueError('home is out of range')
+            windows = [_parse_window(window) for window in data.get('windows', [])]
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        try:
+            user.home_latitude, user.home_longitude = (latitude, longitude) if home else (None, None)
+            user.availability = [
+                PlayerAvailability(weekday=weekday, start_minute=start, end_minute=end)
+                for weekday, start, end in windows
+            ]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error saving availability: {str(e)}")
+            return jsonify({'error': 'Failed to save availability'}), 500
+
+    home = None
+    if user.home_latitude is not None and user.home_longitude is not None:
+        home = {'lat': user.home_latitude, 'lng': user.home_longitude}
+    return jsonify({
+        'home': home,
+        'windows': [
+            {
+                'weekday': window.weekday,
+                'start': f"{window.start_minute // 60:02d}:{window.start_minute % 60:02d}",
+                'end': f"{window.end_minute // 60:02d}:{window.end_minute % 60:02d}"
+            }
+            for window in sorted(user.availability, key=lambda w: (w.weekday, w.start_minute))
+        ]
+    })
+
+@bp.route('/matchmaking/opponents')
+@login_required
+def matchmaking_opponents():
+    """Suggest nearby opponents with overlapping free time and a court to meet at"""
+    try:
+        start = datetime.fromisoformat(request.args['start']) if 'start' in request.args else datetime.now()
+        end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else start + timedelta(days=7)
+        duration = request.args.get('duration', 60, type=int)
+        radius = request.args.get('radius', type=float)
+        limit = request.args.get('limit', 10, type=int)
+        if not start < end <= start + timedelta(days=current_app.config['SLOT_SEARCH_MAX_DAYS']):
+            raise ValueError(f"end must be after start and within {current_app.config['SLOT_SEARCH_MAX_DAYS']} days")
+        if not 0 < duration <= 24 * 60 or not 0 < limit <= 50:
+            raise ValueError('duration or limit out of range')
+        if radius is not None and not 0 < radius <= current_app.config['MATCHMAKING_MAX_RADIUS_KM']:
+            raise ValueError(f"radius must be between 0 and {current_app.config['MATCHMAKING_MAX_RADIUS_KM']}")
+        suggestions = find_opponents(current_user.id, start, end, duration, radius, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error finding opponents: {str(e)}")
+        return jsonify({'error': 'Failed to find opponents'}), 500
+    return jsonify({'duration': duration, 'opponents': suggestions})
+
+@bp.route('/reports/utilization')
+@login_required
+@admin_required
+@replica_reads
+def utilization():
+    """Occupancy and revenue per court and per hour, day or month, from the usage rollups"""
+    try:
+        today = date.today()
+        end_day = date.fromisoformat(request.args['to']) if 'to' in request.args else today
+        start_day = (date.fromisoformat(request.args['from']) if 'from' in request.args
+                     else end_day - timedelta(days=29))
+        court_id = request.args.get('court', type=int)
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in ('hour', 'day', 'month'):
+            raise ValueError('granularity must be hour, day or month')
+        days = (end_day - start_day).days + 1
+        max_days = (current_app.config['REPORT_MAX_HOURLY_DAYS'] if granularity == 'hour'
+                    else current_app.config['REPORT_MAX_DAYS'])
+        if not 0 < days <= max_days:
+            raise ValueError(f'to must be on or after from, and the range at most {max_days} days '
+                             f'for {granularity} granularity')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        report = utilization_report(start_day, end_day, court_id, granularity)
+    except Exception as e:
+        current_app.logger.error(f"Error building utilization report: {str(e)}")
+        return jsonify({'error': 'Failed to build utilization report'}), 500
+    if court_id is not None and not report['courts']:
+        return jsonify({'error': 'Court not found'}), 404
+    return jsonify({'from': start_day.isoformat(), 'to': end_day.isoformat(),
+                    'granularity': granularity, **report})
+
+@bp.route('/metrics')
+def metrics():
+    """Request, SQL and cache metrics in the Prometheus text format"""
+    if not current_app.config['METRICS_ENABLED']:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return current_app.response_class(get_metrics().render(), content_type=CONTENT_TYPE)
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """User login"""
+    if request.method == 'POST':
+        try:
+            user = User.query.filter_by(email=request.form['email']).first()
+            if user and user.check_password(request.form['password']):
+                # Upgrade hashes made with an older method or cost
+                if user.password_needs_rehash():
+                    user.set_password(request.form['password'])
+                    db.session.commit()
+                login_user(user)
+                flash('Logged in successfully.', 'success')
+                return redirect(url_for('main.index'))
+            flash('Invalid email or password.', 'error')
+        except PasswordHasherBusy:
+            flash('Too many sign-in attempts right now. Please try again in a moment.', 'error')
+            return render_template('login.html'), 503
+    return render_template('login.html')
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    """User registration"""
+    if request.method == 'POST':
+        try:
+            user = User(
+                username=request.form['username'],
+                email=request.form['email']
+            )
+            user.set_password(request.form['password'])
+            db.session.add(user)
+            db.session.commit()
+            flash('Registration successful! Please login.', 'success')
+            return redirect(url_for('main.login'))
+        except PasswordHasherBusy:
+            flash('Too many sign-up attempts right now. Please try again in a moment.', 'error')
+            return render_template('register.html'), 503
+        except Exception as e:
+            flash('Error during registration. Please try again.', 'error')
+    return render_template('register.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    """User logout"""
+    logout_user()
+    flash('Logged out successfully.', 'success')
+    return redirect(url_for('main.index'))
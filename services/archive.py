@@ -0,0 +1,63 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import delete, func, insert, literal, select
+from models.models import db, Booking, BookingArchive, CourtSlot, Match, MatchArchive
+
+logger = logging.getLogger(__name__)
+
+# Per reservation kind: hot model, archive model and the slot claim column pointing at it
+ARCHIVES = {
+    'booking': (Booking, BookingArchive, CourtSlot.booking_id),
+    'match': (Match, MatchArchive, CourtSlot.match_id)
+}
+
+def archive_reservations(older_than: timedelta, batch_size: int = 1000,
+                         max_batches: Optional[int] = None) -> Dict[str, int]:
+    """
+    Move bookings and matches that ended before a horizon into the archive tables.
+
+    Every batch copies the rows, drops their slot claims and deletes them from the
+    hot table in one transaction, so the archival can be stopped at any point and
+    resumed by running it again. Rows are moved with Core statements, which leaves
+    the utilization rollups (maintained by ORM events) counting them.
+
+    Args:
+        older_than (timedelta): Reservations that ended longer ago than this are moved
+        batch_size (int): Reservations moved per transaction
+        max_batches (Optional[int]): Stop after this many batches per kind
+
+    Returns:
+        Dict[str, int]: Number of reservations moved per kind
+    """
+    cutoff = datetime.now() - older_than
+    moved = {}
+    for kind, (model, archive, owner) in ARCHIVES.items():
+        table, archive_table = model.__table__, archive.__table__
+        columns = [column.name for column in table.columns]
+        # SQLite hands out max(id) + 1 to new rows, so archiving the newest row could
+        # let its ID be reused and collide in the archive later
+        newest_id = db.session.scalar(select(func.max(table.c.id)))
+        db.session.commit()
+        moved[kind] = 0
+        batches = 0
+        while newest_id is not None and (max_batches is None or batches < max_batches):
+            with db.engine.begin() as connection:
+                ids = connection.execute(
+                    select(table.c.id).where(table.c.end_time < cutoff, table.c.id < newest_id)
+                    .order_by(table.c.id).limit(batch_size)
+                ).scalars().all()
+                if not ids:
+                    break
+                connection.execute(insert(archive_table).from_select(
+                    columns + ['archived_at'],
+                    select(*(table.c[name] for name in columns), literal(datetime.utcnow()))
+                    .where(table.c.id.in_(ids))
+                ))
+                connection.execute(delete(CourtSlot.__table__).where(owner.in_(ids)))
+                connection.execute(delete(table).where(table.c.id.in_(ids)))
+            moved[kind] += len(ids)
+            batches += 1
+            logger.info(f"Archived {moved[kind]} {kind}s so far")
+    logger.info(f"Archived reservations that ended before {cutoff}: {moved}")
+    return moved
@@ -0,0 +1,131 @@
+import logging
+from math import ceil, floor
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional
+from models.models import db, TennisCourt
+from services.court_calendar import CourtCalendar, get_calendar_index
+from services.opening_hours import OpeningHours, get_opening_hours
+
+logger = logging.getLogger(__name__)
+
+# Granularity of bookable start times, in minutes
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+def _range_mask(first_slot: int, last_slot: int) -> int:
+    """Bitmap with bits [first_slot, last_slot) set."""
+    if last_slot <= first_slot:
+        return 0
+    return ((1 << (last_slot - first_slot)) - 1) << first_slot
+
+def opening_mask(hours: OpeningHours, day: date) -> int:
+    """
+    Build the bitmap of slots during which a court is open on a given day.
+
+    Args:
+        hours (OpeningHours): The court's compiled opening hours
+        day (date): Day to build the bitmap for
+
+    Returns:
+        int: Bitmap where bit i is set when slot i of the day is open
+    """
+    opening, closing = hours.day_range(day.weekday())
+    return _range_mask(ceil(opening / SLOT_MINUTES), closing // SLOT_MINUTES)
+
+def busy_mask(court_id: int, day: date, calendar: Optional[CourtCalendar] = None) -> int:
+    """
+    Build the bitmap of slots taken by bookings and matches on a given day.
+
+    Args:
+        court_id (int): ID of the court
+        day (date): Day to build the bitmap for
+        calendar (Optional[CourtCalendar]): Current calendar of the court, checked
+            against its version and fetched when not given
+
+    Returns:
+        int: Bitmap where bit i is set when slot i of the day is reserved
+    """
+    day_start = datetime.combine(day, time())
+    day_end = day_start + timedelta(days=1)
+    mask = 0
+    slot_seconds = SLOT_MINUTES * 60
+    if calendar is None:
+        calendar = get_calendar_index().calendar(court_id)
+    for start, end, _, _ in calendar.between(day_start, day_end):
+        first = floor((max(start, day_start) - day_start).total_seconds() / slot_seconds)
+        last = ceil((min(end, day_end) - day_start).total_seconds() / slot_seconds)
+        mask |= _range_mask(first, last)
+    return mask
+
+def start_mask(free: int, duration_minutes: int) -> int:
+    """
+    Reduce a free-slot bitmap to the slots where a reservation of a given length can start.
+
+    Args:
+        free (int): Bitmap of free slots
+        duration_minutes (int): Length of the reservation
+
+    Returns:
+        int: Bitmap where bit i is set when slots i .. i + length - 1 are all free
+    """
+    length = ceil(duration_minutes / SLOT_MINUTES)
+    starts = free
+    covered = 1
+    # Shift-and-AND doubling: after each step `starts` has runs of `covered` free slots
+    while covered < length:
+        step = min(covered, length - covered)
+        starts &= starts >> step
+        covered += step
+    return starts
+
+def _slot_times(mask: int) -> List[str]:
+    times = []
+    while mask:
+        low = mask & -mask
+        slot = low.bit_length() - 1
+        minutes = slot * SLOT_MINUTES
+        times.append(f"{minutes // 60:02d}:{minutes % 60:02d}")
+        mask ^= low
+    return times
+
+def find_free_slots(court_ids: Iterable[int], first_day: date, days: int,
+                    duration_minutes: int) -> Dict[int, Dict[str, List[str]]]:
+    """
+    List every bookable start time on several courts over a range of days.
+
+    The calendars of all courts are version-checked once up front, so reservations
+    committed by other worker processes are taken into account.
+
+    Args:
+        court_ids (Iterable[int]): IDs of the courts to search
+        first_day (date): First day to search
+        days (int): Number of consecutive days to search
+        duration_minutes (int): Length of the reservation
+
+    Returns:
+        Dict[int, Dict[str, List[str]]]: Start times ("HH:MM") by ISO date for each
+            court that exists
+    """
+    court_ids = list(court_ids)
+    courts = db.session.query(TennisCourt.id, TennisCourt.available_hours).filter(
+        TennisCourt.id.in_(court_ids)
+    ).all()
+    calendars = get_calendar_index().calendars([court_id for court_id, _ in courts])
+
+    now = datetime.now()
+    today_cutoff = ceil((now.hour * 60 + now.minute + 1) / SLOT_MINUTES)
+
+    results = {}
+    for court_id, available_hours in courts:
+        hours = get_opening_hours(court_id, available_hours)
+        by_day = {}
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            free = opening_mask(hours, day) & ~busy_mask(court_id, day, calendars[court_id])
+            if day < now.date():
+                free = 0
+            elif day == now.date():
+                free &= ~_range_mask(0, today_cutoff)
+            by_day[day.isoformat()] = _slot_times(start_mask(free, duration_minutes))
+        results[court_id] = by_day
+    return results
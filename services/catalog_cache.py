@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import threading
+from itertools import chain
+from typing import Any, Callable, List, Optional, Tuple
+from flask import current_app, request
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from models.models import db, CatalogVersion, TennisCourt
+from utils.cache import FileCache, LRUCache
+from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_ID = 1
+
+_catalog_listeners: List[Callable[[], None]] = []
+_known_version: Optional[int] = None
+_version_lock = threading.Lock()
+
+def on_external_catalog_change(callback: Callable[[], None]):
+    """
+    Register a callback run when another process is found to have changed the catalog.
+
+    In-process caches that are kept in sync by commit hooks use this to reload
+    after writes made by other workers.
+
+    Args:
+        callback (Callable[[], None]): Called with no arguments
+    """
+    _catalog_listeners.append(callback)
+
+def bump_catalog_version(connection) -> int:
+    """
+    Increment the catalog version inside the caller's transaction.
+
+    Called automatically when TennisCourt rows are flushed through the ORM; bulk
+    Core writes to the court table must call it themselves.
+
+    Args:
+        connection: Connection of the transaction that changed the catalog
+
+    Returns:
+        int: The new catalog version
+    """
+    table = CatalogVersion.__table__
+    result = connection.execute(
+        update(table).where(table.c.id == CATALOG_VERSION_ID).values(version=table.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(id=CATALOG_VERSION_ID, version=1))
+    return connection.execute(select(table.c.version).where(table.c.id == CATALOG_VERSION_ID)).scalar()
+
+def reload_catalog_caches():
+    """Reset every in-process cache derived from the catalog, e.g. after a bulk import."""
+    for callback in _catalog_listeners:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Error reloading catalog cache: {str(e)}")
+
+def current_catalog_version() -> int:
+    """
+    Read the catalog version shared by all worker processes.
+
+    Returns:
+        int: Current catalog version, 0 before the first change
+    """
+    global _known_version
+    version = db.session.query(CatalogVersion.version).filter(
+        CatalogVersion.id == CATALOG_VERSION_ID
+    ).scalar() or 0
+    with _version_lock:
+        changed = _known_version is not None and version != _known_version
+        _known_version = version
+    if changed:
+        logger.info(f"Catalog changed to version {version} in another process, reloading caches")
+        reload_catalog_caches()
+    return version
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_court_change(session, flush_context):
+    changed = any(
+        isinstance(obj, TennisCourt)
+        for obj in chain(session.new, session.deleted,
+                         (obj for obj in session.dirty if session.is_modified(obj)))
+    )
+    if changed:
+        version = bump_catalog_version(session.connection())
+        # Version the transaction started from, kept across several flushes
+        session.info.setdefault('catalog_version_before', version - 1)
+        session.info['catalog_version'] = version
+
+@event.listens_for(Session, 'after_commit')
+def _remember_local_version(session):
+    global _known_version
+    before = session.info.pop('catalog_version_before', None)
+    version = session.info.pop('catalog_version', None)
+    if version is None:
+        return
+    with _version_lock:
+        # The commit hooks only applied this transaction's changes, so the caches are
+        # current only if no other process committed a version in between
+        current = _known_version is not None and before == _known_version
+        _known_version = version
+    if not current:
+        logger.info(f"Catalog version {version} skipped changes made elsewhere, reloading caches")
+        reload_catalog_caches()
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_local_version(session):
+    session.info.pop('catalog_version_before', None)
+    session.info.pop('catalog_version', None)
+
+class CatalogResponseCache:
+    """
+    Serialized catalog responses keyed by (catalog version, query shape).
+
+    Entries live in a per-process LRU and, when a directory is configured, in a
+    file cache shared by every worker. A version bump makes all older entries
+    unreachable, so nothing has to be invalidated explicitly.
+    """
+
+    def __init__(self, maxsize: int = 256, directory: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize (int): Maximum number of responses kept per process
+            directory (Optional[str]): Directory of the shared file cache, if any
+        """
+        self.local = LRUCache(maxsize)
+        self.shared = FileCache(directory) if directory else None
+        self._pruned_version = None
+
+    def get_or_build(self, version: int, shape: str, build: Callable[[], Any],
+                     shared: bool = True) -> Tuple[bytes, str]:
+        """
+        Return the serialized payload and ETag for a query, building it on a miss.
+
+        Args:
+            version (int): Current catalog version
+            shape (str): Normalized description of the query
+            build (Callable[[], Any]): Produces the JSON-serializable response data
+            shared (bool): Whether the payload may be read from and written to the
+                shared file cache
+
+        Returns:
+            Tuple[bytes, str]: (JSON payload, ETag value)
+        """
+        cached = self.local.get((version, shape))
+        if cached is not None:
+            return cached
+
+        namespace = f"catalog{version}"
+        shared = self.shared if shared else None
+        payload = shared.get(namespace, shape) if shared else None
+        if payload is None:
+            payload = json.dumps(build(), separators=(',', ':')).encode('utf-8')
+            if shared:
+                if self._pruned_version != version:
+                    # Only older versions: workers that already see a newer one share the directory
+                    shared.prune('catalog', lambda kept: _namespace_version(kept) >= version)
+                    self._pruned_version = version
+                shared.set(namespace, shape, payload)
+
+        entry = (payload, f"{version}-{hashlib.sha1(payload).hexdigest()[:20]}")
+        self.local.set((version, shape), entry)
+        return entry
+
+def _namespace_version(namespace: str) -> int:
+    """Return the catalog version of a shared cache namespace, -1 if it is not one."""
+    suffix = namespace[len('catalog'):]
+    return int(suffix) if suffix.isdigit() else -1
+
+_response_cache: Optional[CatalogResponseCache] = None
+
+def get_response_cache() -> CatalogResponseCache:
+    """Return the process-wide catalog response cache, creating it from the app config."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = CatalogResponseCache(
+            current_app.config.get('RESPONSE_CACHE_SIZE', 256),
+            current_app.config.get('RESPONSE_CACHE_DIR')
+        )
+    return _response_cache
+
+get_metrics().register_cache('catalog_responses',
+                             lambda: _response_cache.local.stats() if _response_cache else None)
+
+def cached_catalog_response(shape: str, build: Callable[[], Any], shared: bool = True):
+    """
+    Build a JSON response for a catalog query, served from the response cache.
+
+    The response carries a strong ETag, so clients revalidating with If-None-Match
+    get a 304 until the catalog changes.
+
+    Args:
+        shape (str): Normalized description of the query
+        build (Callable[[], Any]): Produces the JSON-serializable response data
+        shared (bool): False for queries that are rarely repeated by other clients,
+            such as arbitrary coordinates, which are then only cached per process
+
+    Returns:
+        Response: JSON response, or 304 Not Modified
+    """
+    payload, etag = get_response_cache().get_or_build(current_catalog_version(), shape, build, shared)
+    response = current_app.response_class(payload, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
@@ -0,0 +1,329 @@
+import bisect
+import glob
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from flask import current_app
+from models.models import db, TennisCourt
+from services.catalog_cache import current_catalog_version
+from utils.db_engine import primary_reads
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'TCAT'
+FORMAT_VERSION = 2
+
+# magic, format version, catalog version, number of courts, length of the string buffer
+HEADER = struct.Struct('=4sIQQQ')
+
+class CatalogSnapshot:
+    """
+    Read-only court catalog laid out as flat arrays over one buffer.
+
+    The buffer holds, after the header, the court ids (sorted), latitudes, longitudes
+    and prices as 8-byte arrays, the latitudes again in ascending order with the
+    position each one belongs to, start offsets of every name and address into a
+    UTF-8 string area, and the string area itself. The arrays are memoryview casts
+    of the buffer, so a snapshot attached from a memory-mapped file costs a worker
+    no memory per court: every worker maps the same page cache pages, and only the
+    courts a request touches are turned into Python objects.
+    """
+
+    __slots__ = ('version', 'ids', 'latitudes', 'longitudes', 'prices', '_sorted_latitudes',
+                 '_latitude_order', '_name_offsets', '_address_offsets', '_strings', '_buffer')
+
+    def __init__(self, buffer):
+        """
+        Attach to an encoded snapshot without copying it.
+
+        Args:
+            buffer: Bytes-like object holding an encoded snapshot, e.g. an mmap
+
+        Raises:
+            ValueError: If the buffer does not hold a snapshot of this format
+        """
+        view = memoryview(buffer)
+        if len(view) < HEADER.size:
+            raise ValueError("Catalog snapshot is truncated")
+        magic, format_version, version, count, strings_length = HEADER.unpack_from(view)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("Not a catalog snapshot of a supported format")
+        if len(view) != _encoded_size(count, strings_length):
+            raise ValueError("Catalog snapshot is truncated")
+
+        offset = HEADER.size
+        sections = []
+        for item_size, length, code in ((8, count, 'q'), (8, count, 'd'), (8, count, 'd'), (8, count, 'd'),
+                                        (8, count, 'd'), (4, count, 'I'),
+                                        (4, count + 1, 'I'), (4, count + 1, 'I')):
+            sections.append(view[offset:offset + item_size * length].cast(code))
+            offset += item_size * length
+        self.version = version
+        self.ids, self.latitudes, self.longitudes, self.prices = sections[:4]
+        self._sorted_latitudes, self._latitude_order = sections[4:6]
+        self._name_offsets, self._address_offsets = sections[6:]
+        self._strings = view[offset:offset + strings_length]
+        self._buffer = buffer
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def index_of(self, court_id: int) -> Optional[int]:
+        """
+        Find the position of a court in the snapshot.
+
+        Args:
+            court_id (int): ID of the court
+
+        Returns:
+            Optional[int]: Position of the court, None if it is not in the snapshot
+        """
+        position = bisect.bisect_left(self.ids, court_id)
+        if position < len(self.ids) and self.ids[position] == court_id:
+            return position
+        return None
+
+    def _string(self, offsets, position: int) -> str:
+        return str(self._strings[offsets[position]:offsets[position + 1]], 'utf-8')
+
+    def court(self, position: int) -> Dict:
+        """
+        Return a court as the dictionary served by the catalog endpoints.
+
+        Args:
+            position (int): Position of the court in the snapshot
+
+        Returns:
+            Dict: id, name, address, latitude, longitude and price_per_hour
+        """
+        return {
+            'id': self.ids[position],
+            'name': self._string(self._name_offsets, position),
+            'address': self._string(self._address_offsets, position),
+            'latitude': self.latitudes[position],
+            'longitude': self.longitudes[position],
+            'price_per_hour': self.prices[position]
+        }
+
+    def get(self, court_id: int) -> Optional[Dict]:
+        """
+        Look up a court by id.
+
+        Args:
+            court_id (int): ID of the court
+
+        Returns:
+            Optional[Dict]: The court, None if it is not in the snapshot
+        """
+        position = self.index_of(court_id)
+        return self.court(position) if position is not None else None
+
+    def select(self, bbox: Optional[Tuple[float, float, float, float]] = None,
+               after: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        List courts in id order, like a keyset-paginated catalog query.
+
+        Args:
+            bbox (Optional[Tuple[float, float, float, float]]): (min lat, min lng, max lat,
+                max lng); a box with min lng above max lng crosses the antimeridian
+            after (Optional[int]): Only courts with a larger id
+            limit (Optional[int]): Maximum number of courts
+
+        Returns:
+            List[Dict]: Matching courts in id order
+        """
+        start = bisect.bisect_right(self.ids, after) if after is not None else 0
+        if bbox is not None:
+            positions = self._positions_in_bbox(bbox, start)
+        else:
+            positions = range(start, len(self.ids))
+        if limit is not None:
+            positions = positions[:limit]
+        return [self.court(position) for position in positions]
+
+    def _positions_in_bbox(self, bbox: Tuple[float, float, float, float], start: int) -> List[int]:
+        """Positions from `start` on inside a bbox, in id order, found through the latitude order."""
+        min_lat, _, max_lat, _ = bbox
+        first = bisect.bisect_left(self._sorted_latitudes, min_lat)
+        last = bisect.bisect_right(self._sorted_latitudes, max_lat)
+        positions = []
+        for rank in range(first, last):
+            position = self._latitude_order[rank]
+            if position >= start and _in_bbox(self.latitudes[position], self.longitudes[position], bbox):
+                positions.append(position)
+        positions.sort()
+        return positions
+
+def _in_bbox(latitude: float, longitude: float, bbox: Tuple[float, float, float, float]) -> bool:
+    min_lat, min_lng, max_lat, max_lng = bbox
+    if not min_lat <= latitude <= max_lat:
+        return False
+    if min_lng <= max_lng:
+        return min_lng <= longitude <= max_lng
+    return longitude >= min_lng or longitude <= max_lng
+
+def _encoded_size(count: int, strings_length: int) -> int:
+    return HEADER.size + 5 * 8 * count + 4 * count + 2 * 4 * (count + 1) + strings_length
+
+def encode_snapshot(version: int, rows: Iterable[Tuple[int, str, str, float, float, float]]) -> bytes:
+    """
+    Encode courts into the snapshot layout.
+
+    Numbers are stored in the native byte order: snapshots are shared by the worker
+    processes of one host, not between hosts.
+
+    Args:
+        version (int): Catalog version the rows belong to
+        rows (Iterable[Tuple[int, str, str, float, float, float]]): (id, name, address,
+            latitude, longitude, price per hour) per court, in any order
+
+    Returns:
+        bytes: Encoded snapshot
+    """
+    rows = sorted(rows, key=lambda row: row[0])
+    # Names and addresses share one string area, all names first
+    strings = bytearray()
+    name_offsets = array('I', [0])
+    for row in rows:
+        strings += row[1].encode('utf-8')
+        name_offsets.append(len(strings))
+    address_offsets = array('I', [len(strings)])
+    for row in rows:
+        strings += row[2].encode('utf-8')
+        address_offsets.append(len(strings))
+    # Bbox queries bisect the sorted latitudes and only test the courts in that band
+    latitude_order = sorted(range(len(rows)), key=lambda position: rows[position][3])
+    sections = [array('q', (row[0] for row in rows)), array('d', (row[3] for row in rows)),
+                array('d', (row[4] for row in rows)), array('d', (row[5] for row in rows)),
+                array('d', (rows[position][3] for position in latitude_order)), array('I', latitude_order),
+                name_offsets, address_offsets]
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, version, len(rows), len(strings))
+    return b''.join([header, *(section.tobytes() for section in sections), bytes(strings)])
+
+def snapshot_directory() -> str:
+    """
+    Return the directory holding the snapshot files, creating it if needed.
+
+    Without CATALOG_SNAPSHOT_DIR, a directory under the system temp directory named
+    after the database URL is used, so the workers of one deployment share it and
+    other apps on the host never do.
+
+    Returns:
+        str: Snapshot directory
+    """
+    directory = current_app.config.get('CATALOG_SNAPSHOT_DIR')
+    if not directory:
+        database = current_app.config['SQLALCHEMY_DATABASE_URI']
+        directory = os.path.join(tempfile.gettempdir(),
+                                 f"court-catalog-{hashlib.sha1(database.encode('utf-8')).hexdigest()[:12]}")
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def _snapshot_path(directory: str, version: int) -> str:
+    return os.path.join(directory, f"catalog-{version}.snap")
+
+def write_snapshot(directory: str, version: int, rows: Iterable[Tuple[int, str, str, float, float, float]]) -> str:
+    """
+    Write the snapshot of a catalog version, replacing the file atomically.
+
+    Older versions are removed except the newest one before this, which workers may
+    still be attaching; workers that already mapped a removed file keep reading it.
+
+    Args:
+        directory (str): Snapshot directory
+        version (int): Catalog version the rows belong to
+        rows (Iterable[Tuple[int, str, str, float, float, float]]): Courts, as for encode_snapshot
+
+    Returns:
+        str: Path of the snapshot file
+    """
+    path = _snapshot_path(directory, version)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.catalog-')
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(encode_snapshot(version, rows))
+        os.replace(temporary, path)
+    except Exception:
+        os.unlink(temporary)
+        raise
+
+    older = []
+    for other in glob.glob(os.path.join(directory, 'catalog-*.snap')):
+        try:
+            other_version = int(os.path.basename(other)[len('catalog-'):-len('.snap')])
+        except ValueError:
+            continue
+        if other_version < version:
+            older.append((other_version, other))
+    for _, other in sorted(older)[:-1]:
+        try:
+            os.unlink(other)
+        except OSError:
+            pass
+    return path
+
+def _attach(path: str) -> CatalogSnapshot:
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return CatalogSnapshot(mapping)
+
+def _build(directory: str, version: int) -> str:
+    with primary_reads():
+        rows = db.session.query(TennisCourt.id, TennisCourt.name, TennisCourt.address, TennisCourt.latitude,
+                                TennisCourt.longitude, TennisCourt.price_per_hour).all()
+    path = write_snapshot(directory, version, rows)
+    logger.info(f"Wrote catalog snapshot version {version} with {len(rows)} courts")
+    return path
+
+_snapshot: Optional[CatalogSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+def get_catalog_snapshot(version: Optional[int] = None) -> CatalogSnapshot:
+    """
+    Return the snapshot of the current catalog, attaching or writing it when the
+    catalog version has moved on.
+
+    The first worker to see a new version writes its file; the others map it. A new
+    snapshot replaces the old one with a single reference assignment, so readers hold
+    either the old or the new snapshot, never a mix, and old mappings are released
+    once the last request using them finishes.
+
+    Args:
+        version (Optional[int]): Current catalog version, read from the database when
+            not given
+
+    Returns:
+        CatalogSnapshot: Snapshot of that version
+    """
+    global _snapshot
+    if version is None:
+        version = current_catalog_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        directory = snapshot_directory()
+        path = _snapshot_path(directory, version)
+        try:
+            snapshot = _attach(path)
+            if snapshot.version != version:
+                raise ValueError(f"{path} holds catalog version {snapshot.version}")
+        except (OSError, ValueError):
+            snapshot = _attach(_build(directory, version))
+        _snapshot = snapshot
+        return snapshot
+
+def reset_catalog_snapshot():
+    """Detach the snapshot so it is attached again on next use."""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
@@ -0,0 +1,209 @@
+import logging
+import threading
+from collections import Counter
+from math import log, pi, radians, sin
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from models.models import db, TennisCourt
+from services.catalog_cache import on_external_catalog_change
+from utils.db_engine import primary_reads
+from utils.db_events import on_commit
+
+logger = logging.getLogger(__name__)
+
+# Web Mercator cannot represent the poles
+MAX_MERCATOR_LATITUDE = 85.05112878
+
+class ClusterCell:
+    """Running aggregate of the courts falling into one grid cell."""
+
+    __slots__ = ('count', 'sum_lat', 'sum_lng', 'prices', 'min_price')
+
+    def __init__(self):
+        self.count = 0
+        self.sum_lat = 0.0
+        self.sum_lng = 0.0
+        self.prices: Counter = Counter()
+        self.min_price: Optional[float] = None
+
+    def add(self, latitude: float, longitude: float, price: float):
+        self.count += 1
+        self.sum_lat += latitude
+        self.sum_lng += longitude
+        self.prices[price] += 1
+        if self.min_price is None or price < self.min_price:
+            self.min_price = price
+
+    def remove(self, latitude: float, longitude: float, price: float):
+        self.count -= 1
+        self.sum_lat -= latitude
+        self.sum_lng -= longitude
+        self.prices[price] -= 1
+        if not self.prices[price]:
+            del self.prices[price]
+            if price == self.min_price:
+                self.min_price = min(self.prices) if self.prices else None
+
+class ClusterGrid:
+    """
+    Court aggregates for every map zoom level, on a hierarchy of Web Mercator grids.
+
+    At zoom z the world is 256 * 2^z pixels wide and cut into square cells of
+    `cell_pixels` pixels, so each cell of zoom z splits into four cells of zoom z + 1.
+    Adding or removing a court touches one cell per level.
+    """
+
+    def __init__(self, max_zoom: int = 14, cell_pixels: int = 64):
+        """
+        Initialize an empty grid.
+
+        Args:
+            max_zoom (int): Deepest zoom level that is aggregated
+            cell_pixels (int): Cell edge length in screen pixels
+        """
+        self.max_zoom = max_zoom
+        self.cell_pixels = cell_pixels
+        self._levels: List[Dict[Tuple[int, int], ClusterCell]] = [{} for _ in range(max_zoom + 1)]
+        self._courts: Dict[int, Tuple[float, float, float]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._courts)
+
+    def _cells_per_side(self, zoom: int) -> int:
+        return (256 << zoom) // self.cell_pixels
+
+    def _cell(self, latitude: float, longitude: float, zoom: int) -> Tuple[int, int]:
+        x, y = _world_position(latitude, longitude)
+        side = self._cells_per_side(zoom)
+        return min(int(x * side), side - 1), min(int(y * side), side - 1)
+
+    def add(self, court_id: int, latitude: float, longitude: float, price: float):
+        """
+        Add a court, replacing its previous position and price if it is already present.
+
+        Args:
+            court_id (int): ID of the court
+            latitude (float): Latitude of the court
+            longitude (float): Longitude of the court
+            price (float): Price per hour of the court
+        """
+        with self._lock:
+            self.remove(court_id)
+            for zoom, level in enumerate(self._levels):
+                key = self._cell(latitude, longitude, zoom)
+                cell = level.get(key)
+                if cell is None:
+                    cell = level[key] = ClusterCell()
+                cell.add(latitude, longitude, price)
+            self._courts[court_id] = (latitude, longitude, price)
+
+    def remove(self, court_id: int):
+        """
+        Remove a court if it is present.
+
+        Args:
+            court_id (int): ID of the court
+        """
+        with self._lock:
+            court = self._courts.pop(court_id, None)
+            if court is None:
+                return
+            latitude, longitude, price = court
+            for zoom, level in enumerate(self._levels):
+                key = self._cell(latitude, longitude, zoom)
+                cell = level[key]
+                cell.remove(latitude, longitude, price)
+                if not cell.count:
+                    del level[key]
+
+    def clusters(self, bbox: Tuple[float, float, float, float], zoom: int) -> List[Dict]:
+        """
+        Return the clusters intersecting a bounding box at a zoom level.
+
+        Args:
+            bbox (Tuple[float, float, float, float]): (min lat, min lng, max lat, max lng)
+            zoom (int): Map zoom level, clamped to [0, max_zoom]
+
+        Returns:
+            List[Dict]: Clusters with count, centroid and minimum price per hour
+        """
+        zoom = max(0, min(zoom, self.max_zoom))
+        min_lat, min_lng, max_lat, max_lng = bbox
+        # Mercator y grows southwards, so the north edge gives the smallest row
+        x0, y0 = self._cell(max_lat, min_lng, zoom)
+        x1, y1 = self._cell(min_lat, max_lng, zoom)
+
+        with self._lock:
+            level = self._levels[zoom]
+            if x1 < x0:
+                # Box crosses the antimeridian
+                columns = list(range(x0, self._cells_per_side(zoom))) + list(range(0, x1 + 1))
+            else:
+                columns = range(x0, x1 + 1)
+            if len(columns) * (y1 - y0 + 1) > len(level):
+                column_set = set(columns)
+                cells = [cell for (x, y), cell in level.items() if x in column_set and y0 <= y <= y1]
+            else:
+                cells = [level[(x, y)] for x in columns for y in range(y0, y1 + 1) if (x, y) in level]
+
+            return [
+                {
+                    'count': cell.count,
+                    'latitude': cell.sum_lat / cell.count,
+                    'longitude': cell.sum_lng / cell.count,
+                    'min_price': cell.min_price
+                }
+                for cell in cells
+            ]
+
+def _world_position(latitude: float, longitude: float) -> Tuple[float, float]:
+    """Project a coordinate in [-180, 180] longitude to Web Mercator world units in [0, 1)."""
+    latitude = max(-MAX_MERCATOR_LATITUDE, min(MAX_MERCATOR_LATITUDE, latitude))
+    x = (longitude + 180) / 360
+    sin_lat = sin(radians(latitude))
+    y = 0.5 - log((1 + sin_lat) / (1 - sin_lat)) / (4 * pi)
+    return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+_cluster_grid: Optional[ClusterGrid] = None
+_cluster_grid_lock = threading.Lock()
+
+def get_cluster_grid() -> ClusterGrid:
+    """
+    Return the process-wide cluster grid, building it from the database on first use.
+
+    Returns:
+        ClusterGrid: Court aggregates for every clustered zoom level
+    """
+    global _cluster_grid
+    if _cluster_grid is None:
+        with _cluster_grid_lock:
+            if _cluster_grid is None:
+                grid = ClusterGrid(current_app.config.get('CLUSTER_MAX_ZOOM', 14),
+                                   current_app.config.get('CLUSTER_CELL_PIXELS', 64))
+                with primary_reads():
+                    rows = db.session.query(TennisCourt.id, TennisCourt.latitude,
+                                            TennisCourt.longitude, TennisCourt.price_per_hour).all()
+                for court_id, latitude, longitude, price in rows:
+                    grid.add(court_id, latitude, longitude, price)
+                logger.info(f"Built cluster grid with {len(grid)} courts")
+                _cluster_grid = grid
+    return _cluster_grid
+
+def reset_cluster_grid():
+    """Drop the cluster grid so it is rebuilt from the database on next use."""
+    global _cluster_grid
+    with _cluster_grid_lock:
+        _cluster_grid = None
+
+def _sync_court(op: str, row: Dict, old: Optional[Dict]):
+    grid = _cluster_grid
+    if grid is None:
+        return
+    if op == 'delete':
+        grid.remove(row['id'])
+    else:
+        grid.add(row['id'], row['latitude'], row['longitude'], row['price_per_hour'])
+
+on_commit(TennisCourt, _sync_court)
+on_external_catalog_change(reset_cluster_grid)
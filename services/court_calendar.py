@@ -0,0 +1,357 @@
+import bisect
+import logging
+import threading
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models.models import db, Booking, CourtCalendarVersion, Match
+from utils.db_engine import primary_reads
+from utils.db_events import on_commit
+
+logger = logging.getLogger(__name__)
+
+# Reservations starting earlier than this before now cannot overlap new ones
+RESERVATION_LOOKBACK = timedelta(days=1)
+
+class CourtCalendar:
+    """
+    Start-ordered list of the active reservations on one court.
+
+    Reservations written before conflicts were checked may overlap each other, so
+    ends are not ordered like starts. The calendar remembers the longest reservation
+    it holds instead: nothing starting more than that before a time can still be
+    running at it, which bounds how far back an overlap search has to look.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[datetime, datetime, str, int]] = []
+        self._keys: Dict[Tuple[str, int], Tuple[datetime, datetime]] = {}
+        self._longest = timedelta(0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, kind: str, reservation_id: int, start: datetime, end: datetime):
+        """
+        Add a reservation, replacing any previous entry for the same reservation.
+
+        Args:
+            kind (str): 'booking' or 'match'
+            reservation_id (int): Primary key of the reservation
+            start (datetime): Start of the reservation
+            end (datetime): End of the reservation
+        """
+        self.remove(kind, reservation_id)
+        bisect.insort(self._entries, (start, end, kind, reservation_id))
+        self._keys[(kind, reservation_id)] = (start, end)
+        # Only ever grows, which keeps searches correct if a longer entry is removed
+        self._longest = max(self._longest, end - start)
+
+    def remove(self, kind: str, reservation_id: int):
+        """
+        Remove a reservation if it is present.
+
+        Args:
+            kind (str): 'booking' or 'match'
+            reservation_id (int): Primary key of the reservation
+        """
+        span = self._keys.pop((kind, reservation_id), None)
+        if span is None:
+            return
+        entry = (span[0], span[1], kind, reservation_id)
+        position = bisect.bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def overlapping(self, start: datetime, end: datetime) -> Optional[Tuple[str, int]]:
+        """
+        Find a reservation overlapping the half-open interval [start, end).
+
+        Args:
+            start (datetime): Start of the interval
+            end (datetime): End of the interval
+
+        Returns:
+            Optional[Tuple[str, int]]: (kind, id) of a conflicting reservation, or None
+        """
+        position = bisect.bisect_left(self._entries, (end,))
+        earliest = start - self._longest
+        while position > 0:
+            position -= 1
+            entry_start, entry_end, kind, reservation_id = self._entries[position]
+            if entry_start < earliest:
+                break
+            if entry_end > start:
+                return kind, reservation_id
+        return None
+
+    def between(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime, str, int]]:
+        """
+        List the reservations overlapping [start, end) in start order.
+
+        Args:
+            start (datetime): Start of the window
+            end (datetime): End of the window
+
+        Returns:
+            List[Tuple[datetime, datetime, str, int]]: (start, end, kind, id) entries
+        """
+        first = bisect.bisect_left(self._entries, (start - self._longest,))
+        last = bisect.bisect_left(self._entries, (end,))
+        return [entry for entry in self._entries[first:last] if entry[1] > start]
+
+class CalendarIndex:
+    """
+    Per-court calendars of bookings and matches, loaded from the database on first use.
+
+    Every transaction that changes a reservation bumps the CourtCalendarVersion row of
+    its court. A calendar remembers the version it was loaded at and is reloaded when
+    the row has moved on, so reservations written by other processes are seen; changes
+    committed by this process are applied in place by commit hooks instead.
+    """
+
+    def __init__(self):
+        self._calendars: Dict[int, CourtCalendar] = {}
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    def calendar(self, court_id: int) -> CourtCalendar:
+        """
+        Return the current calendar of a court, (re)loading it if needed.
+
+        Args:
+            court_id (int): ID of the court
+
+        Returns:
+            CourtCalendar: Calendar of the court
+        """
+        return self.calendars([court_id])[court_id]
+
+    def calendars(self, court_ids: Iterable[int]) -> Dict[int, CourtCalendar]:
+        """
+        Return the current calendars of several courts.
+
+        Costs one primary-key query for the versions, plus one query per reservation
+        type for the courts whose calendars are missing or out of date.
+
+        Args:
+            court_ids (Iterable[int]): IDs of the courts
+
+        Returns:
+            Dict[int, CourtCalendar]: Calendar by court ID
+        """
+        court_ids = set(court_ids)
+        with primary_reads():
+            versions = dict(db.session.execute(
+                select(CourtCalendarVersion.court_id, CourtCalendarVersion.version)
+                .where(CourtCalendarVersion.court_id.in_(court_ids))
+            ).all())
+        with self._lock:
+            stale = [court_id for court_id in court_ids
+                     if court_id in self._calendars and self._versions.get(court_id) != versions.get(court_id, 0)]
+            for court_id in stale:
+                del self._calendars[court_id]
+            self.preload(court_ids, versions)
+            return {court_id: self._calendars[court_id] for court_id in court_ids}
+
+    def preload(self, court_ids: Iterable[int], versions: Optional[Dict[int, int]] = None):
+        """
+        Load the calendars of several courts with one query per reservation type.
+
+        Args:
+            court_ids (Iterable[int]): IDs of the courts
+            versions (Optional[Dict[int, int]]): Calendar versions read before this call,
+                read here when not given
+        """
+        with self._lock:
+            missing = [court_id for court_id in set(court_ids) if court_id not in self._calendars]
+            if not missing:
+                return
+            since = datetime.now() - RESERVATION_LOOKBACK
+            calendars = {court_id: CourtCalendar() for court_id in missing}
+            # Read from the primary: calendars are only kept current by commit hooks
+            # and version checks against the primary
+            with primary_reads():
+                if versions is None:
+                    versions = dict(db.session.execute(
+                        select(CourtCalendarVersion.court_id, CourtCalendarVersion.version)
+                        .where(CourtCalendarVersion.court_id.in_(missing))
+                    ).all())
+                bookings = db.session.query(
+                    Booking.tennis_court_id, Booking.id, Booking.booking_time, Booking.end_time
+                ).filter(
+                    Booking.tennis_court_id.in_(missing),
+                    Booking.status != 'cancelled',
+                    Booking.booking_time >= since
+                ).all()
+                matches = db.session.query(
+                    Match.court_id, Match.id, Match.match_time, Match.end_time
+                ).filter(
+                    Match.court_id.in_(missing),
+                    Match.status != 'cancelled',
+                    Match.match_time >= since
+                ).all()
+            for court_id, booking_id, start, end in bookings:
+                calendars[court_id].add('booking', booking_id, start, end)
+            for court_id, match_id, start, end in matches:
+                calendars[court_id].add('match', match_id, start, end)
+            self._calendars.update(calendars)
+            # The versions were read before the rows, so a change in between only
+            # makes the next check reload once more
+            for court_id in missing:
+                self._versions[court_id] = versions.get(court_id, 0)
+
+    def has_conflict(self, court_id: int, start: datetime, end: datetime) -> bool:
+        """
+        Check whether [start, end) overlaps an active reservation on a court.
+
+        Args:
+            court_id (int): ID of the court
+            start (datetime): Start of the proposed reservation
+            end (datetime): End of the proposed reservation
+
+        Returns:
+            bool: True if there is a conflict
+        """
+        calendar = self.calendar(court_id)
+        with self._lock:
+            return calendar.overlapping(start, end) is not None
+
+    def apply(self, kind: str, op: str, court_id: int, reservation_id: int,
+              start: datetime, end: datetime, status: str, old_court_id: Optional[int] = None):
+        """
+        Apply a committed change to the calendars that are already loaded.
+
+        Args:
+            kind (str): 'booking' or 'match'
+            op (str): 'insert', 'update' or 'delete'
+            court_id (int): Court the reservation is on
+            reservation_id (int): Primary key of the reservation
+            start (datetime): Start of the reservation
+            end (datetime): End of the reservation
+            status (str): Reservation status
+            old_court_id (Optional[int]): Previous court when the reservation moved
+        """
+        with self._lock:
+            if old_court_id is not None and old_court_id in self._calendars:
+                self._calendars[old_court_id].remove(kind, reservation_id)
+            calendar = self._calendars.get(court_id)
+            if calendar is None:
+                return
+            if op == 'delete' or status == 'cancelled':
+                calendar.remove(kind, reservation_id)
+            else:
+                calendar.add(kind, reservation_id, start, end)
+
+    def adopt_versions(self, versions: Dict[int, int]):
+        """
+        Record the calendar versions bumped by a transaction this process committed.
+
+        The commit hooks already applied that transaction to the loaded calendars, so a
+        calendar moves to the new version only when it was exactly one version behind;
+        otherwise another process changed the court too and the calendar is dropped.
+
+        Args:
+            versions (Dict[int, int]): New version by court ID
+        """
+        with self._lock:
+            for court_id, version in versions.items():
+                if court_id not in self._calendars:
+                    continue
+                if self._versions.get(court_id) == version - 1:
+                    self._versions[court_id] = version
+                else:
+                    del self._calendars[court_id]
+
+    def reset(self):
+        """Forget all loaded calendars."""
+        with self._lock:
+            self._calendars.clear()
+            self._versions.clear()
+
+_calendar_index = CalendarIndex()
+
+def get_calendar_index() -> CalendarIndex:
+    """Return the process-wide court calendar index."""
+    return _calendar_index
+
+def _sync_booking(op: str, row: Dict, old: Optional[Dict]):
+    _calendar_index.apply('booking', op, row['tennis_court_id'], row['id'], row['booking_time'],
+                          row['end_time'], row['status'], (old or {}).get('tennis_court_id'))
+
+def _sync_match(op: str, row: Dict, old: Optional[Dict]):
+    _calendar_index.apply('match', op, row['court_id'], row['id'], row['match_time'],
+                          row['end_time'], row['status'], (old or {}).get('court_id'))
+
+def bump_calendar_versions(connection, court_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Increment the calendar version of courts inside the caller's transaction.
+
+    Called automatically when bookings or matches are flushed through the ORM; Core
+    writes to reservations that can still be in a calendar must call it themselves.
+
+    Args:
+        connection: Connection of the transaction that changed the reservations
+        court_ids (Iterable[int]): Courts whose reservations changed
+
+    Returns:
+        Dict[int, int]: New version by court ID
+    """
+    court_ids = sorted(set(court_ids))
+    table = CourtCalendarVersion.__table__
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(connection.dialect.name)
+    if dialect is not None:
+        statement = dialect.insert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=['court_id'], set_={'version': table.c.version + 1}
+        ), [{'court_id': court_id, 'version': 1} for court_id in court_ids])
+    else:
+        for court_id in court_ids:
+            result = connection.execute(
+                update(table).where(table.c.court_id == court_id).values(version=table.c.version + 1)
+            )
+            if result.rowcount == 0:
+                connection.execute(insert(table).values(court_id=court_id, version=1))
+    return dict(connection.execute(
+        select(table.c.court_id, table.c.version).where(table.c.court_id.in_(court_ids))
+    ).all())
+
+# Column holding the court of each reservation model
+_COURT_ATTRS = {Booking: 'tennis_court_id', Match: 'court_id'}
+
+_VERSIONS_KEY = 'calendar_versions'
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_reservation_change(session, flush_context):
+    court_ids = set()
+    for obj in chain(session.new, session.deleted,
+                     (obj for obj in session.dirty if session.is_modified(obj))):
+        attr = _COURT_ATTRS.get(type(obj))
+        if attr is None:
+            continue
+        court_ids.add(getattr(obj, attr))
+        # A reservation moved to another court changes both calendars
+        court_ids.update(inspect(obj).attrs[attr].history.deleted)
+    court_ids.discard(None)
+    if not court_ids:
+        return
+    versions = session.info.setdefault(_VERSIONS_KEY, {})
+    for court_id, version in bump_calendar_versions(session.connection(), court_ids).items():
+        # Flushed twice in one transaction: report a jump of two so the calendar reloads
+        versions[court_id] = version + 1 if court_id in versions else version
+
+@event.listens_for(Session, 'after_commit')
+def _adopt_local_versions(session):
+    versions = session.info.pop(_VERSIONS_KEY, None)
+    if versions:
+        _calendar_index.adopt_versions(versions)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_local_versions(session):
+    session.info.pop(_VERSIONS_KEY, None)
+
+on_commit(Booking, _sync_booking)
+on_commit(Match, _sync_match)
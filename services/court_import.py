@@ -0,0 +1,223 @@
+import csv
+import json
+import logging
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import bindparam, func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models.models import db, TennisCourt
+from services.catalog_cache import bump_catalog_version, reload_catalog_caches
+from services.geocoding import get_geocoder
+from services.opening_hours import OpeningHours
+
+logger = logging.getLogger(__name__)
+
+COURT_FIELDS = ('name', 'address', 'latitude', 'longitude', 'available_hours', 'price_per_hour')
+
+class ImportStats:
+    """Counters reported at the end of an import."""
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.read} rows read, {self.inserted} inserted, {self.updated} updated, "
+                f"{self.rejected} rejected in {self.elapsed:.1f}s ({self.rows_per_second:.0f} rows/s)")
+
+def read_rows(path: str, file_format: Optional[str] = None) -> Iterator[Tuple[int, Dict]]:
+    """
+    Stream raw rows from a CSV or JSON Lines feed.
+
+    Args:
+        path (str): Path of the feed
+        file_format (Optional[str]): 'csv' or 'jsonl', guessed from the extension if omitted
+
+    Yields:
+        Tuple[int, Dict]: (line number, raw row)
+    """
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+
+def validate_row(raw: Dict) -> Dict:
+    """
+    Convert a raw feed row to TennisCourt column values.
+
+    Args:
+        raw (Dict): Row as read from the feed
+
+    Returns:
+        Dict: Clean column values
+
+    Raises:
+        ValueError: If a field is missing or invalid
+    """
+    name = (raw.get('name') or '').strip()
+    address = (raw.get('address') or '').strip()
+    if not name or not address:
+        raise ValueError('name and address are required')
+    if len(name) > 120 or len(address) > 200:
+        raise ValueError('name or address is too long')
+
+    latitude = float(raw['latitude'])
+    longitude = float(raw['longitude'])
+    price = float(raw['price_per_hour'])
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise ValueError('coordinates out of range')
+    if price < 0:
+        raise ValueError('price_per_hour must not be negative')
+
+    available_hours = raw.get('available_hours') or None
+    if isinstance(available_hours, dict):
+        available_hours = json.dumps(available_hours)
+    if available_hours is not None:
+        OpeningHours.compile(available_hours)
+        if len(available_hours) > 200:
+            raise ValueError('available_hours is too long')
+
+    return {
+        'name': name,
+        'address': address,
+        'latitude': latitude,
+        'longitude': longitude,
+        'available_hours': available_hours,
+        'price_per_hour': price
+    }
+
+def _geocode_missing(rows: List[Tuple[int, Dict]]):
+    """Fill in coordinates for rows that only have an address, with one batch lookup."""
+    missing = [raw for _, raw in rows
+               if raw.get('address') and (raw.get('latitude') in (None, '') or raw.get('longitude') in (None, ''))]
+    if not missing:
+        return
+    results = get_geocoder().geocode_many(raw['address'] for raw in missing)
+    for raw in missing:
+        coords = results.get(raw['address'])
+        if coords:
+            raw['latitude'], raw['longitude'] = coords['lat'], coords['lng']
+
+def _chunks(rows: Iterable[Tuple[int, Dict]], size: int) -> Iterator[List[Tuple[int, Dict]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _batches(rows: Iterable[Tuple[int, Dict]], batch_size: int, stats: ImportStats,
+             strict: bool) -> Iterator[List[Dict]]:
+    for chunk in _chunks(rows, batch_size):
+        _geocode_missing(chunk)
+        batch: Dict[Tuple[str, str], Dict] = {}
+        for line_number, raw in chunk:
+            stats.read += 1
+            try:
+                court = validate_row(raw)
+            except (KeyError, TypeError, ValueError) as e:
+                stats.rejected += 1
+                if strict:
+                    raise ValueError(f"Invalid row at line {line_number}: {str(e)}")
+                logger.warning(f"Skipping invalid row at line {line_number}: {str(e)}")
+                continue
+            # Later rows for the same court win
+            batch[(court['name'], court['address'])] = court
+        if batch:
+            yield list(batch.values())
+
+def _upsert_courts(connection, batch: List[Dict]):
+    """Insert new courts and update existing ones, matched on the unique (name, address)."""
+    table = TennisCourt.__table__
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(connection.dialect.name)
+    if dialect is not None:
+        statement = dialect.insert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=['name', 'address'],
+            set_={field: statement.excluded[field] for field in COURT_FIELDS if field not in ('name', 'address')}
+        ), batch)
+        return
+    # Other backends: look the keys up inside the transaction, then insert or update
+    keys = [(court['name'], court['address']) for court in batch]
+    existing = {
+        (name, address): court_id
+        for court_id, name, address in connection.execute(
+            select(table.c.id, table.c.name, table.c.address).where(
+                tuple_(table.c.name, table.c.address).in_(keys)
+            )
+        )
+    }
+    new_courts = [court for court in batch if (court['name'], court['address']) not in existing]
+    changed_courts = [
+        dict({f'new_{field}': court[field] for field in COURT_FIELDS},
+             court_id=existing[(court['name'], court['address'])])
+        for court in batch if (court['name'], court['address']) in existing
+    ]
+    if new_courts:
+        connection.execute(insert(table), new_courts)
+    if changed_courts:
+        connection.execute(update(table).where(table.c.id == bindparam('court_id')).values(
+            {field: bindparam(f'new_{field}') for field in COURT_FIELDS}
+        ), changed_courts)
+
+def import_courts(path: str, file_format: Optional[str] = None, batch_size: int = 1000,
+                  strict: bool = False) -> ImportStats:
+    """
+    Upsert the courts of a CSV or JSON Lines feed, keyed on (name, address).
+
+    Rows without coordinates are geocoded from their address, one batch at a time.
+
+    The whole feed is loaded in one transaction with one INSERT .. ON CONFLICT
+    (name, address) DO UPDATE per batch, so concurrent imports cannot create
+    duplicates and a failure leaves the catalog untouched. In-memory court caches
+    are rebuilt once at the end instead of per row.
+
+    Args:
+        path (str): Path of the feed
+        file_format (Optional[str]): 'csv' or 'jsonl', guessed from the extension if omitted
+        batch_size (int): Rows validated and written per batch
+        strict (bool): Abort on the first invalid row instead of skipping it
+
+    Returns:
+        ImportStats: Row counts and throughput
+    """
+    table = TennisCourt.__table__
+    stats = ImportStats()
+
+    with db.engine.begin() as connection:
+        for batch in _batches(read_rows(path, file_format), batch_size, stats, strict):
+            # New courts get ids above the largest one, which tells them apart from updates
+            last_id = connection.execute(select(func.max(table.c.id))).scalar() or 0
+            _upsert_courts(connection, batch)
+            inserted = connection.execute(
+                select(func.count()).select_from(table).where(table.c.id > last_id)
+            ).scalar()
+            stats.inserted += inserted
+            stats.updated += len(batch) - inserted
+            logger.info(f"Imported {stats.read} rows ({stats.rows_per_second:.0f} rows/s)")
+
+        if stats.inserted or stats.updated:
+            bump_catalog_version(connection)
+
+    reload_catalog_caches()
+    logger.info(f"Court import finished: {stats}")
+    return stats
@@ -0,0 +1,103 @@
+from math import radians, sin, cos, sqrt, atan2
+from typing import List, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Earth's radius in kilometers
+EARTH_RADIUS_KM = 6371
+
+# Length of one degree of latitude in kilometers
+KM_PER_DEGREE = 111.195
+
+# Rows of a distance matrix computed per NumPy pass, to bound temporary memory
+MATRIX_CHUNK_ROWS = 1024
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Calculate the distance between two points using the Haversine formula.
+
+    Args:
+        lat1 (float): Latitude of first point
+        lon1 (float): Longitude of first point
+        lat2 (float): Latitude of second point
+        lon2 (float): Longitude of second point
+
+    Returns:
+        float: Distance in kilometers
+    """
+    lat1, lon1 = radians(lat1), radians(lon1)
+    lat2, lon2 = radians(lat2), radians(lon2)
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * atan2(sqrt(a), sqrt(1-a))
+
+    return EARTH_RADIUS_KM * c
+
+def haversine_many(latitude: float, longitude: float,
+                   latitudes: Sequence[float], longitudes: Sequence[float],
+                   use_numpy: bool = True) -> Union[List[float], 'np.ndarray']:
+    """
+    Calculate the distances from one origin to many points.
+
+    Uses a single vectorized NumPy pass when NumPy is installed and falls back to
+    `haversine_km` per point otherwise; both paths return the same values.
+
+    Args:
+        latitude (float): Latitude of the origin
+        longitude (float): Longitude of the origin
+        latitudes (Sequence[float]): Latitudes of the points
+        longitudes (Sequence[float]): Longitudes of the points
+        use_numpy (bool): Set to False to force the pure-Python path
+
+    Returns:
+        Union[List[float], np.ndarray]: Distances in kilometers, in input order
+            (a NumPy array when NumPy was used, a list otherwise)
+    """
+    if np is None or not use_numpy:
+        return [haversine_km(latitude, longitude, lat, lng) for lat, lng in zip(latitudes, longitudes)]
+
+    lat1 = np.radians(latitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(longitudes, dtype=np.float64)) - np.radians(longitude)
+    return _haversine_from_deltas(lat1, lat2, dlat, dlon)
+
+def distance_matrix(origins: Sequence[Tuple[float, float]], points: Sequence[Tuple[float, float]],
+                    use_numpy: bool = True) -> Union[List[List[float]], 'np.ndarray']:
+    """
+    Calculate the distances between every origin and every point.
+
+    Args:
+        origins (Sequence[Tuple[float, float]]): (latitude, longitude) of each origin
+        points (Sequence[Tuple[float, float]]): (latitude, longitude) of each point
+        use_numpy (bool): Set to False to force the pure-Python path
+
+    Returns:
+        Union[List[List[float]], np.ndarray]: len(origins) x len(points) distances in
+            kilometers (a NumPy array when NumPy was used, nested lists otherwise)
+    """
+    if np is None or not use_numpy:
+        latitudes = [lat for lat, _ in points]
+        longitudes = [lng for _, lng in points]
+        return [haversine_many(lat, lng, latitudes, longitudes, use_numpy=False) for lat, lng in origins]
+
+    origin_coords = np.radians(np.asarray(origins, dtype=np.float64).reshape(-1, 2))
+    point_coords = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    lat2, lon2 = point_coords[:, 0], point_coords[:, 1]
+
+    result = np.empty((len(origin_coords), len(point_coords)), dtype=np.float64)
+    for start in range(0, len(origin_coords), MATRIX_CHUNK_ROWS):
+        block = origin_coords[start:start + MATRIX_CHUNK_ROWS]
+        lat1 = block[:, 0:1]
+        result[start:start + len(block)] = _haversine_from_deltas(lat1, lat2, lat2 - lat1, lon2 - block[:, 1:2])
+    return result
+
+def _haversine_from_deltas(lat1, lat2, dlat, dlon):
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
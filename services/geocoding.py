@@ -0,0 +1,313 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+from utils.cache import LRUCache
+from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+Coordinates = Dict[str, float]
+
+_MISSING = object()
+
+def normalize_address(address: str) -> str:
+    """
+    Normalize an address so trivially different spellings share a cache entry.
+
+    Args:
+        address (str): Address as typed or imported
+
+    Returns:
+        str: Lowercased address with collapsed whitespace and punctuation
+    """
+    address = re.sub(r'[^\w\s,#-]', ' ', address.lower())
+    address = re.sub(r'\s*,\s*', ', ', address)
+    return re.sub(r'\s+', ' ', address).strip(' ,')
+
+class GeocodingBackend:
+    """Provider that turns a normalized address into coordinates."""
+
+    # Name results are stored under, so switching providers never serves another's answers
+    name = 'backend'
+    # Whether results are worth keeping in the persistent store
+    persistent = True
+
+    def geocode(self, address: str, session: requests.Session) -> Optional[Coordinates]:
+        """
+        Look up one address.
+
+        Args:
+            address (str): Normalized address
+            session (requests.Session): Pooled HTTP session to use
+
+        Returns:
+            Optional[Coordinates]: Dictionary with 'lat' and 'lng', or None if not found
+        """
+        raise NotImplementedError
+
+class GoogleGeocodingBackend(GeocodingBackend):
+    """Google Maps Geocoding API."""
+
+    URL = 'https://maps.googleapis.com/maps/api/geocode/json'
+    name = 'google'
+
+    def __init__(self, api_key: str, timeout: float = 5.0):
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def geocode(self, address: str, session: requests.Session) -> Optional[Coordinates]:
+        response = session.get(self.URL, params={'address': address, 'key': self.api_key},
+                               timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if data.get('status') == 'ZERO_RESULTS':
+            return None
+        if data.get('status') != 'OK':
+            raise RuntimeError(f"Geocoding failed with status {data.get('status')}")
+        location = data['results'][0]['geometry']['location']
+        return {'lat': float(location['lat']), 'lng': float(location['lng'])}
+
+class OfflineGeocodingBackend(GeocodingBackend):
+    """Local stand-in that answers from a fixed table, for tests and offline development."""
+
+    name = 'offline'
+    # Its misses only mean the table is incomplete, so nothing it says is stored
+    persistent = False
+
+    def __init__(self, known: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Initialize the backend.
+
+        Args:
+            known (Optional[Dict[str, Tuple[float, float]]]): (lat, lng) by address
+        """
+        self.known = {normalize_address(address): coords for address, coords in (known or {}).items()}
+        self.calls = 0
+
+    def geocode(self, address: str, session: requests.Session) -> Optional[Coordinates]:
+        self.calls += 1
+        coords = self.known.get(address)
+        if coords is None:
+            return None
+        return {'lat': coords[0], 'lng': coords[1]}
+
+class GeocodeStore:
+    """
+    Persistent geocoding results in a SQLite file, keyed by backend and normalized address.
+
+    Found coordinates are kept indefinitely. Addresses the provider could not find are
+    only trusted for `miss_ttl` seconds after they were fetched, so addresses added to
+    the provider later are picked up.
+    """
+
+    def __init__(self, path: str, backend: str, miss_ttl: Optional[float] = None):
+        """
+        Open the store, creating its table if needed.
+
+        Args:
+            path (str): SQLite database file
+            backend (str): Name of the backend whose results are stored
+            miss_ttl (Optional[float]): Seconds a miss is trusted, None for no expiry
+        """
+        self.backend = backend
+        self.miss_ttl = miss_ttl
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS geocode_results ('
+                'backend TEXT NOT NULL, address TEXT NOT NULL, lat REAL, lng REAL, fetched_at REAL NOT NULL, '
+                'PRIMARY KEY (backend, address))'
+            )
+
+    def get_many(self, addresses: List[str]) -> Dict[str, Optional[Coordinates]]:
+        """
+        Read the stored results of several addresses.
+
+        Args:
+            addresses (List[str]): Normalized addresses
+
+        Returns:
+            Dict[str, Optional[Coordinates]]: Results by address for the addresses that are
+                stored; None marks an address the provider could not find recently
+        """
+        found = {}
+        misses_since = time.time() - self.miss_ttl if self.miss_ttl is not None else float('-inf')
+        with self._lock:
+            for start in range(0, len(addresses), 500):
+                chunk = addresses[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._connection.execute(
+                    'SELECT address, lat, lng, fetched_at FROM geocode_results '
+                    f'WHERE backend = ? AND address IN ({placeholders})', [self.backend, *chunk]
+                )
+                for address, lat, lng, fetched_at in rows:
+                    if lat is not None:
+                        found[address] = {'lat': lat, 'lng': lng}
+                    elif fetched_at >= misses_since:
+                        found[address] = None
+        return found
+
+    def set_many(self, results: Dict[str, Optional[Coordinates]]):
+        """
+        Store the results of several addresses.
+
+        Args:
+            results (Dict[str, Optional[Coordinates]]): Results by normalized address
+        """
+        now = time.time()
+        rows = [
+            (self.backend, address, coords['lat'] if coords else None, coords['lng'] if coords else None, now)
+            for address, coords in results.items()
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO geocode_results VALUES (?, ?, ?, ?, ?)', rows)
+
+class Geocoder:
+    """
+    Geocoding with an in-process LRU in front of a persistent store and a provider backend.
+
+    Batch lookups are deduplicated and the provider calls that remain run concurrently
+    on a bounded thread pool sharing one pooled HTTP session.
+    """
+
+    def __init__(self, backend: GeocodingBackend, store: Optional[GeocodeStore] = None,
+                 cache_size: int = 10000, max_workers: int = 8, miss_ttl: Optional[float] = None):
+        """
+        Initialize the geocoder.
+
+        Args:
+            backend (GeocodingBackend): Provider used on cache misses
+            store (Optional[GeocodeStore]): Persistent cache, if any
+            cache_size (int): Entries kept in the in-process LRU
+            max_workers (int): Maximum concurrent provider calls
+            miss_ttl (Optional[float]): Seconds an address the provider could not find
+                is remembered in process, None for no expiry
+        """
+        self.backend = backend
+        self.store = store
+        self.cache = LRUCache(cache_size)
+        self.misses = LRUCache(cache_size, miss_ttl)
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='geocoder')
+
+    def geocode(self, address: str) -> Optional[Coordinates]:
+        """
+        Convert an address to coordinates.
+
+        Args:
+            address (str): The address to geocode
+
+        Returns:
+            Optional[Coordinates]: Dictionary with 'lat' and 'lng' if successful
+        """
+        return self.geocode_many([address]).get(address)
+
+    def geocode_many(self, addresses: Iterable[str]) -> Dict[str, Optional[Coordinates]]:
+        """
+        Convert many addresses to coordinates in one batch.
+
+        Args:
+            addresses (Iterable[str]): Addresses to geocode, duplicates allowed
+
+        Returns:
+            Dict[str, Optional[Coordinates]]: Coordinates (or None) by original address
+        """
+        addresses = list(addresses)
+        normalized = {address: normalize_address(address) for address in addresses}
+
+        results: Dict[str, Optional[Coordinates]] = {}
+        missing = []
+        for key in set(normalized.values()):
+            cached = self.cache.get(key, _MISSING)
+            if cached is _MISSING and self.misses.get(key, _MISSING) is _MISSING:
+                missing.append(key)
+            else:
+                results[key] = None if cached is _MISSING else cached
+
+        if missing and self.store is not None:
+            stored = self.store.get_many(missing)
+            for key, coords in stored.items():
+                results[key] = coords
+                self._remember(key, coords)
+            missing = [key for key in missing if key not in stored]
+
+        if missing:
+            fetched = {}
+            for key, coords in zip(missing, self._executor.map(self._fetch, missing)):
+                if coords is not _MISSING:
+                    fetched[key] = coords
+                    self._remember(key, coords)
+                results[key] = None if coords is _MISSING else coords
+            if fetched and self.store is not None:
+                self.store.set_many(fetched)
+
+        return {address: results.get(normalized[address]) for address in addresses}
+
+    def _remember(self, address: str, coords: Optional[Coordinates]):
+        if coords is None:
+            self.misses.set(address, None)
+        else:
+            self.cache.set(address, coords)
+
+    def _fetch(self, address: str):
+        """Call the backend, returning _MISSING on errors so failures are not cached."""
+        if not address:
+            return None
+        try:
+            return self.backend.geocode(address, self.session)
+        except Exception as e:
+            logger.error(f"Error geocoding address {address!r}: {str(e)}")
+            return _MISSING
+
+_geocoder: Optional[Geocoder] = None
+_geocoder_lock = threading.Lock()
+
+def get_geocoder() -> Geocoder:
+    """
+    Return the process-wide geocoder, configured from the app config on first use.
+
+    Returns:
+        Geocoder: Shared geocoder
+    """
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                config = current_app.config
+                if config.get('GEOCODER_BACKEND') == 'google':
+                    backend = GoogleGeocodingBackend(config['MAPS_API_KEY'])
+                else:
+                    backend = OfflineGeocodingBackend()
+                path = config.get('GEOCODE_CACHE_PATH')
+                miss_ttl = config.get('GEOCODE_MISS_TTL')
+                store = GeocodeStore(path, backend.name, miss_ttl) if path and backend.persistent else None
+                _geocoder = Geocoder(backend, store,
+                                     config.get('GEOCODE_CACHE_SIZE', 10000),
+                                     config.get('GEOCODE_MAX_WORKERS', 8),
+                                     miss_ttl)
+    return _geocoder
+
+def set_geocoder(geocoder: Optional[Geocoder]):
+    """
+    Replace the process-wide geocoder, e.g. with an offline one in tests.
+
+    Args:
+        geocoder (Optional[Geocoder]): Geocoder to use, None to rebuild from the config
+    """
+    global _geocoder
+    with _geocoder_lock:
+        _geocoder = geocoder
+
+get_metrics().register_cache('geocodes', lambda: _geocoder.cache.stats() if _geocoder else None)
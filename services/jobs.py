@@ -0,0 +1,606 @@
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import and_, delete, event, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+from models.models import db, Job
+from utils.metrics import Gauge, LATENCY_BUCKETS, get_metrics
+
+logger = logging.getLogger(__name__)
+
+JOB_LATENCY_BUCKETS = LATENCY_BUCKETS + (30.0, 60.0, 300.0, 900.0)
+
+_metrics = get_metrics()
+JOBS = _metrics.counter('jobs_total', 'Jobs handled, by outcome (done, retried or failed)', ('kind', 'outcome'))
+JOB_LATENCY = _metrics.histogram('job_latency_seconds', 'Time from enqueueing a job to its completion',
+                                 ('kind',), JOB_LATENCY_BUCKETS)
+JOB_RUN_TIME = _metrics.histogram('job_run_seconds', 'Time spent running a batch of jobs', ('kind',))
+
+class JobHandler:
+    """A registered job: the function running it and its retry policy."""
+
+    def __init__(self, kind: str, function: Callable, batch: bool, max_attempts: Optional[int]):
+        self.kind = kind
+        self.function = function
+        self.batch = batch
+        self.max_attempts = max_attempts
+
+_handlers: Dict[str, JobHandler] = {}
+
+def job(kind: str, batch: bool = False, max_attempts: Optional[int] = None):
+    """
+    Register a function as the handler of a job kind.
+
+    Batch handlers are called with the payloads of all claimed jobs of their kind at
+    once and fail or succeed as a whole; other handlers get one payload per call.
+
+    Args:
+        kind (str): Name passed to enqueue
+        batch (bool): Whether the handler takes a list of payloads
+        max_attempts (Optional[int]): Attempts before the job is marked failed,
+            JOB_MAX_ATTEMPTS when not given
+    """
+    def register(function):
+        _handlers[kind] = JobHandler(kind, function, batch, max_attempts)
+        return function
+    return register
+
+def backoff_seconds(attempts: int, base: float, cap: float) -> float:
+    """
+    Delay before retrying a job: exponential in the attempts made, capped, with jitter.
+
+    Args:
+        attempts (int): Attempts made so far
+        base (float): Delay after the first attempt
+        cap (float): Maximum delay
+
+    Returns:
+        float: Seconds to wait
+    """
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+class ClaimedJob:
+    """A job taken by a worker."""
+
+    def __init__(self, id: int, kind: str, payload: Dict[str, Any], attempts: int,
+                 max_attempts: int, created_at: datetime):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.created_at = created_at
+
+class JobQueue:
+    """Interface shared by the durable and the in-process queue."""
+
+    def __init__(self, max_attempts: int = 5, backoff: float = 5.0, backoff_cap: float = 600.0):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+
+    def _max_attempts(self, kind: str) -> int:
+        handler = _handlers.get(kind)
+        if handler is not None and handler.max_attempts:
+            return handler.max_attempts
+        return self.max_attempts
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], delay: float = 0.0):
+        """
+        Add a job in a transaction of its own; it runs once `delay` seconds have passed.
+
+        Args:
+            kind (str): Registered job kind
+            payload (Dict[str, Any]): JSON-serializable arguments
+            delay (float): Seconds before the job may run
+        """
+        raise NotImplementedError
+
+    def stage(self, session, kind: str, payload: Dict[str, Any], delay: float = 0.0):
+        """
+        Add a job to a session's transaction, so it is queued only if that commits.
+
+        Args:
+            session: Session of the transaction the job belongs to
+            kind (str): Registered job kind
+            payload (Dict[str, Any]): JSON-serializable arguments
+            delay (float): Seconds before the job may run
+        """
+        raise NotImplementedError
+
+    def committed(self, staged: List[Tuple[str, Dict[str, Any], float]]):
+        """Called after a transaction that staged jobs has committed."""
+
+    def claim(self, worker: str, limit: int) -> List[ClaimedJob]:
+        """Take up to `limit` due jobs for a worker."""
+        raise NotImplementedError
+
+    def complete(self, jobs: List[ClaimedJob]):
+        """Remove finished jobs."""
+        raise NotImplementedError
+
+    def fail(self, jobs: List[ClaimedJob], error: str) -> List[bool]:
+        """Schedule failed jobs for a retry; returns, per job, whether it will be retried."""
+        raise NotImplementedError
+
+    def depth(self) -> Dict[Tuple[str, str], int]:
+        """Count jobs by (kind, status)."""
+        raise NotImplementedError
+
+    def purge_failed(self, before: datetime) -> int:
+        """Delete jobs that failed for good before a time; returns how many were deleted."""
+        raise NotImplementedError
+
+class DatabaseJobQueue(JobQueue):
+    """
+    Durable queue kept in the job table.
+
+    Workers claim due jobs with a single UPDATE that only matches rows still pending,
+    so several threads or processes can poll the same table without taking a job twice.
+    A job whose worker died is taken again once its lock is older than `lock_timeout`.
+    """
+
+    def __init__(self, max_attempts: int = 5, backoff: float = 5.0, backoff_cap: float = 600.0,
+                 lock_timeout: float = 300.0):
+        super().__init__(max_attempts, backoff, backoff_cap)
+        self.lock_timeout = lock_timeout
+
+    def _row(self, kind: str, payload: Dict[str, Any], delay: float) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        return {'kind': kind, 'payload': json.dumps(payload), 'max_attempts': self._max_attempts(kind),
+                'run_at': now + timedelta(seconds=delay), 'created_at': now}
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], delay: float = 0.0):
+        # Own connection, so whatever else is pending in the request's session is left alone
+        with db.engine.begin() as connection:
+            connection.execute(insert(Job).values(**self._row(kind, payload, delay)))
+
+    def stage(self, session, kind: str, payload: Dict[str, Any], delay: float = 0.0):
+        session.add(Job(**self._row(kind, payload, delay)))
+
+    def claim(self, worker: str, limit: int) -> List[ClaimedJob]:
+        now = datetime.utcnow()
+        token = f'{worker}:{uuid.uuid4().hex[:12]}'
+        due = or_(
+            and_(Job.status == 'pending', Job.run_at <= now),
+            and_(Job.status == 'running', Job.locked_at < now - timedelta(seconds=self.lock_timeout))
+        )
+        candidates = select(Job.id).where(due).order_by(Job.run_at).limit(limit).scalar_subquery()
+        db.session.execute(
+            update(Job).where(Job.id.in_(candidates), due).values(
+                status='running', locked_by=token, locked_at=now, attempts=Job.attempts + 1
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        rows = db.session.execute(
+            select(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts, Job.created_at)
+            .where(Job.locked_by == token)
+        ).all()
+        db.session.commit()
+        return [ClaimedJob(row.id, row.kind, json.loads(row.payload), row.attempts, row.max_attempts,
+                           row.created_at) for row in rows]
+
+    def complete(self, jobs: List[ClaimedJob]):
+        if jobs:
+            db.session.execute(delete(Job).where(Job.id.in_([claimed.id for claimed in jobs])))
+            db.session.commit()
+
+    def fail(self, jobs: List[ClaimedJob], error: str) -> List[bool]:
+        now = datetime.utcnow()
+        retried = []
+        for claimed in jobs:
+            retry = claimed.attempts < claimed.max_attempts
+            values = {'last_error': error[:2000], 'locked_by': None, 'locked_at': None}
+            if retry:
+                delay = backoff_seconds(claimed.attempts, self.backoff, self.backoff_cap)
+                values.update(status='pending', run_at=now + timedelta(seconds=delay))
+            else:
+                # run_at records when the job gave up, for purge_failed
+                values.update(status='failed', run_at=now)
+            db.session.execute(update(Job).where(Job.id == claimed.id).values(**values))
+            retried.append(retry)
+        db.session.commit()
+        return retried
+
+    def depth(self) -> Dict[Tuple[str, str], int]:
+        rows = db.session.execute(
+            select(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status)
+        ).all()
+        db.session.commit()
+        return {(kind, status): count for kind, status, count in rows}
+
+    def purge_failed(self, before: datetime) -> int:
+        result = db.session.execute(delete(Job).where(Job.status == 'failed', Job.run_at < before))
+        db.session.commit()
+        return result.rowcount
+
+class MemoryJobQueue(JobQueue):
+    """
+    In-process queue with the same retry behaviour, for tests and single-process tools.
+
+    Jobs are lost when the process exits.
+    """
+
+    def __init__(self, max_attempts: int = 5, backoff: float = 5.0, backoff_cap: float = 600.0):
+        super().__init__(max_attempts, backoff, backoff_cap)
+        self._jobs: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], delay: float = 0.0):
+        now = datetime.utcnow()
+        with self._lock:
+            self._jobs[self._next_id] = {
+                'kind': kind, 'payload': json.loads(json.dumps(payload)), 'status': 'pending',
+                'attempts': 0, 'max_attempts': self._max_attempts(kind),
+                'run_at': now + timedelta(seconds=delay), 'created_at': now, 'last_error': None
+            }
+            self._next_id += 1
+
+    def stage(self, session, kind: str, payload: Dict[str, Any], delay: float = 0.0):
+        # Nothing to write to the database: the job is added once the transaction commits,
+        # which it has to have begun for its commit to be seen
+        json.dumps(payload)
+        session.connection()
+
+    def committed(self, staged: List[Tuple[str, Dict[str, Any], float]]):
+        for kind, payload, delay in staged:
+            self.enqueue(kind, payload, delay)
+
+    def claim(self, worker: str, limit: int) -> List[ClaimedJob]:
+        now = datetime.utcnow()
+        with self._lock:
+            due = sorted((entry['run_at'], job_id) for job_id, entry in self._jobs.items()
+                         if entry['status'] == 'pending' and entry['run_at'] <= now)[:limit]
+            claimed = []
+            for _, job_id in due:
+                entry = self._jobs[job_id]
+                entry['status'] = 'running'
+                entry['attempts'] += 1
+                claimed.append(ClaimedJob(job_id, entry['kind'], entry['payload'], entry['attempts'],
+                                          entry['max_attempts'], entry['created_at']))
+            return claimed
+
+    def complete(self, jobs: List[ClaimedJob]):
+        with self._lock:
+            for claimed in jobs:
+                self._jobs.pop(claimed.id, None)
+
+    def fail(self, jobs: List[ClaimedJob], error: str) -> List[bool]:
+        now = datetime.utcnow()
+        retried = []
+        with self._lock:
+            for claimed in jobs:
+                entry = self._jobs[claimed.id]
+                retry = claimed.attempts < claimed.max_attempts
+                entry['last_error'] = error
+                if retry:
+                    entry['status'] = 'pending'
+                    entry['run_at'] = now + timedelta(seconds=backoff_seconds(claimed.attempts, self.backoff,
+                                                                              self.backoff_cap))
+                else:
+                    entry['status'] = 'failed'
+                    entry['run_at'] = now
+                retried.append(retry)
+        return retried
+
+    def depth(self) -> Dict[Tuple[str, str], int]:
+        counts: Dict[Tuple[str, str], int] = defaultdict(int)
+        with self._lock:
+            for entry in self._jobs.values():
+                counts[(entry['kind'], entry['status'])] += 1
+        return dict(counts)
+
+    def purge_failed(self, before: datetime) -> int:
+        with self._lock:
+            expired = [job_id for job_id, entry in self._jobs.items()
+                       if entry['status'] == 'failed' and entry['run_at'] < before]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+class JobWorker:
+    """
+    Pool of threads running queued jobs in an app context.
+
+    Each thread claims up to `batch_size` due jobs, groups them by kind and hands each
+    group to its handler, then polls again; when nothing is due it sleeps for
+    `poll_interval` seconds or until a job is enqueued in this process. Idle threads
+    also delete failed jobs older than `failed_retention` once per `sweep_interval`.
+    """
+
+    def __init__(self, app: Flask, queue: JobQueue, threads: int = 2, batch_size: int = 50,
+                 poll_interval: float = 1.0, failed_retention: Optional[timedelta] = None,
+                 sweep_interval: float = 3600.0):
+        """
+        Initialize the worker; threads are started by start().
+
+        Args:
+            app (Flask): Application providing the database and handler configuration
+            queue (JobQueue): Queue to take jobs from
+            threads (int): Worker threads
+            batch_size (int): Jobs claimed per poll
+            poll_interval (float): Seconds between polls of an empty queue
+            failed_retention (Optional[timedelta]): How long failed jobs are kept for
+                inspection, forever when not given
+            sweep_interval (float): Seconds between deletions of expired failed jobs
+        """
+        self.app = app
+        self.queue = queue
+        self.threads = threads
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.failed_retention = failed_retention
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self.name = f'worker-{uuid.uuid4().hex[:8]}'
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads, if they are not running yet."""
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.threads):
+                thread = threading.Thread(target=self._loop, name=f'jobs-{number}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Started {self.threads} job worker threads")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Ask the threads to stop after their current batch and wait for them."""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wake idle threads because a job was enqueued."""
+        self._wakeup.set()
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                handled = self.run_once()
+            except Exception as e:
+                logger.error(f"Error in job worker loop: {str(e)}")
+                handled = 0
+            if not handled:
+                self.sweep()
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def sweep(self, force: bool = False) -> int:
+        """
+        Delete failed jobs past their retention, at most once per sweep interval.
+
+        Args:
+            force (bool): Sweep even if the last sweep was recent
+
+        Returns:
+            int: Number of jobs deleted
+        """
+        if self.failed_retention is None:
+            return 0
+        with self._lock:
+            if not force and time.monotonic() < self._next_sweep:
+                return 0
+            self._next_sweep = time.monotonic() + self.sweep_interval
+        try:
+            with self.app.app_context():
+                purged = self.queue.purge_failed(datetime.utcnow() - self.failed_retention)
+        except Exception as e:
+            logger.error(f"Error deleting expired failed jobs: {str(e)}")
+            return 0
+        if purged:
+            logger.info(f"Deleted {purged} failed jobs older than {self.failed_retention}")
+        return purged
+
+    def run_once(self) -> int:
+        """
+        Claim one batch of due jobs and run it.
+
+        Returns:
+            int: Number of jobs claimed
+        """
+        with self.app.app_context():
+            claimed = self.queue.claim(self.name, self.batch_size)
+            groups: Dict[str, List[ClaimedJob]] = defaultdict(list)
+            for claimed_job in claimed:
+                groups[claimed_job.kind].append(claimed_job)
+            for kind, jobs in groups.items():
+                self._run(kind, jobs)
+            return len(claimed)
+
+    def run_pending(self) -> int:
+        """
+        Run every job that is due, on the calling thread.
+
+        Returns:
+            int: Number of jobs run
+        """
+        total = 0
+        while True:
+            handled = self.run_once()
+            if not handled:
+                return total
+            total += handled
+
+    def _run(self, kind: str, jobs: List[ClaimedJob]):
+        handler = _handlers.get(kind)
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                self._attempt(kind, jobs, None)
+            elif handler.batch:
+                self._attempt(kind, jobs, lambda: handler.function([claimed.payload for claimed in jobs]))
+            else:
+                for claimed in jobs:
+                    self._attempt(kind, [claimed], lambda: handler.function(claimed.payload))
+        finally:
+            JOB_RUN_TIME.observe(time.perf_counter() - started, (kind,))
+
+    def _attempt(self, kind: str, jobs: List[ClaimedJob], call: Optional[Callable[[], Any]]):
+        try:
+            if call is None:
+                raise LookupError(f"No handler registered for job kind {kind!r}")
+            call()
+        except Exception as e:
+            db.session.rollback()
+            retried = self.queue.fail(jobs, f'{type(e).__name__}: {str(e)}')
+            for retry in retried:
+                JOBS.inc((kind, 'retried' if retry else 'failed'))
+            logger.error(f"Error running {len(jobs)} {kind} job(s) (attempt {jobs[0].attempts}): {str(e)}")
+        else:
+            self._finish(kind, jobs)
+
+    def _finish(self, kind: str, jobs: List[ClaimedJob]):
+        if not jobs:
+            return
+        self.queue.complete(jobs)
+        now = datetime.utcnow()
+        for claimed in jobs:
+            JOBS.inc((kind, 'done'))
+            JOB_LATENCY.observe((now - claimed.created_at).total_seconds(), (kind,))
+
+_queue: Optional[JobQueue] = None
+_worker: Optional[JobWorker] = None
+_queue_lock = threading.Lock()
+
+def _depth_metrics() -> List[Gauge]:
+    depth = Gauge('job_queue_depth', 'Queued jobs by kind and status', ('kind', 'status'))
+    if has_app_context():
+        for (kind, status), count in get_job_queue().depth().items():
+            depth.set((kind, status), count)
+    return [depth]
+
+_metrics.register_collector('job_queue', _depth_metrics)
+
+def get_job_queue() -> JobQueue:
+    """
+    Return the process-wide job queue, configured from the app config on first use.
+
+    Returns:
+        JobQueue: DatabaseJobQueue, or MemoryJobQueue when JOB_QUEUE_BACKEND is 'memory'
+    """
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                config = current_app.config
+                options = (config.get('JOB_MAX_ATTEMPTS', 5), config.get('JOB_BACKOFF_SECONDS', 5.0),
+                           config.get('JOB_BACKOFF_MAX_SECONDS', 600.0))
+                if config.get('JOB_QUEUE_BACKEND', 'database') == 'memory':
+                    _queue = MemoryJobQueue(*options)
+                else:
+                    _queue = DatabaseJobQueue(*options, config.get('JOB_LOCK_TIMEOUT', 300.0))
+    return _queue
+
+def get_job_worker(threads: Optional[int] = None) -> JobWorker:
+    """
+    Return the process-wide job worker for the current app, without starting it.
+
+    Args:
+        threads (Optional[int]): Worker threads, JOB_WORKER_THREADS when not given
+
+    Returns:
+        JobWorker: Shared worker
+    """
+    global _worker
+    if _worker is None:
+        queue = get_job_queue()
+        with _queue_lock:
+            if _worker is None:
+                config = current_app.config
+                retention_days = config.get('JOB_FAILED_RETENTION_DAYS', 30)
+                _worker = JobWorker(current_app._get_current_object(), queue,
+                                    config.get('JOB_WORKER_THREADS', 2) if threads is None else threads,
+                                    config.get('JOB_BATCH_SIZE', 50), config.get('JOB_POLL_SECONDS', 1.0),
+                                    timedelta(days=retention_days) if retention_days else None)
+    return _worker
+
+def enqueue(kind: str, payload: Dict[str, Any], delay: float = 0.0) -> bool:
+    """
+    Queue a job and return immediately.
+
+    With JOB_WORKER_THREADS above zero the worker threads of this process are started
+    on the first call and woken for every job; otherwise jobs wait for a separate
+    `flask jobs-worker` process. Errors are logged rather than raised, so a failure to
+    queue a side effect never fails the request that already committed its work.
+
+    Args:
+        kind (str): Registered job kind
+        payload (Dict[str, Any]): JSON-serializable arguments
+        delay (float): Seconds before the job may run
+
+    Returns:
+        bool: True if the job was queued
+    """
+    try:
+        get_job_queue().enqueue(kind, payload, delay)
+    except Exception as e:
+        logger.error(f"Error queueing {kind} job {payload}: {str(e)}")
+        return False
+    _wake_worker()
+    return True
+
+def enqueue_on_commit(kind: str, payload: Dict[str, Any], delay: float = 0.0):
+    """
+    Queue a job as part of the current transaction of the session.
+
+    With the database backend the job row is written by the same commit as the
+    changes it follows up on, so a job is never lost after the work committed and
+    never queued for work that was rolled back. Worker threads of this process are
+    woken once the transaction commits.
+
+    Args:
+        kind (str): Registered job kind
+        payload (Dict[str, Any]): JSON-serializable arguments
+        delay (float): Seconds before the job may run
+    """
+    get_job_queue().stage(db.session, kind, payload, delay)
+    db.session.info.setdefault(_STAGED_KEY, []).append((kind, payload, delay))
+
+_STAGED_KEY = 'staged_jobs'
+
+def _wake_worker():
+    if current_app.config.get('JOB_WORKER_THREADS', 2) > 0:
+        worker = get_job_worker()
+        worker.start()
+        worker.notify()
+
+@event.listens_for(Session, 'after_commit')
+def _queue_staged_jobs(session):
+    staged = session.info.pop(_STAGED_KEY, None)
+    if not staged or _queue is None:
+        return
+    try:
+        _queue.committed(staged)
+        _wake_worker()
+    except Exception as e:
+        logger.error(f"Error waking job workers after commit: {str(e)}")
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_staged_jobs(session):
+    session.info.pop(_STAGED_KEY, None)
+
+def reset_job_queue():
+    """Stop the worker and drop the queue so both are rebuilt from the config on next use."""
+    global _queue, _worker
+    with _queue_lock:
+        if _worker is not None:
+            _worker.stop(timeout=5)
+        _queue = None
+        _worker = None
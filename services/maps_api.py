@@ -1,7 +1,10 @@
 import requests
-from typing import List, Dict, Optional
-from models.models import TennisCourt
+from typing import List, Dict, Optional, Sequence, Tuple
 from flask import current_app
+from services.geo import haversine_km, haversine_many, distance_matrix
+from services.catalog_snapshot import get_catalog_snapshot
+from services.geocoding import get_geocoder
+from services.spatial_index import get_court_index
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,45 +14,43 @@ class MapsService:
         """Initialize the maps service with an optional API key."""
         self.api_key = api_key or current_app.config.get('MAPS_API_KEY')
 
-    def get_nearby_tennis_courts(self, latitude: float, longitude: float, radius_km: float = 10) -> List[Dict]:
+    def get_nearby_tennis_courts(self, latitude: float, longitude: float,
+                                 radius_km: Optional[float] = 10,
+                                 limit: Optional[int] = None) -> List[Dict]:
         """
         Find tennis courts near a given location.
         
         Args:
             latitude (float): User's latitude
             longitude (float): User's longitude
-            radius_km (float): Search radius in kilometers
+            radius_km (Optional[float]): Search radius in kilometers, None for no limit
+            limit (Optional[int]): Return only the closest `limit` courts
             
         Returns:
-            List[Dict]: List of tennis courts with their details
+            List[Dict]: List of tennis courts with their details, closest first
         """
         try:
-            # For demonstration, we'll return courts from our database
-            # In a real implementation, this would make an API call to a mapping service
-            
-            # TODO: Implement actual distance calculation and filtering
-            courts = TennisCourt.query.all()
-            
+            index = get_court_index()
+            if limit is not None:
+                hits = index.nearest(latitude, longitude, limit, max_distance_km=radius_km)
+            elif radius_km is not None:
+                hits = index.within_radius(latitude, longitude, radius_km)
+            else:
+                hits = index.nearest(latitude, longitude, len(index))
+
+            if not hits:
+                return []
+
+            snapshot = get_catalog_snapshot()
             nearby_courts = []
-            for court in courts:
-                # Simple distance calculation (this should be replaced with proper geolocation)
-                distance = self._calculate_distance(
-                    latitude, longitude,
-                    court.latitude, court.longitude
-                )
-                
-                if distance <= radius_km:
-                    nearby_courts.append({
-                        'id': court.id,
-                        'name': court.name,
-                        'address': court.address,
-                        'latitude': court.latitude,
-                        'longitude': court.longitude,
-                        'price_per_hour': court.price_per_hour,
-                        'distance': round(distance, 2)
-                    })
+            for court_id, distance in hits:
+                court = snapshot.get(court_id)
+                if court is None:
+                    continue
+                court['distance'] = round(distance, 2)
+                nearby_courts.append(court)
             
-            return sorted(nearby_courts, key=lambda x: x['distance'])
+            return nearby_courts
             
         except Exception as e:
             logger.error(f"Error finding nearby tennis courts: {str(e)}")
@@ -66,14 +67,65 @@ class MapsService:
             Optional[Dict[str, float]]: Dictionary with 'lat' and 'lng' if successful
         """
         try:
-            # TODO: Implement actual geocoding using a service like Google Maps
-            # For now, return None to indicate geocoding is not implemented
-            return None
+            return get_geocoder().geocode(address)
             
         except Exception as e:
             logger.error(f"Error geocoding address: {str(e)}")
             return None
 
+    def geocode_addresses(self, addresses: List[str]) -> Dict[str, Optional[Dict[str, float]]]:
+        """
+        Convert many addresses to coordinates in one batch.
+        
+        Duplicate addresses are looked up once and uncached ones are fetched concurrently.
+        
+        Args:
+            addresses (List[str]): The addresses to geocode
+            
+        Returns:
+            Dict[str, Optional[Dict[str, float]]]: Coordinates (or None) by address
+        """
+        try:
+            return get_geocoder().geocode_many(addresses)
+            
+        except Exception as e:
+            logger.error(f"Error geocoding addresses: {str(e)}")
+            return {address: None for address in addresses}
+
+    def batch_distances(self, latitude: float, longitude: float,
+                        points: Sequence[Tuple[float, float]]) -> List[float]:
+        """
+        Calculate the distances from one location to many points in a single pass.
+        
+        Args:
+            latitude (float): Latitude of the origin
+            longitude (float): Longitude of the origin
+            points (Sequence[Tuple[float, float]]): (latitude, longitude) of each point
+            
+        Returns:
+            List[float]: Distances in kilometers, in input order
+        """
+        distances = haversine_many(latitude, longitude,
+                                   [lat for lat, _ in points],
+                                   [lng for _, lng in points])
+        return [float(distance) for distance in distances]
+
+    def distance_matrix(self, origins: Sequence[Tuple[float, float]],
+                        points: Sequence[Tuple[float, float]]):
+        """
+        Calculate the distance from every origin to every point.
+        
+        Intended for analytics jobs; the result is a NumPy array when NumPy is installed.
+        
+        Args:
+            origins (Sequence[Tuple[float, float]]): (latitude, longitude) of each origin
+            points (Sequence[Tuple[float, float]]): (latitude, longitude) of each point
+            
+        Returns:
+            len(origins) x len(points) distances in kilometers
+        """
+        return distance_matrix(origins, points)
+
     def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """
         Calculate the distance between two points using the Haversine formula.
@@ -87,23 +139,7 @@ class MapsService:
         Returns:
             float: Distance in kilometers
         """
-        from math import radians, sin, cos, sqrt, atan2
-        
-        # Convert coordinates to radians
-        lat1, lon1 = radians(lat1), radians(lon1)
-        lat2, lon2 = radians(lat2), radians(lon2)
-        
-        # Haversine formula
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1-a))
-        
-        # Earth's radius in kilometers
-        R = 6371
-        
-        return R * c
+        return haversine_km(lat1, lon1, lat2, lon2)
 
 def get_maps_service() -> MapsService:
     """Factory function to create a MapsService instance."""
@@ -0,0 +1,449 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from math import ceil
+from typing import Dict, Iterable, List, Optional, Tuple
+from flask import Flask, current_app
+from sqlalchemy import or_
+from models.models import db, Booking, Match, PlayerAvailability, TennisCourt, User
+from services.availability import SLOT_MINUTES, SLOTS_PER_DAY, _range_mask, find_free_slots, start_mask
+from services.spatial_index import GridIndex, get_court_index
+from utils.db_events import on_commit
+
+logger = logging.getLogger(__name__)
+
+WEEK_SLOTS = 7 * SLOTS_PER_DAY
+FULL_WEEK = (1 << WEEK_SLOTS) - 1
+
+# Players without declared windows are assumed free when they usually play
+AVAILABILITY_HISTORY = timedelta(weeks=8)
+
+def week_slot(moment: datetime) -> int:
+    """Index of the 15-minute slot of the week (Monday 00:00 is slot 0) containing a moment."""
+    return moment.weekday() * SLOTS_PER_DAY + (moment.hour * 60 + moment.minute) // SLOT_MINUTES
+
+def window_mask(weekday: int, start_minute: int, end_minute: int) -> int:
+    """
+    Build the week bitmap of a weekly availability window.
+
+    Args:
+        weekday (int): Day of the window, 0 for Monday
+        start_minute (int): Start in minutes after midnight
+        end_minute (int): End in minutes after midnight
+
+    Returns:
+        int: Bitmap with a bit per slot of the week the window fully covers
+    """
+    day = weekday * SLOTS_PER_DAY
+    return _range_mask(day + ceil(start_minute / SLOT_MINUTES), day + end_minute // SLOT_MINUTES)
+
+def range_mask(start: datetime, end: datetime) -> int:
+    """
+    Build the week bitmap of the slots touched by [start, end).
+
+    Args:
+        start (datetime): Start of the range
+        end (datetime): End of the range
+
+    Returns:
+        int: Week bitmap, wrapping from Sunday to Monday
+    """
+    if end - start >= timedelta(days=7):
+        return FULL_WEEK
+    first = week_slot(start)
+    offset = start.minute % SLOT_MINUTES * 60 + start.second
+    last = first + ceil(((end - start).total_seconds() + offset) / (SLOT_MINUTES * 60))
+    if last <= WEEK_SLOTS:
+        return _range_mask(first, last)
+    return _range_mask(first, WEEK_SLOTS) | _range_mask(0, last - WEEK_SLOTS)
+
+class PlayerIndex:
+    """
+    Players indexed by home location and by weekly availability.
+
+    Homes live in a grid spatial index; availability is a bitmap of the 672
+    15-minute slots of a week, so the free time two players share is one AND.
+    Declared windows take precedence over availability derived from past
+    reservations.
+    """
+
+    def __init__(self, cell_size: float = 0.05):
+        """
+        Initialize an empty index.
+
+        Args:
+            cell_size (float): Edge length in degrees of the spatial grid cells
+        """
+        self.homes = GridIndex(cell_size)
+        self.built_at = time.monotonic()
+        self._positions: Dict[int, Tuple[float, float]] = {}
+        self._windows: Dict[int, Dict[int, int]] = {}
+        self._declared: Dict[int, int] = {}
+        self._derived: Dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def set_home(self, user_id: int, latitude: Optional[float], longitude: Optional[float]):
+        """
+        Set or clear a player's home location.
+
+        Args:
+            user_id (int): ID of the player
+            latitude (Optional[float]): Home latitude, None to clear
+            longitude (Optional[float]): Home longitude, None to clear
+        """
+        with self._lock:
+            if latitude is None or longitude is None:
+                self._positions.pop(user_id, None)
+                self.homes.remove(user_id)
+            else:
+                self._positions[user_id] = (latitude, longitude)
+                self.homes.insert(user_id, latitude, longitude)
+
+    def home(self, user_id: int) -> Optional[Tuple[float, float]]:
+        return self._positions.get(user_id)
+
+    def set_window(self, user_id: int, window_id: int, mask: Optional[int]):
+        """
+        Add, replace or (with mask None) remove one declared availability window.
+
+        Args:
+            user_id (int): ID of the player
+            window_id (int): ID of the PlayerAvailability row
+            mask (Optional[int]): Week bitmap of the window
+        """
+        with self._lock:
+            windows = self._windows.setdefault(user_id, {})
+            if mask is None:
+                windows.pop(window_id, None)
+            else:
+                windows[window_id] = mask
+            combined = 0
+            for window in windows.values():
+                combined |= window
+            if windows:
+                self._declared[user_id] = combined
+            else:
+                del self._windows[user_id]
+                self._declared.pop(user_id, None)
+
+    def set_derived(self, user_id: int, mask: int):
+        with self._lock:
+            self._derived[user_id] = mask
+
+    def availability(self, user_id: int) -> Optional[int]:
+        """
+        Return a player's weekly availability bitmap.
+
+        Args:
+            user_id (int): ID of the player
+
+        Returns:
+            Optional[int]: Week bitmap, or None when nothing is known about the player
+        """
+        declared = self._declared.get(user_id)
+        return declared if declared is not None else self._derived.get(user_id)
+
+    def candidates(self, user_id: int, want: int, radius_km: float,
+                   pool: int = 100) -> List[Tuple[int, float, int]]:
+        """
+        Rank the nearest players who share time with a player within a week bitmap.
+
+        The spatial index is walked outwards from the player's home, testing each
+        player's bitmap on the way, until the `pool` nearest players with shared time
+        are known; only those are ranked. A dense region therefore costs a few grid
+        cells rather than a scan of everyone within the radius.
+
+        Args:
+            user_id (int): ID of the searching player
+            want (int): Week bitmap the shared time must fall in
+            radius_km (float): Maximum distance between homes
+            pool (int): Number of nearest matching players to rank
+
+        Returns:
+            List[Tuple[int, float, int]]: (user id, distance in km, shared bitmap), most
+                shared time first, then nearest first
+        """
+        home = self._positions.get(user_id)
+        if home is None:
+            return []
+        own = self.availability(user_id)
+        if own is not None:
+            want &= own
+        if not want:
+            return []
+
+        declared, derived = self._declared, self._derived
+
+        def shares_time(other_id: int) -> bool:
+            other = declared.get(other_id)
+            if other is None:
+                other = derived.get(other_id, 0)
+            return other_id != user_id and bool(other & want)
+
+        with self._lock:
+            nearest = self.homes.nearest(home[0], home[1], pool, max_distance_km=radius_km,
+                                         accept=shares_time)
+        ranked = []
+        for other_id, distance in nearest:
+            shared = want & self.availability(other_id)
+            ranked.append((-bin(shared).count('1'), distance, other_id, shared))
+        ranked.sort()
+        return [(other_id, distance, shared) for _, distance, other_id, shared in ranked]
+
+def _new_player_index() -> PlayerIndex:
+    return PlayerIndex(current_app.config.get('SPATIAL_INDEX_CELL_DEGREES', 0.05))
+
+def _build_player_index(index: Optional[PlayerIndex] = None) -> PlayerIndex:
+    index = index if index is not None else _new_player_index()
+    homes = db.session.query(User.id, User.home_latitude, User.home_longitude).filter(
+        User.home_latitude.is_not(None), User.home_longitude.is_not(None)
+    )
+    for user_id, latitude, longitude in homes:
+        index.set_home(user_id, latitude, longitude)
+
+    windows = db.session.query(PlayerAvailability.id, PlayerAvailability.user_id, PlayerAvailability.weekday,
+                               PlayerAvailability.start_minute, PlayerAvailability.end_minute)
+    for window_id, user_id, weekday, start_minute, end_minute in windows:
+        index.set_window(user_id, window_id, window_mask(weekday, start_minute, end_minute))
+
+    derived: Dict[int, int] = {}
+    since = datetime.now() - AVAILABILITY_HISTORY
+    history = db.session.query(Booking.user_id, Booking.booking_time, Booking.end_time).filter(
+        Booking.booking_time >= since, Booking.status != 'cancelled'
+    ).union_all(
+        db.session.query(Match.player1_id, Match.match_time, Match.end_time).filter(
+            Match.match_time >= since, Match.status != 'cancelled'),
+        db.session.query(Match.player2_id, Match.match_time, Match.end_time).filter(
+            Match.match_time >= since, Match.status != 'cancelled')
+    )
+    for user_id, start, end in history:
+        derived[user_id] = derived.get(user_id, 0) | range_mask(start, end)
+    for user_id, mask in derived.items():
+        index.set_derived(user_id, mask)
+
+    logger.info(f"Built player index with {len(index)} players")
+    return index
+
+_player_index: Optional[PlayerIndex] = None
+# Index being rebuilt in the background; commit hooks keep it current as well
+_building_index: Optional[PlayerIndex] = None
+_player_index_lock = threading.Lock()
+
+def _rebuild_in_background(app: Flask, index: PlayerIndex):
+    global _player_index, _building_index
+    try:
+        with app.app_context():
+            try:
+                _build_player_index(index)
+            finally:
+                db.session.remove()
+        with _player_index_lock:
+            if _building_index is index:
+                _player_index = index
+    except Exception as e:
+        logger.error(f"Error rebuilding player index: {str(e)}")
+    finally:
+        with _player_index_lock:
+            if _building_index is index:
+                _building_index = None
+
+def get_player_index() -> PlayerIndex:
+    """
+    Return the process-wide player index.
+
+    The first call builds it. Once it is older than MATCHMAKING_INDEX_TTL seconds, a
+    background thread rebuilds it to pick up derived availability and changes made by
+    other processes, while requests keep using the current one.
+
+    Returns:
+        PlayerIndex: Index of player homes and availability
+    """
+    global _player_index, _building_index
+    index = _player_index
+    if index is None:
+        with _player_index_lock:
+            if _player_index is None:
+                _player_index = _build_player_index()
+            return _player_index
+    ttl = current_app.config.get('MATCHMAKING_INDEX_TTL', 600)
+    if time.monotonic() - index.built_at > ttl and _building_index is None:
+        with _player_index_lock:
+            if _building_index is not None or _player_index is not index:
+                return _player_index
+            _building_index = _new_player_index()
+            building = _building_index
+        threading.Thread(target=_rebuild_in_background, args=(current_app._get_current_object(), building),
+                         name='player-index', daemon=True).start()
+    return index
+
+def reset_player_index():
+    """Drop the player index so it is rebuilt from the database on next use."""
+    global _player_index, _building_index
+    with _player_index_lock:
+        _player_index = None
+        _building_index = None
+
+Busy = List[Tuple[datetime, datetime]]
+
+def _reservations_by_player(user_ids: Iterable[int], start: datetime, end: datetime) -> Dict[int, Busy]:
+    """
+    Collect the bookings and matches of several players that overlap [start, end).
+
+    Args:
+        user_ids (Iterable[int]): IDs of the players
+        start (datetime): Start of the range
+        end (datetime): End of the range
+
+    Returns:
+        Dict[int, Busy]: (start, end) of each reservation by player
+    """
+    user_ids = list(user_ids)
+    busy: Dict[int, Busy] = {user_id: [] for user_id in user_ids}
+    bookings = db.session.query(Booking.user_id, Booking.booking_time, Booking.end_time).filter(
+        Booking.user_id.in_(user_ids), Booking.status != 'cancelled',
+        Booking.booking_time < end, Booking.end_time > start
+    )
+    for user_id, booked_from, booked_to in bookings:
+        busy[user_id].append((booked_from, booked_to))
+    matches = db.session.query(Match.player1_id, Match.player2_id, Match.match_time, Match.end_time).filter(
+        or_(Match.player1_id.in_(user_ids), Match.player2_id.in_(user_ids)), Match.status != 'cancelled',
+        Match.match_time < end, Match.end_time > start
+    )
+    for player1_id, player2_id, match_from, match_to in matches:
+        for player_id in {player1_id, player2_id}:
+            if player_id in busy:
+                busy[player_id].append((match_from, match_to))
+    return busy
+
+def _meeting_slot(shared: int, free: Dict[str, List[str]], start: datetime, end: datetime,
+                  duration: int, busy: Optional[Busy] = None) -> Optional[datetime]:
+    """
+    Earliest free court start in [start, end - duration] that both players are available
+    for and that overlaps none of their reservations in `busy`.
+    """
+    startable = start_mask(shared, duration)
+    latest = end - timedelta(minutes=duration)
+    length = timedelta(minutes=duration)
+    for day, times in sorted(free.items()):
+        for hhmm in times:
+            moment = datetime.fromisoformat(f"{day}T{hhmm}")
+            if moment < start:
+                continue
+            if moment > latest:
+                return None
+            if not startable >> week_slot(moment) & 1:
+                continue
+            if any(taken_from < moment + length and moment < taken_to
+                   for taken_from, taken_to in busy or ()):
+                continue
+            return moment
+    return None
+
+def find_opponents(user_id: int, start: datetime, end: datetime, duration: int = 60,
+                   radius_km: Optional[float] = None, limit: int = 10) -> List[Dict]:
+    """
+    Suggest opponents near a player who are free at the same time, with a court to meet at.
+
+    The nearest players within the radius who share weekly time with the player
+    inside [start, end) are ranked by that shared time, then by distance.
+    For each of the best candidates the courts nearest to the midpoint of both homes
+    are searched for the earliest free start both players are available for and
+    neither has another booking or match at.
+
+    Args:
+        user_id (int): ID of the searching player
+        start (datetime): Start of the time range
+        end (datetime): End of the time range
+        duration (int): Match length in minutes
+        radius_km (Optional[float]): Maximum distance between homes, MATCHMAKING_RADIUS_KM if omitted
+        limit (int): Maximum number of suggestions
+
+    Returns:
+        List[Dict]: Suggestions with the opponent, distance, shared minutes per week and,
+            when one was found, a court and start time
+
+    Raises:
+        ValueError: If the player has no home location
+    """
+    config = current_app.config
+    index = get_player_index()
+    home = index.home(user_id)
+    if home is None:
+        raise ValueError('Set a home location to get opponent suggestions')
+
+    radius_km = radius_km or config.get('MATCHMAKING_RADIUS_KM', 15)
+    ranked = index.candidates(user_id, range_mask(start, end), radius_km,
+                              config.get('MATCHMAKING_CANDIDATE_POOL', 100))[:limit]
+    if not ranked:
+        return []
+
+    # Courts near the midpoint of each pair, searched for free slots in one batch
+    court_index = get_court_index()
+    meeting_courts = {}
+    for other_id, _, _ in ranked:
+        other_home = index.home(other_id)
+        midpoint = ((home[0] + other_home[0]) / 2, (home[1] + other_home[1]) / 2)
+        meeting_courts[other_id] = court_index.nearest(midpoint[0], midpoint[1],
+                                                       config.get('MATCHMAKING_MEETING_COURTS', 5),
+                                                       max_distance_km=radius_km)
+    court_ids = {court_id for hits in meeting_courts.values() for court_id, _ in hits}
+    days = min((end.date() - start.date()).days + 1, config.get('SLOT_SEARCH_MAX_DAYS', 14))
+    free_slots = find_free_slots(court_ids, start.date(), days, duration) if court_ids else {}
+    courts = {court.id: court for court in TennisCourt.query.filter(TennisCourt.id.in_(court_ids))}
+    usernames = dict(db.session.query(User.id, User.username).filter(
+        User.id.in_([other_id for other_id, _, _ in ranked])
+    ))
+    # Times either player already has a booking or match are never suggested
+    busy = _reservations_by_player([user_id, *(other_id for other_id, _, _ in ranked)], start, end)
+
+    suggestions = []
+    for other_id, distance, shared in ranked:
+        best = None
+        pair_busy = busy[user_id] + busy[other_id]
+        for court_id, court_distance in meeting_courts[other_id]:
+            # The spatial index may still list a court another process just deleted
+            if court_id not in courts:
+                continue
+            moment = _meeting_slot(shared, free_slots.get(court_id, {}), start, end, duration, pair_busy)
+            if moment is not None and (best is None or moment < best[0]):
+                best = (moment, court_id, court_distance)
+        suggestion = {
+            'user': {'id': other_id, 'username': usernames.get(other_id)},
+            'distance_km': round(distance, 2),
+            'shared_minutes_per_week': bin(shared).count('1') * SLOT_MINUTES,
+            'court': None,
+            'start': None
+        }
+        if best is not None:
+            moment, court_id, court_distance = best
+            court = courts[court_id]
+            suggestion['court'] = {'id': court.id, 'name': court.name, 'address': court.address,
+                                   'distance_from_midpoint_km': round(court_distance, 2)}
+            suggestion['start'] = moment.isoformat()
+        suggestions.append(suggestion)
+    return suggestions
+
+def _live_indexes() -> List[PlayerIndex]:
+    """The current index and the one being rebuilt, which both need commit updates."""
+    return [index for index in (_player_index, _building_index) if index is not None]
+
+def _sync_home(op: str, row: Dict, old: Optional[Dict]):
+    for index in _live_indexes():
+        if op == 'delete':
+            index.set_home(row['id'], None, None)
+        elif op == 'insert' or 'home_latitude' in (old or {}) or 'home_longitude' in (old or {}):
+            index.set_home(row['id'], row['home_latitude'], row['home_longitude'])
+
+def _sync_window(op: str, row: Dict, old: Optional[Dict]):
+    mask = None if op == 'delete' else window_mask(row['weekday'], row['start_minute'], row['end_minute'])
+    for index in _live_indexes():
+        if op == 'update' and 'user_id' in (old or {}):
+            index.set_window(old['user_id'], row['id'], None)
+        index.set_window(row['user_id'], row['id'], mask)
+
+on_commit(User, _sync_home)
+on_commit(PlayerAvailability, _sync_window)
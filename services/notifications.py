@@ -0,0 +1,88 @@
+import logging
+from typing import Dict, List
+from sqlalchemy.orm import joinedload
+from models.models import Booking, Match, TennisCourt, User
+from services.jobs import job
+from utils.helpers import calculate_booking_cost, format_datetime, format_price
+
+logger = logging.getLogger(__name__)
+
+def deliver(email: str, subject: str, body: str):
+    """
+    Send a notification to a user.
+
+    There is no mail transport yet, so notifications are written to the log.
+
+    Args:
+        email (str): Recipient address
+        subject (str): Subject line
+        body (str): Message text
+    """
+    logger.info(f"Notification to {email}: {subject} - {body}")
+
+@job('booking_confirmation', batch=True)
+def send_booking_confirmations(payloads: List[Dict]):
+    """
+    Send confirmations with a receipt for newly made bookings.
+
+    Args:
+        payloads (List[Dict]): Job payloads with a booking_id each
+    """
+    booking_ids = {payload['booking_id'] for payload in payloads}
+    bookings = Booking.query.options(
+        joinedload(Booking.user).load_only(User.email, User.username),
+        joinedload(Booking.court).load_only(TennisCourt.name, TennisCourt.price_per_hour)
+    ).filter(Booking.id.in_(booking_ids)).all()
+    for booking in bookings:
+        if booking.status == 'cancelled':
+            continue
+        cost = calculate_booking_cost(booking.duration, booking.court.price_per_hour)
+        deliver(booking.user.email, f"Booking confirmed: {booking.court.name}",
+                f"{format_datetime(booking.booking_time)} for {booking.duration} minutes, "
+                f"total {format_price(cost)}")
+
+@job('match_invitation', batch=True)
+def send_match_invitations(payloads: List[Dict]):
+    """
+    Tell opponents about the matches they were invited to.
+
+    Args:
+        payloads (List[Dict]): Job payloads with a match_id each
+    """
+    match_ids = {payload['match_id'] for payload in payloads}
+    matches = Match.query.options(
+        joinedload(Match.player1).load_only(User.username),
+        joinedload(Match.player2).load_only(User.email),
+        joinedload(Match.court).load_only(TennisCourt.name)
+    ).filter(Match.id.in_(match_ids)).all()
+    for match in matches:
+        if match.status == 'cancelled':
+            continue
+        deliver(match.player2.email, f"{match.player1.username} invited you to a match",
+                f"{match.court.name} on {format_datetime(match.match_time)} for {match.duration} minutes")
+
+@job('booking_series_confirmation', batch=True)
+def send_booking_series_confirmations(payloads: List[Dict]):
+    """
+    Send one confirmation per recurring or bulk booking request, listing its bookings.
+
+    Args:
+        payloads (List[Dict]): Job payloads with the booking_ids of one request each
+    """
+    booking_ids = {booking_id for payload in payloads for booking_id in payload['booking_ids']}
+    bookings = Booking.query.options(
+        joinedload(Booking.user).load_only(User.email),
+        joinedload(Booking.court).load_only(TennisCourt.name, TennisCourt.price_per_hour)
+    ).filter(Booking.id.in_(booking_ids)).all()
+    by_id = {booking.id: booking for booking in bookings}
+    for payload in payloads:
+        series = [by_id[booking_id] for booking_id in payload['booking_ids']
+                  if booking_id in by_id and by_id[booking_id].status != 'cancelled']
+        if not series:
+            continue
+        series.sort(key=lambda booking: booking.booking_time)
+        cost = sum(calculate_booking_cost(booking.duration, booking.court.price_per_hour) for booking in series)
+        lines = [f"{booking.court.name}: {format_datetime(booking.booking_time)} for {booking.duration} minutes"
+                 for booking in series]
+        deliver(series[0].user.email, f"{len(series)} bookings confirmed",
+                f"{'; '.join(lines)}, total {format_price(cost)}")
@@ -0,0 +1,180 @@
+import json
+import logging
+import threading
+from array import array
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from models.models import db, TennisCourt
+from services.catalog_cache import on_external_catalog_change
+from utils.db_engine import primary_reads
+from utils.db_events import on_commit
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+MINUTES_PER_DAY = 24 * 60
+
+# Hours assumed for courts without a schedule
+DEFAULT_OPENING_TIME = "06:00"
+DEFAULT_CLOSING_TIME = "22:00"
+
+@lru_cache(maxsize=None)
+def parse_hhmm(value: str) -> int:
+    """
+    Convert an "HH:MM" string to minutes after midnight.
+
+    Args:
+        value (str): Time of day, "24:00" is accepted as the end of the day
+
+    Returns:
+        int: Minutes after midnight
+    """
+    hours, minutes = value.strip().split(':')
+    minute = int(hours) * 60 + int(minutes)
+    if not 0 <= minute <= MINUTES_PER_DAY:
+        raise ValueError(f"Invalid time of day: {value}")
+    return minute
+
+class OpeningHours:
+    """
+    Weekly schedule compiled to one minute-of-week range per weekday.
+
+    `ranges[2 * weekday]` and `ranges[2 * weekday + 1]` hold the opening and closing
+    minute of that weekday counted from Monday 00:00; closed days have an empty range.
+    """
+
+    __slots__ = ('ranges',)
+
+    def __init__(self, ranges: array):
+        self.ranges = ranges
+
+    @classmethod
+    def daily(cls, opening_time: str, closing_time: str) -> 'OpeningHours':
+        """
+        Build a schedule with the same hours every day.
+
+        Args:
+            opening_time (str): Opening time (HH:MM)
+            closing_time (str): Closing time (HH:MM)
+
+        Returns:
+            OpeningHours: Compiled schedule
+        """
+        return _compile_daily(opening_time, closing_time)
+
+    @classmethod
+    def compile(cls, available_hours: Optional[str]) -> 'OpeningHours':
+        """
+        Compile a TennisCourt.available_hours JSON string.
+
+        Args:
+            available_hours (Optional[str]): JSON string like {"monday": "06:00-22:00", ...}
+
+        Returns:
+            OpeningHours: Compiled schedule, the default hours when none are set
+        """
+        return _compile_json(available_hours)
+
+    def day_range(self, weekday: int) -> Tuple[int, int]:
+        """
+        Return the opening and closing minute of a weekday, counted from midnight.
+
+        Args:
+            weekday (int): Day of the week, Monday is 0
+
+        Returns:
+            Tuple[int, int]: (opening minute, closing minute), equal when closed
+        """
+        offset = weekday * MINUTES_PER_DAY
+        return self.ranges[2 * weekday] - offset, self.ranges[2 * weekday + 1] - offset
+
+    def is_open(self, start: datetime, duration_minutes: int) -> bool:
+        """
+        Check whether the court is open for the whole of a reservation.
+
+        Args:
+            start (datetime): Start of the reservation
+            duration_minutes (int): Duration of the reservation in minutes
+
+        Returns:
+            bool: True if the reservation fits within the opening hours of its day
+        """
+        weekday = start.weekday()
+        first = weekday * MINUTES_PER_DAY + start.hour * 60 + start.minute
+        return (duration_minutes > 0 and
+                self.ranges[2 * weekday] <= first and
+                first + duration_minutes <= self.ranges[2 * weekday + 1])
+
+@lru_cache(maxsize=64)
+def _compile_daily(opening_time: str, closing_time: str) -> OpeningHours:
+    opening, closing = parse_hhmm(opening_time), parse_hhmm(closing_time)
+    ranges = array('H')
+    for weekday in range(7):
+        offset = weekday * MINUTES_PER_DAY
+        ranges.extend((offset + opening, offset + max(opening, closing)))
+    return OpeningHours(ranges)
+
+@lru_cache(maxsize=1024)
+def _compile_json(available_hours: Optional[str]) -> OpeningHours:
+    if not available_hours:
+        return _compile_daily(DEFAULT_OPENING_TIME, DEFAULT_CLOSING_TIME)
+    schedule = json.loads(available_hours)
+    ranges = array('H')
+    for weekday, name in enumerate(WEEKDAYS):
+        offset = weekday * MINUTES_PER_DAY
+        span = schedule.get(name)
+        if span:
+            opening, closing = (parse_hhmm(part) for part in span.split('-'))
+        else:
+            opening = closing = 0
+        ranges.extend((offset + opening, offset + max(opening, closing)))
+    return OpeningHours(ranges)
+
+_CLOSED = OpeningHours(array('H', [0] * 14))
+
+_hours_by_court: Dict[int, OpeningHours] = {}
+_hours_lock = threading.Lock()
+
+def get_opening_hours(court_id: int, available_hours: Optional[str] = None) -> OpeningHours:
+    """
+    Return the compiled opening hours of a court, compiling them on first use.
+
+    Args:
+        court_id (int): ID of the court
+        available_hours (Optional[str]): The court's available_hours, when already loaded
+
+    Returns:
+        OpeningHours: Compiled schedule; always closed when the court does not exist
+            or its schedule cannot be parsed
+    """
+    hours = _hours_by_court.get(court_id)
+    if hours is not None:
+        return hours
+    if available_hours is None:
+        with primary_reads():
+            row = db.session.query(TennisCourt.available_hours).filter(TennisCourt.id == court_id).first()
+        if row is None:
+            return _CLOSED
+        available_hours = row[0]
+    try:
+        hours = OpeningHours.compile(available_hours)
+    except Exception as e:
+        logger.error(f"Error compiling opening hours for court {court_id}: {str(e)}")
+        hours = _CLOSED
+    with _hours_lock:
+        _hours_by_court[court_id] = hours
+    return hours
+
+def reset_opening_hours():
+    """Drop every compiled schedule so they are recompiled on next use."""
+    with _hours_lock:
+        _hours_by_court.clear()
+
+def _invalidate_court(op: str, row: Dict, old: Optional[Dict]):
+    with _hours_lock:
+        _hours_by_court.pop(row['id'], None)
+
+on_commit(TennisCourt, _invalidate_court)
+on_external_catalog_change(reset_opening_hours)
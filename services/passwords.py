@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256:600000'
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many password hashes are already queued."""
+
+class PasswordHasher:
+    """
+    Runs password hashing in a dedicated process pool with bounded queueing.
+
+    At most `max_pending` hashes may be running or queued at once; further callers
+    wait up to `queue_timeout` seconds for a place and then get PasswordHasherBusy,
+    so a login storm sheds load instead of tying up every request thread.
+    With `workers` set to 0 hashing runs inline on the calling thread.
+    """
+
+    def __init__(self, method: str = DEFAULT_HASH_METHOD, workers: int = 2,
+                 max_pending: int = 32, queue_timeout: float = 2.0):
+        """
+        Initialize the hasher; the process pool is started on first use.
+
+        Args:
+            method (str): Werkzeug hash method, e.g. 'pbkdf2:sha256:600000'
+            workers (int): Hashing processes, 0 to hash inline
+            max_pending (int): Maximum hashes running or queued at once
+            queue_timeout (float): Seconds to wait for a place in the queue
+        """
+        self.method = method
+        # Method as written into hashes, e.g. 'scrypt:32768:8:1' for 'scrypt'
+        self._hash_prefix: Optional[str] = None
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # Pools do not survive fork, so each worker process starts its own
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _run(self, function, *args):
+        if not self.workers:
+            return function(*args)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHasherBusy('Password hashing queue is full')
+        try:
+            return self._executor().submit(function, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """
+        Hash a password with the configured method.
+
+        Args:
+            password (str): Plain-text password
+
+        Returns:
+            str: Werkzeug password hash
+        """
+        password_hash = self._run(generate_password_hash, password, self.method)
+        self._hash_prefix = password_hash.split('$', 1)[0]
+        return password_hash
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        """
+        Check a password against a stored hash.
+
+        Args:
+            password_hash (str): Stored Werkzeug password hash
+            password (str): Plain-text password
+
+        Returns:
+            bool: True if the password matches
+        """
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """
+        Check whether a stored hash was made with a different method or cost.
+
+        The configured method may leave parameters to Werkzeug's defaults, so it is
+        compared in the fully spelled-out form Werkzeug writes into hashes, taken from
+        a hash this hasher made (hashing once if it has not made any yet).
+
+        Args:
+            password_hash (str): Stored Werkzeug password hash
+
+        Returns:
+            bool: True if the hash should be replaced on the next successful login
+        """
+        if not password_hash:
+            return False
+        if self._hash_prefix is None:
+            self.hash('')
+        return password_hash.split('$', 1)[0] != self._hash_prefix
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
+
+_hasher: Optional[PasswordHasher] = None
+_hasher_lock = threading.Lock()
+
+def get_password_hasher() -> PasswordHasher:
+    """
+    Return the process-wide password hasher, configured from the app config on first use.
+
+    Returns:
+        PasswordHasher: Shared hasher (inline with default settings outside an app)
+    """
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                if not has_app_context():
+                    return PasswordHasher(workers=0)
+                config = current_app.config
+                _hasher = PasswordHasher(config.get('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD),
+                                         config.get('PASSWORD_HASH_WORKERS', 2),
+                                         config.get('PASSWORD_HASH_MAX_PENDING', 32),
+                                         config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0))
+    return _hasher
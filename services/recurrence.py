@@ -0,0 +1,138 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WEEKDAY_CODES = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+FREQUENCIES = ('DAILY', 'WEEKLY')
+
+class RecurrenceRule:
+    """
+    The subset of an iCalendar RRULE needed for court bookings.
+
+    Supports FREQ=DAILY or WEEKLY with INTERVAL, BYDAY and one of COUNT or UNTIL,
+    e.g. "FREQ=WEEKLY;BYDAY=TU,TH;COUNT=24". Every occurrence keeps the time of day
+    of the first one.
+    """
+
+    __slots__ = ('freq', 'interval', 'weekdays', 'count', 'until')
+
+    def __init__(self, freq: str, interval: int = 1, weekdays: Optional[List[int]] = None,
+                 count: Optional[int] = None, until: Optional[date] = None):
+        self.freq = freq
+        self.interval = interval
+        self.weekdays = weekdays
+        self.count = count
+        self.until = until
+
+    @classmethod
+    def parse(cls, rule: str) -> 'RecurrenceRule':
+        """
+        Parse an RRULE string; a leading "RRULE:" is ignored.
+
+        Args:
+            rule (str): Rule like "FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20270331"
+
+        Returns:
+            RecurrenceRule: Parsed rule
+
+        Raises:
+            ValueError: If the rule is malformed or uses unsupported parts
+        """
+        if not isinstance(rule, str):
+            raise ValueError("rule must be an RRULE string")
+        if rule.upper().startswith('RRULE:'):
+            rule = rule[len('RRULE:'):]
+        parts: Dict[str, str] = {}
+        for part in filter(None, rule.strip().split(';')):
+            name, separator, value = part.partition('=')
+            if not separator or not value:
+                raise ValueError(f"Malformed rule part: {part}")
+            parts[name.strip().upper()] = value.strip().upper()
+
+        freq = parts.pop('FREQ', None)
+        if freq not in FREQUENCIES:
+            raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+        interval = int(parts.pop('INTERVAL', '1'))
+        if interval < 1:
+            raise ValueError("INTERVAL must be at least 1")
+        weekdays = None
+        if 'BYDAY' in parts:
+            codes = parts.pop('BYDAY').split(',')
+            if any(code not in WEEKDAY_CODES for code in codes):
+                raise ValueError(f"BYDAY takes {','.join(WEEKDAY_CODES)}")
+            weekdays = sorted({WEEKDAY_CODES.index(code) for code in codes})
+        count = int(parts.pop('COUNT')) if 'COUNT' in parts else None
+        until = _parse_until(parts.pop('UNTIL')) if 'UNTIL' in parts else None
+        if (count is None) == (until is None):
+            raise ValueError("Exactly one of COUNT or UNTIL is required")
+        if count is not None and count < 1:
+            raise ValueError("COUNT must be at least 1")
+        if parts:
+            raise ValueError(f"Unsupported rule parts: {', '.join(sorted(parts))}")
+        return cls(freq, interval, weekdays, count, until)
+
+    def occurrences(self, first: datetime, limit: int) -> List[datetime]:
+        """
+        Expand the rule from its first occurrence.
+
+        Like DTSTART in iCalendar, `first` is always the first occurrence and counts
+        towards COUNT, even when BYDAY does not include its weekday.
+
+        Args:
+            first (datetime): Start of the first occurrence
+            limit (int): Maximum number of occurrences
+
+        Returns:
+            List[datetime]: Occurrence starts in order
+
+        Raises:
+            ValueError: If the rule yields more than `limit` occurrences or can never
+                produce a second one
+        """
+        if self.until is not None and self.until < first.date():
+            raise ValueError("UNTIL is before the first occurrence")
+        if self.freq == 'DAILY' and self.weekdays is not None:
+            # Every INTERVAL days only reaches some weekdays; a rule that can never land
+            # on BYDAY would otherwise never end
+            reachable = {(first.weekday() + step * self.interval) % 7 for step in range(7)}
+            if not reachable & set(self.weekdays):
+                raise ValueError("INTERVAL never lands on a BYDAY weekday")
+        occurrences = [first]
+        if self.freq == 'DAILY':
+            period_start, step, offsets = first, timedelta(days=self.interval), [0]
+        else:
+            # Weekly periods start on Monday, so BYDAY days before the first
+            # occurrence's weekday are only used from the next period on
+            period_start = first - timedelta(days=first.weekday())
+            step = timedelta(weeks=self.interval)
+            offsets = self.weekdays if self.weekdays is not None else [first.weekday()]
+        while True:
+            for offset in offsets:
+                candidate = period_start + timedelta(days=offset)
+                if candidate <= first:
+                    continue
+                if self.count is not None and len(occurrences) >= self.count:
+                    return occurrences
+                if self.until is not None and candidate.date() > self.until:
+                    return occurrences
+                if self.freq == 'DAILY' and self.weekdays is not None and candidate.weekday() not in self.weekdays:
+                    continue
+                if len(occurrences) >= limit:
+                    raise ValueError(f"The rule yields more than {limit} occurrences")
+                occurrences.append(candidate)
+            period_start += step
+
+def _parse_until(value: str) -> date:
+    """Parse an UNTIL value, in iCalendar (20270331 or 20270331T235959Z) or ISO form."""
+    value = value.rstrip('Z')
+    try:
+        if 'T' in value and '-' not in value:
+            return datetime.strptime(value, '%Y%m%dT%H%M%S').date()
+        if '-' not in value:
+            return datetime.strptime(value, '%Y%m%d').date()
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        raise ValueError(f"Invalid UNTIL: {value}")
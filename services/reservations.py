@@ -0,0 +1,392 @@
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from models.models import db, Booking, BookingArchive, CourtSlot, Match, MatchArchive, User
+from services.availability import SLOT_MINUTES
+from services.court_calendar import RESERVATION_LOOKBACK
+
+logger = logging.getLogger(__name__)
+
+Reservation = Union[Booking, Match]
+# Reservations read from either the hot or the archive tables
+AnyReservation = Union[Booking, Match, BookingArchive, MatchArchive]
+ReservationKey = Tuple[datetime, str, int]
+
+class SlotTaken(Exception):
+    """Raised when a reservation overlaps one that was committed first."""
+
+def reservation_slots(start: datetime, end: datetime) -> List[datetime]:
+    """
+    List the slot starts covered by a reservation.
+
+    Reservations that do not start or end on a slot boundary claim every slot they
+    touch, so they can never share a slot with another reservation.
+
+    Args:
+        start (datetime): Start of the reservation
+        end (datetime): End of the reservation
+
+    Returns:
+        List[datetime]: Start times of the covered slots
+    """
+    slot = start.replace(minute=start.minute - start.minute % SLOT_MINUTES, second=0, microsecond=0)
+    slots = []
+    while slot < end:
+        slots.append(slot)
+        slot += timedelta(minutes=SLOT_MINUTES)
+    return slots
+
+def _span(reservation: Reservation) -> Tuple[int, datetime, datetime, Dict]:
+    """Return (court id, start, end, owner column) of a flushed booking or match."""
+    if isinstance(reservation, Booking):
+        return (reservation.tennis_court_id, reservation.booking_time, reservation.end_time,
+                {'booking_id': reservation.id})
+    return reservation.court_id, reservation.match_time, reservation.end_time, {'match_id': reservation.id}
+
+def _claims(reservation: Reservation) -> List[Dict]:
+    court_id, start, end, owner = _span(reservation)
+    return [dict(owner, court_id=court_id, slot_start=slot) for slot in reservation_slots(start, end)]
+
+def reserve(reservation: Reservation, commit: bool = True) -> Reservation:
+    """
+    Commit a new booking or match together with claims on every slot it covers.
+
+    The claims are rows of a table that is unique on (court, slot), so when two
+    overlapping reservations race, the database lets the first commit and rejects
+    the second; no lock is held beyond the insert itself.
+
+    Args:
+        reservation (Reservation): New, unsaved Booking or Match
+        commit (bool): False to leave the transaction open after the claims, so the
+            caller can add more to it (e.g. jobs) before committing
+
+    Returns:
+        Reservation: The committed reservation
+
+    Raises:
+        SlotTaken: If another reservation already holds one of the slots
+    """
+    try:
+        db.session.add(reservation)
+        db.session.flush()
+        db.session.execute(insert(CourtSlot), _claims(reservation))
+        if commit:
+            db.session.commit()
+        return reservation
+    except IntegrityError:
+        db.session.rollback()
+        court_id, start, _, _ = _span(reservation)
+        logger.info(f"Slot on court {court_id} at {start} was taken concurrently")
+        raise SlotTaken(f"Court {court_id} is already reserved at {start}")
+
+def reserve_many(reservations: List[Reservation], commit: bool = True) -> List[Reservation]:
+    """
+    Commit several new bookings or matches and their slot claims in one transaction.
+
+    Either every reservation is committed or, when any of them lost a slot to a
+    concurrent writer, none is.
+
+    Args:
+        reservations (List[Reservation]): New, unsaved Bookings or Matches
+        commit (bool): False to leave the transaction open, as for reserve
+
+    Returns:
+        List[Reservation]: The committed reservations
+
+    Raises:
+        SlotTaken: If another reservation already holds one of the slots
+    """
+    try:
+        db.session.add_all(reservations)
+        db.session.flush()
+        claims = [claim for reservation in reservations for claim in _claims(reservation)]
+        if claims:
+            db.session.execute(insert(CourtSlot), claims)
+        if commit:
+            db.session.commit()
+        return reservations
+    except IntegrityError:
+        db.session.rollback()
+        logger.info(f"A slot of a series of {len(reservations)} reservations was taken concurrently")
+        raise SlotTaken("One of the requested times was reserved concurrently")
+
+def find_conflicts(requests: List[Tuple[int, datetime, datetime]]) -> List[Optional[str]]:
+    """
+    Check many proposed reservations against the existing ones and each other.
+
+    The active bookings and matches of all requested courts over the whole requested
+    period are read with one range query per table and merged with the proposals in
+    one (court, start) ordered sweep, rather than querying once per proposal. Proposals
+    are visited in start order, so an existing reservation that ends before one
+    proposal starts also ends before every later one, and a pointer that only moves
+    forward can skip it. This holds even where legacy reservations overlap each other.
+
+    Args:
+        requests (List[Tuple[int, datetime, datetime]]): (court id, start, end) per proposal
+
+    Returns:
+        List[Optional[str]]: Per proposal, in the given order, None when it is free or
+            'reserved' / 'overlaps_request' when it is not
+    """
+    conflicts: List[Optional[str]] = [None] * len(requests)
+    if not requests:
+        return conflicts
+    court_ids = sorted({court_id for court_id, _, _ in requests})
+    first = min(start for _, start, _ in requests)
+    last = max(end for _, _, end in requests)
+
+    existing: Dict[int, List[Tuple[datetime, datetime]]] = {court_id: [] for court_id in court_ids}
+    for model, court, start in ((Booking, Booking.tennis_court_id, Booking.booking_time),
+                                (Match, Match.court_id, Match.match_time)):
+        rows = db.session.execute(select(court, start, model.end_time).where(
+            court.in_(court_ids),
+            start > first - RESERVATION_LOOKBACK,
+            start < last,
+            model.end_time > first,
+            model.status != 'cancelled'
+        ).order_by(court, start))
+        for court_id, reserved_start, reserved_end in rows:
+            existing[court_id].append((reserved_start, reserved_end))
+
+    order = sorted(range(len(requests)), key=lambda index: requests[index][:2])
+    court_id, intervals, position, accepted_end = None, [], 0, None
+    for index in order:
+        requested_court, start, end = requests[index]
+        if requested_court != court_id:
+            court_id, position, accepted_end = requested_court, 0, None
+            # Bookings and matches were read separately; merge them once per court
+            intervals = sorted(existing[court_id])
+        while position < len(intervals) and intervals[position][1] <= start:
+            position += 1
+        if position < len(intervals) and intervals[position][0] < end:
+            conflicts[index] = 'reserved'
+        elif accepted_end is not None and start < accepted_end:
+            conflicts[index] = 'overlaps_request'
+        else:
+            accepted_end = end
+    return conflicts
+
+def overlapping_reservations(court_id: int, start: datetime, end: datetime) -> List[Reservation]:
+    """
+    Query the active bookings and matches on a court overlapping [start, end).
+
+    Reservations never last longer than RESERVATION_LOOKBACK, so the start column
+    is bounded on both sides and each query is a short range scan of the
+    (court, start, end) index.
+
+    Args:
+        court_id (int): ID of the court
+        start (datetime): Start of the interval
+        end (datetime): End of the interval
+
+    Returns:
+        List[Reservation]: Overlapping reservations in start order
+    """
+    bookings = db.session.scalars(select(Booking).where(
+        Booking.tennis_court_id == court_id,
+        Booking.booking_time > start - RESERVATION_LOOKBACK,
+        Booking.booking_time < end,
+        Booking.end_time > start,
+        Booking.status != 'cancelled'
+    ).order_by(Booking.booking_time))
+    matches = db.session.scalars(select(Match).where(
+        Match.court_id == court_id,
+        Match.match_time > start - RESERVATION_LOOKBACK,
+        Match.match_time < end,
+        Match.end_time > start,
+        Match.status != 'cancelled'
+    ).order_by(Match.match_time))
+    return list(heapq.merge(bookings, matches, key=_start))
+
+def upcoming_reservations(user_id: int, since: datetime, limit: int = 20,
+                          after: Optional[ReservationKey] = None,
+                          include_cancelled: bool = False) -> List[Reservation]:
+    """
+    Query a user's bookings and matches as one stream ordered by (start, kind, id).
+
+    Bookings, matches as player 1 and matches as player 2 are read with three
+    index range scans on (user, start) that each stop after `limit` rows, then merged.
+    Courts and opponents are joined into the same three queries, so rendering the
+    result issues no further SQL however many reservations the user has.
+
+    Args:
+        user_id (int): ID of the user
+        since (datetime): Only reservations starting at or after this time are returned
+        limit (int): Maximum number of reservations
+        after (Optional[ReservationKey]): Key of the last reservation of the previous page
+        include_cancelled (bool): Also return cancelled reservations
+
+    Returns:
+        List[Reservation]: Reservations in (start, kind, id) order
+    """
+    sources = (
+        (Booking, 'booking', Booking.user_id, Booking.booking_time, (joinedload(Booking.court),)),
+        (Match, 'match', Match.player1_id, Match.match_time,
+         (joinedload(Match.court), joinedload(Match.player2).load_only(User.id, User.username))),
+        (Match, 'match', Match.player2_id, Match.match_time,
+         (joinedload(Match.court), joinedload(Match.player1).load_only(User.id, User.username))),
+    )
+    results = []
+    for model, kind, owner, start, options in sources:
+        query = select(model).where(owner == user_id, start >= since)
+        if not include_cancelled:
+            query = query.where(model.status != 'cancelled')
+        if after is not None:
+            after_start, after_kind, after_id = after
+            # The kind is fixed per source, so the (start, kind, id) cursor reduces to (start, id)
+            if kind > after_kind:
+                query = query.where(start >= after_start)
+            elif kind < after_kind:
+                query = query.where(start > after_start)
+            else:
+                query = query.where(tuple_(start, model.id) > tuple_(after_start, after_id))
+        query = query.options(*options).order_by(start, model.id).limit(limit)
+        results.append(db.session.scalars(query).unique().all())
+
+    reservations = []
+    seen = set()
+    for reservation in heapq.merge(*results, key=reservation_key):
+        key = reservation_key(reservation)
+        # A match against oneself is found by both player queries
+        if key not in seen:
+            seen.add(key)
+            reservations.append(reservation)
+            if len(reservations) == limit:
+                break
+    return reservations
+
+def past_reservations(user_id: int, until: datetime, limit: int = 20,
+                      before: Optional[ReservationKey] = None) -> List[AnyReservation]:
+    """
+    Query a user's bookings and matches before a time, newest first, across the hot
+    and archive tables.
+
+    Like upcoming_reservations, each source is an index range scan on (user, start)
+    that stops after `limit` rows; the archive tables add three more sources to the
+    merge, so callers see one history however much of it has been archived.
+
+    Args:
+        user_id (int): ID of the user
+        until (datetime): Only reservations starting before this time are returned
+        limit (int): Maximum number of reservations
+        before (Optional[ReservationKey]): Key of the last reservation of the previous page
+
+    Returns:
+        List[AnyReservation]: Reservations in descending (start, kind, id) order
+    """
+    sources = []
+    for booking_model, match_model in ((Booking, Match), (BookingArchive, MatchArchive)):
+        sources.extend((
+            (booking_model, 'booking', booking_model.user_id, booking_model.booking_time,
+             (joinedload(booking_model.court),)),
+            (match_model, 'match', match_model.player1_id, match_model.match_time,
+             (joinedload(match_model.court), joinedload(match_model.player2).load_only(User.id, User.username))),
+            (match_model, 'match', match_model.player2_id, match_model.match_time,
+             (joinedload(match_model.court), joinedload(match_model.player1).load_only(User.id, User.username))),
+        ))
+    results = []
+    for model, kind, owner, start, options in sources:
+        query = select(model).where(owner == user_id, start < until)
+        if before is not None:
+            before_start, before_kind, before_id = before
+            if kind < before_kind:
+                query = query.where(start <= before_start)
+            elif kind > before_kind:
+                query = query.where(start < before_start)
+            else:
+                query = query.where(tuple_(start, model.id) < tuple_(before_start, before_id))
+        query = query.options(*options).order_by(start.desc(), model.id.desc()).limit(limit)
+        results.append(db.session.scalars(query).unique().all())
+
+    reservations = []
+    seen = set()
+    for reservation in heapq.merge(*results, key=reservation_key, reverse=True):
+        key = reservation_key(reservation)
+        if key not in seen:
+            seen.add(key)
+            reservations.append(reservation)
+            if len(reservations) == limit:
+                break
+    return reservations
+
+def reservation_key(reservation: AnyReservation) -> ReservationKey:
+    """
+    Return the (start, kind, id) key that orders a user's schedule.
+
+    Args:
+        reservation (AnyReservation): Booking or Match, live or archived
+
+    Returns:
+        ReservationKey: Sort and cursor key of the reservation
+    """
+    if isinstance(reservation, (Booking, BookingArchive)):
+        return reservation.booking_time, 'booking', reservation.id
+    return reservation.match_time, 'match', reservation.id
+
+def _start(reservation: Reservation) -> datetime:
+    return reservation.booking_time if isinstance(reservation, Booking) else reservation.match_time
+
+def _claim_rows(connection, owner: str, rows) -> int:
+    claims = [{owner: row_id, 'court_id': court_id, 'slot_start': slot}
+              for row_id, court_id, start, end in rows for slot in reservation_slots(start, end)]
+    if claims:
+        connection.execute(insert(CourtSlot), claims)
+    return len(claims)
+
+def backfill_court_slots(batch_size: int = 1000) -> int:
+    """
+    Claim the slots of active reservations that predate the slot table.
+
+    Only reservations that have not ended are claimed: claims exist to make new
+    reservations conflict, and those cannot start in the past. Each batch is
+    committed on its own, so the backfill can be interrupted and resumed. Legacy
+    reservations that overlap one claimed before them are logged and left unclaimed
+    instead of failing the backfill.
+
+    Args:
+        batch_size (int): Reservations claimed per transaction
+
+    Returns:
+        int: Number of slots claimed
+    """
+    now = datetime.now()
+    claimed = 0
+    skipped = 0
+    for model, owner in ((Booking, 'booking_id'), (Match, 'match_id')):
+        table = model.__table__
+        court = table.c.tennis_court_id if model is Booking else table.c.court_id
+        start = table.c.booking_time if model is Booking else table.c.match_time
+        owner_column = CourtSlot.__table__.c[owner]
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(table.c.id, court, start, table.c.end_time)
+                .where(table.c.id > last_id, table.c.status != 'cancelled', table.c.end_time > now,
+                       table.c.id.not_in(select(owner_column).where(owner_column.is_not(None))))
+                .order_by(table.c.id).limit(batch_size)
+            ).all()
+            db.session.rollback()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            try:
+                with db.engine.begin() as connection:
+                    claimed += _claim_rows(connection, owner, rows)
+                continue
+            except IntegrityError:
+                pass
+            # Some reservation in the batch overlaps another: claim them one at a time
+            for row in rows:
+                try:
+                    with db.engine.begin() as connection:
+                        claimed += _claim_rows(connection, owner, [row])
+                except IntegrityError:
+                    skipped += 1
+                    logger.warning(f"{table.name} {row[0]} on court {row[1]} at {row[2]} overlaps "
+                                   f"another reservation; its slots were not claimed")
+    logger.info(f"Backfilled {claimed} court slots, skipped {skipped} overlapping reservations")
+    return claimed
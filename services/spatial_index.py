@@ -0,0 +1,241 @@
+import heapq
+import logging
+import threading
+from math import ceil, cos, floor, radians
+from typing import Callable, Dict, List, Optional, Tuple
+from flask import current_app
+from models.models import db, TennisCourt
+from services.geo import KM_PER_DEGREE, haversine_many
+from services.catalog_cache import on_external_catalog_change
+from utils.db_engine import primary_reads
+from utils.db_events import on_commit
+
+logger = logging.getLogger(__name__)
+
+class GridIndex:
+    """
+    Fixed-size latitude/longitude grid over point coordinates.
+
+    Points are bucketed into square cells of `cell_size` degrees, so radius and
+    k-nearest queries only look at the handful of cells around the query point
+    instead of every point in the index.
+    """
+
+    def __init__(self, cell_size: float = 0.05):
+        """
+        Initialize an empty index.
+
+        Args:
+            cell_size (float): Cell edge length in degrees
+        """
+        self.cell_size = cell_size
+        self._columns = int(ceil(360 / cell_size))
+        self._cells: Dict[Tuple[int, int], Dict[int, Tuple[float, float]]] = {}
+        self._points: Dict[int, Tuple[int, int]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        row = int(floor((latitude + 90) / self.cell_size))
+        column = int(floor((longitude + 180) / self.cell_size)) % self._columns
+        return row, column
+
+    def insert(self, point_id: int, latitude: float, longitude: float):
+        """
+        Add a point, replacing any previous position stored under the same id.
+
+        Args:
+            point_id (int): Identifier of the point
+            latitude (float): Latitude of the point
+            longitude (float): Longitude of the point
+        """
+        with self._lock:
+            self.remove(point_id)
+            key = self._cell(latitude, longitude)
+            self._cells.setdefault(key, {})[point_id] = (latitude, longitude)
+            self._points[point_id] = key
+
+    def remove(self, point_id: int):
+        """
+        Remove a point if it is present.
+
+        Args:
+            point_id (int): Identifier of the point
+        """
+        with self._lock:
+            key = self._points.pop(point_id, None)
+            if key is None:
+                return
+            cell = self._cells[key]
+            del cell[point_id]
+            if not cell:
+                del self._cells[key]
+
+    def _all_points(self):
+        for cell in self._cells.values():
+            yield from cell.items()
+
+    def _box_points(self, row_min: int, row_max: int, columns: Optional[List[int]]):
+        """Yield points from a block of cells, falling back to a full scan when that is cheaper."""
+        rows = row_max - row_min + 1
+        if columns is None or rows * len(columns) > len(self._cells):
+            yield from self._all_points()
+            return
+        for row in range(row_min, row_max + 1):
+            for column in columns:
+                cell = self._cells.get((row, column))
+                if cell:
+                    yield from cell.items()
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[int, float]]:
+        """
+        Find every point within a radius of a location.
+
+        Args:
+            latitude (float): Query latitude
+            longitude (float): Query longitude
+            radius_km (float): Search radius in kilometers
+
+        Returns:
+            List[Tuple[int, float]]: (point id, distance in km) pairs sorted by distance
+        """
+        delta_lat = radius_km / KM_PER_DEGREE
+        row_min, _ = self._cell(max(latitude - delta_lat, -90), longitude)
+        row_max, _ = self._cell(min(latitude + delta_lat, 90), longitude)
+
+        columns = None
+        max_lat = min(abs(latitude) + delta_lat, 90)
+        if max_lat < 89:
+            delta_lng = delta_lat / cos(radians(max_lat))
+            if delta_lng < 180:
+                _, first = self._cell(latitude, longitude - delta_lng)
+                _, last = self._cell(latitude, longitude + delta_lng)
+                span = (last - first) % self._columns + 1
+                columns = [(first + i) % self._columns for i in range(span)]
+
+        with self._lock:
+            candidates = list(self._box_points(row_min, row_max, columns))
+        distances = _distances(latitude, longitude, candidates)
+        results = [
+            (point_id, float(distance))
+            for (point_id, _), distance in zip(candidates, distances)
+            if distance <= radius_km
+        ]
+        results.sort(key=lambda item: item[1])
+        return results
+
+    def nearest(self, latitude: float, longitude: float, k: int,
+                max_distance_km: Optional[float] = None,
+                accept: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, float]]:
+        """
+        Find the k points closest to a location.
+
+        Cells are visited in rings of growing size around the query cell and the search
+        stops as soon as no unvisited cell can hold anything closer than the current k-th hit.
+
+        Args:
+            latitude (float): Query latitude
+            longitude (float): Query longitude
+            k (int): Maximum number of points to return
+            max_distance_km (Optional[float]): Ignore points further away than this
+            accept (Optional[Callable[[int], bool]]): Only consider point ids for which
+                this returns True
+
+        Returns:
+            List[Tuple[int, float]]: (point id, distance in km) pairs sorted by distance
+        """
+        if k <= 0:
+            return []
+        limit = max_distance_km if max_distance_km is not None else float('inf')
+        heap: List[Tuple[float, int]] = []  # max-heap of (-distance, id)
+
+        def consider(points):
+            if accept is not None:
+                points = [point for point in points if accept(point[0])]
+            for (point_id, _), distance in zip(points, _distances(latitude, longitude, points)):
+                distance = float(distance)
+                if distance > limit:
+                    continue
+                if len(heap) < k:
+                    heapq.heappush(heap, (-distance, point_id))
+                elif distance < -heap[0][0]:
+                    heapq.heapreplace(heap, (-distance, point_id))
+
+        with self._lock:
+            center_row, center_column = self._cell(latitude, longitude)
+            ring = 0
+            while True:
+                if 2 * ring + 1 >= self._columns or 8 * ring > len(self._cells):
+                    # The ring is bigger than the occupied part of the grid: scan what is left
+                    heap.clear()
+                    consider(list(self._all_points()))
+                    break
+                ring_points = []
+                for row in range(center_row - ring, center_row + ring + 1):
+                    edge = row in (center_row - ring, center_row + ring)
+                    step = 1 if edge else 2 * ring
+                    for offset in range(-ring, ring + 1, max(step, 1)):
+                        cell = self._cells.get((row, (center_column + offset) % self._columns))
+                        if cell:
+                            ring_points.extend(cell.items())
+                if ring_points:
+                    consider(ring_points)
+
+                max_lat = min(abs(latitude) + (ring + 1) * self.cell_size, 90)
+                reach_km = ring * self.cell_size * KM_PER_DEGREE * cos(radians(max_lat))
+                kth = -heap[0][0] if len(heap) == k else limit
+                if reach_km >= kth:
+                    break
+                ring += 1
+
+        return sorted(((point_id, -neg) for neg, point_id in heap), key=lambda item: item[1])
+
+def _distances(latitude: float, longitude: float, points: List[Tuple[int, Tuple[float, float]]]):
+    """Batch distances from a location to (id, (lat, lng)) index entries."""
+    return haversine_many(latitude, longitude,
+                          [lat for _, (lat, _) in points],
+                          [lng for _, (_, lng) in points])
+
+_court_index: Optional[GridIndex] = None
+_court_index_lock = threading.Lock()
+
+def get_court_index() -> GridIndex:
+    """
+    Return the process-wide spatial index of tennis courts, building it on first use.
+
+    Returns:
+        GridIndex: Index of court ids by latitude/longitude
+    """
+    global _court_index
+    if _court_index is None:
+        with _court_index_lock:
+            if _court_index is None:
+                index = GridIndex(current_app.config.get('SPATIAL_INDEX_CELL_DEGREES', 0.05))
+                # Built from the primary: later changes only arrive through commit hooks
+                with primary_reads():
+                    rows = db.session.query(TennisCourt.id, TennisCourt.latitude, TennisCourt.longitude).all()
+                for court_id, latitude, longitude in rows:
+                    index.insert(court_id, latitude, longitude)
+                logger.info(f"Built court spatial index with {len(index)} courts")
+                _court_index = index
+    return _court_index
+
+def reset_court_index():
+    """Drop the court index so it is rebuilt from the database on next use."""
+    global _court_index
+    with _court_index_lock:
+        _court_index = None
+
+def _sync_court(op: str, row: Dict, old: Optional[Dict]):
+    index = _court_index
+    if index is None:
+        return
+    if op == 'delete':
+        index.remove(row['id'])
+    else:
+        index.insert(row['id'], row['latitude'], row['longitude'])
+
+on_commit(TennisCourt, _sync_court)
+on_external_catalog_change(reset_court_index)
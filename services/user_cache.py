@@ -0,0 +1,140 @@
+import json
+import logging
+import threading
+from typing import Dict, Optional
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from models.models import db, User
+from utils.cache import FileCache, LRUCache
+from utils.db_events import on_commit
+from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+class UserSnapshot(UserMixin):
+    """
+    Read-only copy of the User columns needed to serve a request.
+
+    Returned by the login manager instead of an ORM instance, so authenticating a
+    request does not need a database session. Code that needs relationships or
+    wants to modify the user must load the User row itself.
+
+    A snapshot may be up to USER_CACHE_TTL seconds stale in workers other than the
+    one that committed the change, so it is only used to identify the user:
+    authorization checks such as admin_required read the User row.
+    """
+
+    def __init__(self, id: int, username: str, email: str):
+        self.id = id
+        self.username = username
+        self.email = email
+
+    def to_dict(self) -> Dict:
+        return {'id': self.id, 'username': self.username, 'email': self.email}
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.username}>'
+
+class UserCache:
+    """
+    Bounded TTL cache of user snapshots by id, optionally shared across workers.
+
+    Lookups go to the per-process LRU, then the shared file cache when one is
+    configured, and only then to the database. Commits clear the entry in the
+    committing process and the shared file cache; the LRUs of other workers keep
+    their copy until it is `ttl` seconds old, which bounds how long a changed or
+    deleted user is still served from them.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300, directory: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize (int): Maximum number of snapshots kept per process
+            ttl (float): Seconds a snapshot may be served without reloading it
+            directory (Optional[str]): Directory of the shared file cache, if any
+        """
+        self.local = LRUCache(maxsize, ttl)
+        self.ttl = ttl
+        self.shared = FileCache(directory) if directory else None
+        self.shared_hits = 0
+        self.db_loads = 0
+
+    def load(self, user_id: int) -> Optional[UserSnapshot]:
+        """
+        Return the snapshot of a user.
+
+        Args:
+            user_id (int): ID of the user
+
+        Returns:
+            Optional[UserSnapshot]: Snapshot, or None if the user does not exist
+        """
+        snapshot = self.local.get(user_id)
+        if snapshot is not None:
+            return snapshot
+
+        if self.shared is not None:
+            payload = self.shared.get('users', str(user_id), max_age=self.ttl)
+            if payload is not None:
+                snapshot = UserSnapshot(**json.loads(payload))
+                self.shared_hits += 1
+                self.local.set(user_id, snapshot)
+                return snapshot
+
+        self.db_loads += 1
+        row = db.session.query(User.id, User.username, User.email).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        snapshot = UserSnapshot(row.id, row.username, row.email)
+        self.local.set(user_id, snapshot)
+        if self.shared is not None:
+            self.shared.set('users', str(user_id), json.dumps(snapshot.to_dict()).encode('utf-8'))
+        return snapshot
+
+    def invalidate(self, user_id: int):
+        """
+        Forget the snapshot of a user.
+
+        Args:
+            user_id (int): ID of the user
+        """
+        self.local.delete(user_id)
+        if self.shared is not None:
+            self.shared.delete('users', str(user_id))
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters of every cache layer."""
+        local = self.local.stats()
+        return {
+            'hits': local['hits'],
+            'misses': local['misses'],
+            'shared_hits': self.shared_hits,
+            'db_loads': self.db_loads,
+            'size': local['size']
+        }
+
+_user_cache: Optional[UserCache] = None
+_user_cache_lock = threading.Lock()
+
+def get_user_cache() -> UserCache:
+    """Return the process-wide user cache, creating it from the app config."""
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                config = current_app.config
+                _user_cache = UserCache(config.get('USER_CACHE_SIZE', 10000),
+                                        config.get('USER_CACHE_TTL', 300),
+                                        config.get('USER_CACHE_DIR'))
+    return _user_cache
+
+def _invalidate_user(op: str, row: Dict, old: Optional[Dict]):
+    # Created if needed so processes that never load users, such as the CLI, still
+    # clear the shared file cache; other workers' LRUs expire after USER_CACHE_TTL
+    if _user_cache is not None or has_app_context():
+        get_user_cache().invalidate(row['id'])
+
+on_commit(User, _invalidate_user)
+get_metrics().register_cache('users', lambda: _user_cache.stats() if _user_cache else None)
@@ -0,0 +1,283 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, delete, event, func, insert, inspect, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from models.models import db, Booking, CourtUsageDay, CourtUsageHour, Match, TennisCourt
+from services.archive import ARCHIVES
+from services.opening_hours import get_opening_hours
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('booking_minutes', 'match_minutes', 'reservations')
+
+# Per reservation kind: model, court column and start column
+RESERVATION_COLUMNS = {
+    'booking': (Booking, 'tennis_court_id', 'booking_time'),
+    'match': (Match, 'court_id', 'match_time')
+}
+
+# (rollup model, court id, hour or day) -> [booking minutes, match minutes, reservations]
+UsageDeltas = Dict[Tuple[type, int, object], List[int]]
+
+def _new_deltas() -> UsageDeltas:
+    return defaultdict(lambda: [0, 0, 0])
+
+def _is_active(status: Optional[str]) -> bool:
+    return status != 'cancelled'
+
+def usage_deltas(kind: str, court_id: int, start: datetime, end: datetime, sign: int,
+                 deltas: Optional[UsageDeltas] = None) -> UsageDeltas:
+    """
+    Split a reservation into the hourly and daily rollup rows it contributes to.
+
+    Args:
+        kind (str): 'booking' or 'match'
+        court_id (int): ID of the court
+        start (datetime): Start of the reservation
+        end (datetime): End of the reservation
+        sign (int): 1 to add the reservation, -1 to remove it
+        deltas (Optional[UsageDeltas]): Deltas to add to, a new mapping when not given
+
+    Returns:
+        UsageDeltas: Counter changes per rollup row
+    """
+    if deltas is None:
+        deltas = _new_deltas()
+    column = 0 if kind == 'booking' else 1
+    first_hour = start.replace(minute=0, second=0, microsecond=0)
+    deltas[(CourtUsageHour, court_id, first_hour)][2] += sign
+    deltas[(CourtUsageDay, court_id, start.date())][2] += sign
+    cursor = start
+    while cursor < end:
+        hour = cursor.replace(minute=0, second=0, microsecond=0)
+        boundary = min(end, hour + timedelta(hours=1))
+        minutes = round((boundary - cursor).total_seconds() / 60)
+        deltas[(CourtUsageHour, court_id, hour)][column] += sign * minutes
+        deltas[(CourtUsageDay, court_id, hour.date())][column] += sign * minutes
+        cursor = boundary
+    return deltas
+
+def _upsert(connection: Connection, model, bucket: str, rows: List[Dict]):
+    table = model.__table__
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(connection.dialect.name)
+    if dialect is not None:
+        statement = dialect.insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['court_id', bucket],
+            set_={name: table.c[name] + statement.excluded[name] for name in COUNTERS}
+        )
+        connection.execute(statement, rows)
+        return
+    for row in rows:
+        result = connection.execute(
+            update(table).where(table.c.court_id == row['court_id'], table.c[bucket] == row[bucket])
+            .values({name: table.c[name] + row[name] for name in COUNTERS})
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table), row)
+
+def apply_usage_deltas(connection: Connection, deltas: UsageDeltas):
+    """
+    Add counter changes to the rollup tables, creating missing rows.
+
+    Args:
+        connection (Connection): Connection of the transaction making the change
+        deltas (UsageDeltas): Counter changes per rollup row
+    """
+    rows = {CourtUsageHour: [], CourtUsageDay: []}
+    for (model, court_id, bucket), counters in deltas.items():
+        if any(counters):
+            bucket_column = 'hour' if model is CourtUsageHour else 'day'
+            rows[model].append({'court_id': court_id, bucket_column: bucket,
+                                **dict(zip(COUNTERS, counters))})
+    for model, bucket_column in ((CourtUsageHour, 'hour'), (CourtUsageDay, 'day')):
+        if rows[model]:
+            _upsert(connection, model, bucket_column, rows[model])
+
+def _keep_previous(target, value, oldvalue, initiator):
+    pass
+
+def _track(kind: str):
+    """Keep the rollups in step with a reservation model, inside the flushing transaction."""
+    model, court_attr, start_attr = RESERVATION_COLUMNS[kind]
+    attrs = (court_attr, start_attr, 'end_time', 'status')
+
+    def after_insert(mapper, connection, target):
+        if _is_active(target.status):
+            apply_usage_deltas(connection, usage_deltas(
+                kind, getattr(target, court_attr), getattr(target, start_attr), target.end_time, 1
+            ))
+
+    def after_update(mapper, connection, target):
+        state = inspect(target)
+        histories = [state.attrs[attr].history for attr in attrs]
+        if not any(history.has_changes() for history in histories):
+            return
+        old = [history.deleted[0] if history.deleted else getattr(target, attr)
+               for attr, history in zip(attrs, histories)]
+        new = [getattr(target, attr) for attr in attrs]
+        deltas = _new_deltas()
+        if _is_active(old[3]):
+            usage_deltas(kind, old[0], old[1], old[2], -1, deltas)
+        if _is_active(new[3]):
+            usage_deltas(kind, new[0], new[1], new[2], 1, deltas)
+        apply_usage_deltas(connection, deltas)
+
+    def after_delete(mapper, connection, target):
+        state = inspect(target)
+        old = [state.attrs[attr].history.deleted[0] if state.attrs[attr].history.deleted
+               else getattr(target, attr) for attr in attrs]
+        if _is_active(old[3]):
+            apply_usage_deltas(connection, usage_deltas(kind, old[0], old[1], old[2], -1))
+
+    for attr in attrs:
+        # Load the stored value before it is overwritten, even when the instance was
+        # expired by a commit, so after_update can take the old reservation out
+        event.listen(getattr(model, attr), 'set', _keep_previous, active_history=True)
+    event.listen(model, 'after_insert', after_insert)
+    event.listen(model, 'after_update', after_update)
+    event.listen(model, 'after_delete', after_delete)
+
+def rebuild_utilization(batch_size: int = 50000) -> int:
+    """
+    Recompute the rollup tables from every active booking and match, archived or not.
+
+    Runs in one transaction, so readers see either the old or the new rollups. Writes
+    committed while it runs may be counted twice or not at all; pause writes first.
+
+    Args:
+        batch_size (int): Reservations read per batch, and rollup rows buffered
+            before they are written
+
+    Returns:
+        int: Number of reservations counted
+    """
+    counted = 0
+    with db.engine.begin() as connection:
+        connection.execute(delete(CourtUsageHour))
+        connection.execute(delete(CourtUsageDay))
+        deltas = _new_deltas()
+        for kind, (hot_model, court_attr, start_attr) in RESERVATION_COLUMNS.items():
+            # Archived reservations still count; the archive tables share the column names
+            for model in (hot_model, ARCHIVES[kind][1]):
+                rows = connection.execution_options(yield_per=batch_size).execute(
+                    select(getattr(model, court_attr), getattr(model, start_attr), model.end_time)
+                    .where(or_(model.status.is_(None), model.status != 'cancelled'))
+                )
+                for court_id, start, end in rows:
+                    usage_deltas(kind, court_id, start, end, 1, deltas)
+                    counted += 1
+                    if len(deltas) >= batch_size:
+                        apply_usage_deltas(connection, deltas)
+                        deltas = _new_deltas()
+        apply_usage_deltas(connection, deltas)
+    logger.info(f"Rebuilt utilization rollups from {counted} reservations")
+    return counted
+
+def _open_minutes(available_hours: Optional[str], court_id: int, start_day: date, end_day: date) -> int:
+    days = (end_day - start_day).days + 1
+    weeks, remainder = divmod(days, 7)
+    hours = get_opening_hours(court_id, available_hours)
+    total = 0
+    for weekday in range(7):
+        opening, closing = hours.day_range(weekday)
+        occurrences = weeks + (1 if (weekday - start_day.weekday()) % 7 < remainder else 0)
+        total += occurrences * (closing - opening)
+    return total
+
+def _usage_totals(row) -> Dict:
+    values = row._mapping
+    return {
+        'booking_minutes': int(values.get('booking_minutes') or 0),
+        'match_minutes': int(values.get('match_minutes') or 0),
+        'reservations': int(values.get('reservations') or 0),
+        'revenue': round(float(values.get('revenue') or 0), 2)
+    }
+
+def utilization_report(start_day: date, end_day: date, court_id: Optional[int] = None,
+                       granularity: str = 'day') -> Dict:
+    """
+    Occupancy and revenue of courts over a range of days, read from the rollup tables.
+
+    Revenue is the reserved time priced at the court's current hourly price; occupancy
+    is reserved minutes over the minutes the court was open.
+
+    Args:
+        start_day (date): First day of the range
+        end_day (date): Last day of the range, inclusive
+        court_id (Optional[int]): Only report this court
+        granularity (str): 'hour', 'day' or 'month' buckets for the series
+
+    Returns:
+        Dict: Per-court totals under 'courts' and totals per bucket under 'series'
+    """
+    minutes = CourtUsageDay.booking_minutes + CourtUsageDay.match_minutes
+    day_filter = [CourtUsageDay.day >= start_day, CourtUsageDay.day <= end_day]
+    if court_id is not None:
+        day_filter.append(CourtUsageDay.court_id == court_id)
+
+    per_court = db.session.execute(
+        select(TennisCourt.id, TennisCourt.name, TennisCourt.available_hours,
+               func.sum(CourtUsageDay.booking_minutes).label('booking_minutes'),
+               func.sum(CourtUsageDay.match_minutes).label('match_minutes'),
+               func.sum(CourtUsageDay.reservations).label('reservations'),
+               (func.sum(minutes) * TennisCourt.price_per_hour / 60.0).label('revenue'))
+        .join(TennisCourt, TennisCourt.id == CourtUsageDay.court_id)
+        .where(*day_filter)
+        .group_by(TennisCourt.id)
+        .order_by(TennisCourt.id)
+    ).all()
+    if court_id is not None and not per_court:
+        # A court without reservations in the range still gets its (empty) totals
+        per_court = db.session.execute(
+            select(TennisCourt.id, TennisCourt.name, TennisCourt.available_hours)
+            .where(TennisCourt.id == court_id)
+        ).all()
+    courts = []
+    for row in per_court:
+        entry = {'court_id': row.id, 'name': row.name, **_usage_totals(row)}
+        open_minutes = _open_minutes(row.available_hours, row.id, start_day, end_day)
+        entry['open_minutes'] = open_minutes
+        entry['occupancy'] = round((entry['booking_minutes'] + entry['match_minutes']) / open_minutes, 4) \
+            if open_minutes else None
+        courts.append(entry)
+
+    if granularity == 'hour':
+        model, bucket = CourtUsageHour, CourtUsageHour.hour
+        bucket_filter = [CourtUsageHour.hour >= datetime.combine(start_day, datetime.min.time()),
+                         CourtUsageHour.hour < datetime.combine(end_day + timedelta(days=1), datetime.min.time())]
+        if court_id is not None:
+            bucket_filter.append(CourtUsageHour.court_id == court_id)
+    else:
+        model, bucket, bucket_filter = CourtUsageDay, CourtUsageDay.day, day_filter
+    series_rows = db.session.execute(
+        select(bucket.label('bucket'),
+               func.sum(model.booking_minutes).label('booking_minutes'),
+               func.sum(model.match_minutes).label('match_minutes'),
+               func.sum(model.reservations).label('reservations'),
+               func.sum((model.booking_minutes + model.match_minutes) * TennisCourt.price_per_hour / 60.0)
+               .label('revenue'))
+        .join(TennisCourt, TennisCourt.id == model.court_id)
+        .where(and_(*bucket_filter))
+        .group_by(bucket)
+        .order_by(bucket)
+    ).all()
+
+    series = []
+    for row in series_rows:
+        period = row.bucket.isoformat()
+        if granularity == 'month':
+            period = row.bucket.strftime('%Y-%m')
+            if series and series[-1]['period'] == period:
+                previous = series[-1]
+                for name, value in _usage_totals(row).items():
+                    previous[name] = round(previous[name] + value, 2) if name == 'revenue' else previous[name] + value
+                continue
+        series.append({'period': period, **_usage_totals(row)})
+    return {'courts': courts, 'series': series}
+
+for _kind in RESERVATION_COLUMNS:
+    _track(_kind)
@@ -22,8 +22,9 @@ function initMap() {
 
         console.log('Map initialized successfully');
         
-        // Fetch courts immediately
-        fetchNearbyCourts(defaultLocation);
+        // Reload clusters whenever the viewport changes, then fetch courts immediately
+        map.on('moveend', fetchNearbyCourts);
+        fetchNearbyCourts();
     } catch (error) {
         console.error('Error initializing map:', error);
         showError('Error initializing map. Please refresh the page.');
@@ -40,8 +41,8 @@ function getUserLocation() {
         navigator.geolocation.getCurrentPosition(
             position => {
                 const userLocation = [position.coords.latitude, position.coords.longitude];
+                // Moving the map triggers fetchNearbyCourts for the new viewport
                 map.setView(userLocation, 13);
-                fetchNearbyCourts(userLocation);
                 button.disabled = false;
                 button.innerHTML = '<i class="fas fa-location-arrow mr-2"></i>Use My Location';
             },
@@ -64,9 +65,11 @@ function getUserLocation() {
     }
 }
 
-// Fetch nearby courts
-function fetchNearbyCourts(location) {
-    console.log('Fetching courts for location:', location);
+// Fetch the courts and clusters in the current viewport
+function fetchNearbyCourts() {
+    const bounds = map.getBounds();
+    const zoom = map.getZoom();
+    console.log('Fetching courts for viewport:', bounds.toBBoxString(), 'zoom', zoom);
     const courtsContainer = document.getElementById('courts-container');
     
     // Show loading state
@@ -77,7 +80,14 @@ function fetchNearbyCourts(location) {
         </div>
     `;
 
-    fetch('/courts', {
+    const bbox = [
+        Math.max(bounds.getSouth(), -90),
+        Math.max(bounds.getWest(), -180),
+        Math.min(bounds.getNorth(), 90),
+        Math.min(bounds.getEast(), 180)
+    ].join(',');
+
+    fetch(`/courts/clusters?bbox=${bbox}&zoom=${zoom}`, {
         headers: {
             'Accept': 'application/json'
         }
@@ -88,7 +98,7 @@ function fetchNearbyCourts(location) {
             }
             return response.json();
         })
-        .then(courts => {
+        .then(data => {
             // Clear existing markers
             markers.forEach(marker => marker.remove());
             markers = [];
@@ -96,8 +106,37 @@ function fetchNearbyCourts(location) {
             // Clear courts list
             courtsContainer.innerHTML = '';
 
-            if (courts.length === 0) {
-                courtsContainer.innerHTML = `
+            data.clusters.forEach(cluster => {
+                if (cluster.count === 1) {
+                    addCourtMarker(cluster.latitude, cluster.longitude, `
+                        <div class="text-center">
+                            <p class="text-sm font-medium">1 court from $${cluster.min_price}/hour</p>
+                            <p class="text-sm text-gray-600">Zoom in to book</p>
+                        </div>
+                    `);
+                    return;
+                }
+                const marker = L.marker([cluster.latitude, cluster.longitude], {
+                    icon: L.divIcon({
+                        className: 'court-cluster',
+                        html: `<div class="flex items-center justify-center w-10 h-10 rounded-full bg-indigo-600 text-white text-sm font-bold shadow">${cluster.count}</div>`,
+                        iconSize: [40, 40]
+                    })
+                })
+                    .bindTooltip(`${cluster.count} courts from $${cluster.min_price}/hour`)
+                    .on('click', () => map.setView([cluster.latitude, cluster.longitude], map.getZoom() + 2))
+                    .addTo(map);
+                markers.push(marker);
+            });
+
+            if (data.courts.length === 0) {
+                const total = data.clusters.reduce((sum, cluster) => sum + cluster.count, 0);
+                courtsContainer.innerHTML = total > 0 ? `
+                    <div class="text-center text-gray-500 py-4">
+                        <i class="fas fa-search-plus text-4xl mb-2"></i>
+                        <p>${total} courts in this area. Zoom in to see them.</p>
+                    </div>
+                ` : `
                     <div class="text-center text-gray-500 py-4">
                         <i class="fas fa-tennis-ball text-4xl mb-2"></i>
                         <p>No courts found in this area.</p>
@@ -106,24 +145,22 @@ function fetchNearbyCourts(location) {
                 return;
             }
 
-            courts.forEach(court => {
+            let courtsHtml = '';
+            data.courts.forEach(court => {
                 // Add marker to map
-                const marker = L.marker([court.latitude, court.longitude])
-                    .bindPopup(`
-                        <div class="text-center">
-                            <h3 class="font-medium">${escapeHtml(court.name)}</h3>
-                            <p class="text-sm text-gray-600">${escapeHtml(court.address)}</p>
-                            <p class="text-sm font-medium mt-2">$${court.price_per_hour}/hour</p>
-                            <a href="/book/${court.id}" class="inline-block mt-2 px-4 py-2 bg-indigo-600 text-white text-sm font-medium rounded hover:bg-indigo-700">
-                                Book Court
-                            </a>
-                        </div>
-                    `)
-                    .addTo(map);
-                markers.push(marker);
+                addCourtMarker(court.latitude, court.longitude, `
+                    <div class="text-center">
+                        <h3 class="font-medium">${escapeHtml(court.name)}</h3>
+                        <p class="text-sm text-gray-600">${escapeHtml(court.address)}</p>
+                        <p class="text-sm font-medium mt-2">$${court.price_per_hour}/hour</p>
+                        <a href="/book/${court.id}" class="inline-block mt-2 px-4 py-2 bg-indigo-600 text-white text-sm font-medium rounded hover:bg-indigo-700">
+                            Book Court
+                        </a>
+                    </div>
+                `);
 
                 // Add court to list
-                courtsContainer.innerHTML += `
+                courtsHtml += `
                     <div class="court-item border-b border-gray-200 pb-4 last:border-b-0 last:pb-0">
                         <div class="flex justify-between items-start">
                             <div>
@@ -139,12 +176,7 @@ function fetchNearbyCourts(location) {
                     </div>
                 `;
             });
-
-            // Fit map bounds to show all markers
-            if (markers.length > 0) {
-                const group = new L.featureGroup(markers);
-                map.fitBounds(group.getBounds().pad(0.1));
-            }
+            courtsContainer.innerHTML = courtsHtml;
         })
         .catch(error => {
             console.error('Error fetching courts:', error);
@@ -152,6 +184,14 @@ function fetchNearbyCourts(location) {
         });
 }
 
+// Add a single court marker with a popup
+function addCourtMarker(latitude, longitude, popupHtml) {
+    const marker = L.marker([latitude, longitude])
+        .bindPopup(popupHtml)
+        .addTo(map);
+    markers.push(marker);
+}
+
 // Show error message
 function showError(message) {
     const courtsContainer = document.getElementById('courts-container');
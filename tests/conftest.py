@@ -0,0 +1,72 @@
+import pytest
+from app import create_app
+from models.models import db, TennisCourt, User
+import services.catalog_cache as catalog_cache
+import services.user_cache as user_cache
+from services.catalog_snapshot import reset_catalog_snapshot
+from services.court_calendar import get_calendar_index
+from services.geocoding import set_geocoder
+from services.jobs import reset_job_queue
+from services.matchmaking import reset_player_index
+from services.opening_hours import reset_opening_hours
+
+def _reset_process_state(monkeypatch):
+    """Drop every process-wide cache and singleton so each test starts from its own database."""
+    monkeypatch.setattr(catalog_cache, '_known_version', None)
+    monkeypatch.setattr(catalog_cache, '_response_cache', None)
+    monkeypatch.setattr(user_cache, '_user_cache', None)
+    catalog_cache.reload_catalog_caches()
+    reset_catalog_snapshot()
+    get_calendar_index().reset()
+    reset_opening_hours()
+    reset_job_queue()
+    reset_player_index()
+    set_geocoder(None)
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    _reset_process_state(monkeypatch)
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'METRICS_ENABLED': False,
+        'PASSWORD_HASH_WORKERS': 0,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'JOB_QUEUE_BACKEND': 'memory',
+        'JOB_WORKER_THREADS': 0,
+        'GEOCODE_CACHE_PATH': None,
+        'CATALOG_SNAPSHOT_DIR': str(tmp_path / 'snapshots'),
+        'RESPONSE_CACHE_DIR': None,
+        'USER_CACHE_DIR': None
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+    reset_job_queue()
+    _reset_process_state(monkeypatch)
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def court(app):
+    court = TennisCourt(name='Central Court', address='1 Main Street', latitude=40.7128,
+                        longitude=-74.006, price_per_hour=30.0)
+    db.session.add(court)
+    db.session.commit()
+    return court
+
+@pytest.fixture
+def user(app):
+    user = User(username='player', email='player@example.com')
+    user.set_password('secret-password')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def logged_in(client, user):
+    client.post('/login', data={'email': 'player@example.com', 'password': 'secret-password'})
+    return client
@@ -0,0 +1,42 @@
+from datetime import date, datetime, timedelta
+from models.models import db, Booking
+from services.availability import find_free_slots, start_mask
+from services.court_calendar import bump_calendar_versions
+
+def test_start_mask_keeps_starts_with_enough_free_slots():
+    free = 0b0111101
+    assert start_mask(free, 15) == free
+    assert start_mask(free, 30) == 0b0011100
+    assert start_mask(free, 60) == 0b0000100
+    assert start_mask(free, 75) == 0
+
+def test_free_slots_skip_reservations(court, user):
+    day = date.today() + timedelta(days=2)
+    db.session.add(Booking(user_id=user.id, tennis_court_id=court.id, duration=90, status='confirmed',
+                           booking_time=datetime.combine(day, datetime.min.time()).replace(hour=10)))
+    db.session.commit()
+
+    slots = find_free_slots([court.id], day, 1, 60)[court.id][day.isoformat()]
+
+    assert slots[0] == '06:00'
+    assert slots[-1] == '21:00'
+    assert '09:00' in slots and '11:30' in slots
+    assert not {'09:15', '10:00', '11:00', '11:15'} & set(slots)
+
+def test_free_slots_see_reservations_from_other_workers(court, user):
+    day = date.today() + timedelta(days=2)
+    start = datetime.combine(day, datetime.min.time()).replace(hour=18)
+    assert '18:00' in find_free_slots([court.id], day, 1, 60)[court.id][day.isoformat()]
+
+    with db.engine.begin() as connection:
+        connection.execute(Booking.__table__.insert().values(
+            user_id=user.id, tennis_court_id=court.id, booking_time=start, duration=60,
+            end_time=start + timedelta(hours=1), status='confirmed'
+        ))
+        bump_calendar_versions(connection, [court.id])
+
+    assert '18:00' not in find_free_slots([court.id], day, 1, 60)[court.id][day.isoformat()]
+
+def test_free_slots_endpoint_reports_unknown_court(client, court):
+    response = client.get(f'/courts/{court.id + 1}/slots')
+    assert response.status_code == 404
@@ -0,0 +1,81 @@
+import pytest
+import services.catalog_cache as catalog_cache
+from models.models import db, TennisCourt
+from services.catalog_cache import bump_catalog_version, current_catalog_version
+
+@pytest.fixture
+def reloads(monkeypatch):
+    calls = []
+    monkeypatch.setattr(catalog_cache, '_catalog_listeners', [lambda: calls.append(1)])
+    return calls
+
+def _add_court(name):
+    db.session.add(TennisCourt(name=name, address=f'{name} Road', latitude=51.5, longitude=-0.1,
+                               price_per_hour=20.0))
+    db.session.commit()
+
+def test_local_commit_adopts_next_version(court, reloads):
+    version = current_catalog_version()
+    _add_court('North Court')
+
+    assert catalog_cache._known_version == version + 1
+    assert current_catalog_version() == version + 1
+    assert reloads == []
+
+def test_several_flushes_in_one_transaction_are_adopted(court, reloads):
+    version = current_catalog_version()
+    db.session.add(TennisCourt(name='East Court', address='East Road', latitude=51.5, longitude=-0.1,
+                               price_per_hour=20.0))
+    db.session.flush()
+    db.session.add(TennisCourt(name='West Court', address='West Road', latitude=51.5, longitude=-0.1,
+                               price_per_hour=20.0))
+    db.session.commit()
+
+    assert catalog_cache._known_version == version + 2
+    assert reloads == []
+
+def test_local_commit_after_external_change_reloads(court, reloads):
+    version = current_catalog_version()
+    with db.engine.begin() as connection:
+        bump_catalog_version(connection)
+    _add_court('South Court')
+
+    assert catalog_cache._known_version == version + 2
+    assert reloads == [1]
+
+def test_external_change_is_detected_on_read(court, reloads):
+    version = current_catalog_version()
+    with db.engine.begin() as connection:
+        bump_catalog_version(connection)
+
+    assert current_catalog_version() == version + 1
+    assert reloads == [1]
+
+def test_location_queries_stay_out_of_the_shared_cache(app, client, court, tmp_path):
+    directory = tmp_path / 'responses'
+    app.config['RESPONSE_CACHE_DIR'] = str(directory)
+
+    def cached_files():
+        return [path for path in directory.rglob('*') if path.is_file()] if directory.exists() else []
+
+    assert client.get('/courts?lat=40.71281&lng=-74.00601').status_code == 200
+    assert client.get('/courts?bbox=40,-75,41,-73').status_code == 200
+    assert cached_files() == []
+
+    response = client.get('/courts')
+    assert response.status_code == 200
+    assert len(cached_files()) == 1
+    assert client.get('/courts', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+def test_lagging_worker_keeps_newer_shared_responses(tmp_path):
+    directory = str(tmp_path / 'responses')
+    current = catalog_cache.CatalogResponseCache(directory=directory)
+    lagging = catalog_cache.CatalogResponseCache(directory=directory)
+
+    current.get_or_build(3, 'all', lambda: ['v3'])
+    lagging.get_or_build(2, 'all', lambda: ['v2'])
+    assert current.shared.get('catalog3', 'all') == b'["v3"]'
+
+    current.get_or_build(4, 'all', lambda: ['v4'])
+    assert current.shared.get('catalog2', 'all') is None
+    assert current.shared.get('catalog3', 'all') is None
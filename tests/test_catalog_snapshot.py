@@ -0,0 +1,33 @@
+import random
+from services.catalog_snapshot import CatalogSnapshot, _in_bbox, encode_snapshot, get_catalog_snapshot
+
+def _rows(count):
+    generator = random.Random(7)
+    return [(court_id, f'Court {court_id}', f'{court_id} Road', generator.uniform(-60, 60),
+             generator.uniform(-180, 180), 20.0) for court_id in generator.sample(range(1, 10 * count), count)]
+
+def test_bbox_select_matches_a_full_scan():
+    rows = _rows(2000)
+    snapshot = CatalogSnapshot(encode_snapshot(3, rows))
+    in_id_order = sorted(rows)
+    for bbox in ((10, 20, 30, 60), (-5, 170, 5, -170), (59, -180, 61, 180), (70, 0, 80, 10)):
+        expected = [row[0] for row in in_id_order if _in_bbox(row[3], row[4], bbox)]
+        assert [court['id'] for court in snapshot.select(bbox)] == expected
+
+        after = expected[len(expected) // 2] if expected else None
+        page = [court['id'] for court in snapshot.select(bbox, after=after, limit=5)]
+        assert page == [court_id for court_id in expected if after is None or court_id > after][:5]
+
+def test_get_and_select_without_bbox():
+    rows = _rows(50)
+    snapshot = CatalogSnapshot(encode_snapshot(1, rows))
+    first = min(rows)
+    assert snapshot.version == 1 and len(snapshot) == 50
+    assert snapshot.get(first[0]) == {'id': first[0], 'name': first[1], 'address': first[2],
+                                      'latitude': first[3], 'longitude': first[4], 'price_per_hour': 20.0}
+    assert [court['id'] for court in snapshot.select(after=first[0], limit=3)] == [row[0] for row in sorted(rows)[1:4]]
+
+def test_snapshot_is_written_and_attached_for_the_catalog(court):
+    snapshot = get_catalog_snapshot()
+    assert [c['name'] for c in snapshot.select((40, -75, 41, -73))] == ['Central Court']
+    assert get_catalog_snapshot() is snapshot
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from models.models import db, Booking
+from services.court_calendar import CourtCalendar, bump_calendar_versions, get_calendar_index
+
+DAY = datetime(2030, 6, 3)
+
+def at(hour, minute=0):
+    return DAY.replace(hour=hour, minute=minute)
+
+def test_overlapping_sees_long_reservation_behind_shorter_one():
+    calendar = CourtCalendar()
+    calendar.add('booking', 1, at(9), at(12))
+    calendar.add('booking', 2, at(10), at(10, 30))
+
+    assert calendar.overlapping(at(11), at(11, 30)) == ('booking', 1)
+    assert calendar.overlapping(at(12), at(13)) is None
+    assert calendar.overlapping(at(8), at(9)) is None
+
+def test_between_lists_every_reservation_running_in_the_window():
+    calendar = CourtCalendar()
+    calendar.add('booking', 1, at(9), at(12))
+    calendar.add('booking', 2, at(10), at(10, 30))
+    calendar.add('match', 3, at(11), at(13))
+
+    assert [entry[3] for entry in calendar.between(at(11), at(11, 30))] == [1, 3]
+    assert [entry[3] for entry in calendar.between(at(10, 30), at(11))] == [1]
+
+def test_remove_and_replace():
+    calendar = CourtCalendar()
+    calendar.add('booking', 1, at(9), at(12))
+    calendar.add('booking', 1, at(14), at(15))
+
+    assert calendar.overlapping(at(10), at(11)) is None
+    assert calendar.overlapping(at(14, 30), at(16)) == ('booking', 1)
+    calendar.remove('booking', 1)
+    assert len(calendar) == 0
+
+def test_local_commit_is_applied_without_reload(court, user):
+    start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    index = get_calendar_index()
+    assert not index.has_conflict(court.id, start, start + timedelta(hours=1))
+
+    db.session.add(Booking(user_id=user.id, tennis_court_id=court.id, booking_time=start,
+                           duration=60, status='confirmed'))
+    db.session.commit()
+
+    calendar = index.calendar(court.id)
+    assert index.has_conflict(court.id, start, start + timedelta(hours=1))
+    assert index.calendar(court.id) is calendar
+
+def test_change_from_another_process_reloads_calendar(court, user):
+    start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    index = get_calendar_index()
+    assert not index.has_conflict(court.id, start, start + timedelta(hours=1))
+
+    # Another worker commits a booking: no commit hook runs here, only the version moves
+    with db.engine.begin() as connection:
+        connection.execute(Booking.__table__.insert().values(
+            user_id=user.id, tennis_court_id=court.id, booking_time=start, duration=60,
+            end_time=start + timedelta(hours=1), status='confirmed'
+        ))
+        bump_calendar_versions(connection, [court.id])
+
+    assert index.has_conflict(court.id, start, start + timedelta(minutes=30))
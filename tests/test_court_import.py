@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from models.models import db, TennisCourt
+from services.catalog_cache import current_catalog_version
+from services.court_import import import_courts
+
+FEED = """name,address,latitude,longitude,price_per_hour
+Central Court,1 Main Street,40.7128,-74.006,35
+River Court,2 River Road,40.72,-74.01,20
+River Court,2 River Road,40.72,-74.01,22
+Bad Court,3 Nowhere,200,0,10
+"""
+
+def test_import_upserts_on_name_and_address(court, tmp_path):
+    path = tmp_path / 'courts.csv'
+    path.write_text(FEED)
+    version = current_catalog_version()
+
+    stats = import_courts(str(path))
+
+    assert (stats.read, stats.inserted, stats.updated, stats.rejected) == (4, 1, 1, 1)
+    prices = dict(db.session.query(TennisCourt.name, TennisCourt.price_per_hour).all())
+    assert prices == {'Central Court': 35.0, 'River Court': 22.0}
+    assert current_catalog_version() == version + 1
+
+    stats = import_courts(str(path))
+    assert (stats.inserted, stats.updated) == (0, 2)
+    assert TennisCourt.query.count() == 2
+
+def test_name_and_address_are_unique(court):
+    db.session.add(TennisCourt(name=court.name, address=court.address, latitude=0, longitude=0,
+                               price_per_hour=1.0))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
@@ -0,0 +1,64 @@
+import time
+from services.geocoding import (GeocodeStore, Geocoder, GeocodingBackend, OfflineGeocodingBackend, get_geocoder,
+                                normalize_address)
+
+class CountingBackend(OfflineGeocodingBackend):
+    """Offline table that asks to be persisted, standing in for a real provider."""
+    name = 'counting'
+    persistent = True
+
+def test_normalize_address():
+    assert normalize_address('  1 Main St.,  Springfield ') == normalize_address('1 main st , springfield')
+
+def test_batch_is_deduplicated_and_cached_in_process():
+    backend = CountingBackend({'1 Main St': (1.0, 2.0)})
+    geocoder = Geocoder(backend, max_workers=2)
+
+    results = geocoder.geocode_many(['1 Main St', '1 main st.', 'Nowhere'])
+    assert results == {'1 Main St': {'lat': 1.0, 'lng': 2.0}, '1 main st.': {'lat': 1.0, 'lng': 2.0},
+                       'Nowhere': None}
+    assert backend.calls == 2
+
+    geocoder.geocode_many(['1 Main St', 'Nowhere'])
+    assert backend.calls == 2
+
+def test_store_serves_other_processes_and_expires_misses(tmp_path):
+    path = str(tmp_path / 'geocode.db')
+    first = Geocoder(CountingBackend({'1 Main St': (1.0, 2.0)}), GeocodeStore(path, 'counting', 60))
+    first.geocode_many(['1 Main St', 'Nowhere'])
+
+    backend = CountingBackend({'1 Main St': (1.0, 2.0), 'Nowhere': (3.0, 4.0)})
+    second = Geocoder(backend, GeocodeStore(path, 'counting', 60))
+    assert second.geocode_many(['1 Main St', 'Nowhere']) == {'1 Main St': {'lat': 1.0, 'lng': 2.0},
+                                                             'Nowhere': None}
+    assert backend.calls == 0
+
+    # Once the miss is older than its TTL the provider is asked again
+    expired = Geocoder(backend, GeocodeStore(path, 'counting', 0))
+    time.sleep(0.01)
+    assert expired.geocode('Nowhere') == {'lat': 3.0, 'lng': 4.0}
+    assert backend.calls == 1
+
+def test_store_is_keyed_by_backend(tmp_path):
+    path = str(tmp_path / 'geocode.db')
+    GeocodeStore(path, 'one').set_many({'1 main st': {'lat': 1.0, 'lng': 2.0}})
+    assert GeocodeStore(path, 'one').get_many(['1 main st']) == {'1 main st': {'lat': 1.0, 'lng': 2.0}}
+    assert GeocodeStore(path, 'other').get_many(['1 main st']) == {}
+
+def test_provider_errors_are_not_cached():
+    class Failing(GeocodingBackend):
+        calls = 0
+
+        def geocode(self, address, session):
+            self.calls += 1
+            raise RuntimeError('quota')
+
+    backend = Failing()
+    geocoder = Geocoder(backend)
+    assert geocoder.geocode('1 Main St') is None
+    assert geocoder.geocode('1 Main St') is None
+    assert backend.calls == 2
+
+def test_offline_backend_is_never_persisted(app, tmp_path):
+    app.config.update(GEOCODER_BACKEND='offline', GEOCODE_CACHE_PATH=str(tmp_path / 'geocode.db'))
+    assert get_geocoder().store is None
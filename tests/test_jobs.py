@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+import pytest
+from models.models import db, Booking, Job, TennisCourt
+from services.jobs import (DatabaseJobQueue, JobWorker, MemoryJobQueue, enqueue_on_commit, get_job_queue,
+                           job, reset_job_queue)
+
+calls = []
+
+@job('test_flaky')
+def _flaky(payload):
+    calls.append(payload)
+    if payload.get('fail'):
+        raise RuntimeError('boom')
+
+@pytest.fixture(params=['memory', 'database'])
+def queue(request, app):
+    calls.clear()
+    if request.param == 'memory':
+        return MemoryJobQueue(max_attempts=2, backoff=0.0, backoff_cap=0.0)
+    return DatabaseJobQueue(max_attempts=2, backoff=0.0, backoff_cap=0.0)
+
+def test_claimed_job_is_not_claimed_again(queue):
+    queue.enqueue('test_flaky', {'n': 1})
+    first = queue.claim('a', 10)
+    assert [claimed.payload for claimed in first] == [{'n': 1}]
+    assert queue.claim('b', 10) == []
+
+    queue.complete(first)
+    assert queue.depth() == {}
+
+def test_failed_job_is_retried_then_kept_as_failed(app, queue):
+    queue.enqueue('test_flaky', {'fail': True})
+    worker = JobWorker(app, queue, threads=0, failed_retention=timedelta(days=1))
+
+    assert worker.run_pending() == 2
+    assert len(calls) == 2
+    assert queue.depth() == {('test_flaky', 'failed'): 1}
+
+    assert worker.sweep(force=True) == 0
+    assert queue.purge_failed(datetime.utcnow() + timedelta(seconds=1)) == 1
+    assert queue.depth() == {}
+
+def test_delayed_job_waits(queue):
+    queue.enqueue('test_flaky', {}, delay=60)
+    assert queue.claim('a', 10) == []
+    assert queue.depth() == {('test_flaky', 'pending'): 1}
+
+def test_database_enqueue_leaves_the_session_alone(app):
+    db.session.add(TennisCourt(name='Pending Court', address='Nowhere', latitude=0, longitude=0,
+                               price_per_hour=1.0))
+    DatabaseJobQueue().enqueue('test_flaky', {})
+    db.session.rollback()
+
+    assert Job.query.count() == 1
+    assert TennisCourt.query.count() == 0
+
+@pytest.mark.parametrize('backend', ['memory', 'database'])
+def test_staged_job_is_queued_only_with_its_transaction(app, backend):
+    app.config['JOB_QUEUE_BACKEND'] = backend
+    reset_job_queue()
+
+    enqueue_on_commit('test_flaky', {'n': 1})
+    db.session.rollback()
+    assert get_job_queue().depth() == {}
+
+    enqueue_on_commit('test_flaky', {'n': 2})
+    db.session.commit()
+    assert get_job_queue().depth() == {('test_flaky', 'pending'): 1}
+
+def test_booking_commits_its_confirmation_job(app, logged_in, court):
+    app.config['JOB_QUEUE_BACKEND'] = 'database'
+    reset_job_queue()
+    start = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    response = logged_in.post(f'/book/{court.id}', data={'booking_time': start.strftime('%Y-%m-%d %H:%M'),
+                                                         'duration': 60})
+
+    assert response.status_code == 302
+    booking = Booking.query.one()
+    assert [(row.kind, row.payload) for row in Job.query.all()] == [
+        ('booking_confirmation', f'{{"booking_id": {booking.id}}}')
+    ]
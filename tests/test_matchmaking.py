@@ -0,0 +1,72 @@
+import threading
+from datetime import datetime, timedelta
+import services.matchmaking as matchmaking
+from models.models import db, Booking, PlayerAvailability, TennisCourt, User
+from services.matchmaking import find_opponents, get_player_index
+
+def _player(name, latitude, longitude, weekday):
+    player = User(username=name, email=f'{name}@example.com', home_latitude=latitude, home_longitude=longitude)
+    player.set_password('secret')
+    db.session.add(player)
+    db.session.flush()
+    db.session.add(PlayerAvailability(user_id=player.id, weekday=weekday, start_minute=10 * 60, end_minute=14 * 60))
+    return player
+
+def test_suggested_time_skips_the_opponents_reservations(court):
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=2)
+    me = _player('me', 40.713, -74.006, day.weekday())
+    opponent = _player('opponent', 40.714, -74.007, day.weekday())
+    # The opponent plays at a court out of range at 10:00, which leaves the nearby court free then
+    elsewhere = TennisCourt(name='Far Court', address='1 Far Road', latitude=41.5, longitude=-74.0,
+                            price_per_hour=10.0)
+    db.session.add(elsewhere)
+    db.session.flush()
+    db.session.add(Booking(user_id=opponent.id, tennis_court_id=elsewhere.id, booking_time=day.replace(hour=10),
+                           duration=60, status='confirmed'))
+    db.session.commit()
+
+    suggestions = find_opponents(me.id, day, day + timedelta(days=1), duration=60)
+
+    assert [suggestion['user']['id'] for suggestion in suggestions] == [opponent.id]
+    assert suggestions[0]['start'] == day.replace(hour=11).isoformat()
+
+def test_expired_index_is_rebuilt_in_the_background(app, court):
+    _player('me', 40.713, -74.006, 0)
+    db.session.commit()
+    app.config['MATCHMAKING_INDEX_TTL'] = 0
+    index = get_player_index()
+
+    _player('late', 40.713, -74.006, 1)
+    db.session.commit()
+    assert get_player_index() is index
+
+    for thread in threading.enumerate():
+        if thread.name == 'player-index':
+            thread.join(5)
+    rebuilt = matchmaking._player_index
+    assert rebuilt is not index
+    assert len(rebuilt) == 2
+
+def test_court_deleted_elsewhere_is_skipped(court, monkeypatch):
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=2)
+    me = _player('me', 40.713, -74.006, day.weekday())
+    opponent = _player('opponent', 40.714, -74.007, day.weekday())
+    gone = TennisCourt(name='Gone Court', address='2 Main Street', latitude=40.7135, longitude=-74.0065,
+                       price_per_hour=10.0)
+    db.session.add(gone)
+    db.session.commit()
+    gone_id = gone.id
+    find_free_slots = matchmaking.find_free_slots
+
+    def free_slots_then_delete(*args, **kwargs):
+        slots = find_free_slots(*args, **kwargs)
+        # Another worker deletes the court while this request is running
+        with db.engine.begin() as connection:
+            connection.execute(TennisCourt.__table__.delete().where(TennisCourt.id == gone_id))
+        return slots
+
+    monkeypatch.setattr(matchmaking, 'find_free_slots', free_slots_then_delete)
+    suggestions = find_opponents(me.id, day, day + timedelta(days=1), duration=60)
+
+    assert suggestions[0]['user']['id'] == opponent.id
+    assert suggestions[0]['court']['id'] == court.id
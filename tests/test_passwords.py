@@ -0,0 +1,20 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from services.passwords import PasswordHasher
+
+@pytest.mark.parametrize('method', ['pbkdf2:sha256:1000', 'pbkdf2', 'scrypt'])
+def test_hash_made_with_the_configured_method_needs_no_rehash(method):
+    hasher = PasswordHasher(method, workers=0)
+    assert not hasher.needs_rehash(hasher.hash('secret'))
+    # Also right before this hasher has made any hash of its own
+    assert not PasswordHasher(method, workers=0).needs_rehash(generate_password_hash('secret', method))
+
+def test_hash_with_other_method_or_cost_needs_rehash():
+    hasher = PasswordHasher('pbkdf2:sha256:2000', workers=0)
+    assert hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:1000'))
+    assert hasher.needs_rehash(generate_password_hash('secret', 'scrypt'))
+    assert not hasher.needs_rehash('')
+
+def test_verify(user):
+    assert user.check_password('secret-password')
+    assert not user.check_password('wrong')
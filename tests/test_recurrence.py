@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+import pytest
+from services.recurrence import RecurrenceRule
+
+# A Wednesday
+FIRST = datetime(2030, 1, 2, 18, 0)
+
+def test_weekly_byday_counts_the_first_occurrence():
+    rule = RecurrenceRule.parse('FREQ=WEEKLY;BYDAY=MO,WE;COUNT=4')
+    assert rule.occurrences(FIRST, 100) == [
+        FIRST, datetime(2030, 1, 7, 18), datetime(2030, 1, 9, 18), datetime(2030, 1, 14, 18)
+    ]
+
+def test_weekly_interval_until_is_inclusive():
+    rule = RecurrenceRule.parse('RRULE:FREQ=WEEKLY;INTERVAL=2;UNTIL=20300130')
+    assert rule.occurrences(FIRST, 100) == [FIRST, datetime(2030, 1, 16, 18), datetime(2030, 1, 30, 18)]
+
+def test_daily_byday_filters_weekdays():
+    rule = RecurrenceRule.parse('FREQ=DAILY;BYDAY=SA,SU;COUNT=3')
+    assert rule.occurrences(FIRST, 100) == [FIRST, datetime(2030, 1, 5, 18), datetime(2030, 1, 6, 18)]
+
+def test_daily_byday_that_can_never_match_is_rejected():
+    # Every 7 days from a Tuesday never reaches a Monday
+    rule = RecurrenceRule.parse('FREQ=DAILY;INTERVAL=7;BYDAY=MO;COUNT=3')
+    with pytest.raises(ValueError):
+        rule.occurrences(FIRST - timedelta(days=1), 100)
+
+def test_daily_byday_with_until_stops_at_until():
+    rule = RecurrenceRule.parse('FREQ=DAILY;INTERVAL=2;BYDAY=FR;UNTIL=20300120')
+    assert rule.occurrences(FIRST, 100) == [FIRST, datetime(2030, 1, 4, 18), datetime(2030, 1, 18, 18)]
+
+def test_limit_is_enforced():
+    with pytest.raises(ValueError):
+        RecurrenceRule.parse('FREQ=DAILY;COUNT=1000').occurrences(FIRST, 50)
+
+@pytest.mark.parametrize('rule', [
+    'FREQ=MONTHLY;COUNT=2', 'FREQ=DAILY', 'FREQ=DAILY;COUNT=2;UNTIL=20300101',
+    'FREQ=DAILY;COUNT=2;BYHOUR=3', 'FREQ=WEEKLY;BYDAY=XX;COUNT=1', 'FREQ', 'FREQ=DAILY;INTERVAL=0;COUNT=1', 5, ['FREQ=DAILY']
+])
+def test_invalid_rules_are_rejected(rule):
+    with pytest.raises(ValueError):
+        RecurrenceRule.parse(rule)
+
+def test_unmatchable_rule_is_a_bad_request(logged_in, court):
+    start = datetime.now().replace(hour=18, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    if start.weekday() == 0:
+        start += timedelta(days=1)
+    response = logged_in.post('/book/recurring', json={
+        'courts': [court.id], 'start': start.isoformat(), 'duration': 60,
+        'rule': 'FREQ=DAILY;INTERVAL=7;BYDAY=MO;COUNT=3'
+    })
+    assert response.status_code == 400
+
+def test_rule_past_the_last_date_is_a_bad_request(logged_in, court):
+    start = datetime.now().replace(hour=18, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    response = logged_in.post('/book/recurring', json={
+        'courts': [court.id], 'start': start.isoformat(), 'duration': 60,
+        'rule': 'FREQ=WEEKLY;INTERVAL=500000;COUNT=3'
+    })
+    assert response.status_code == 400
+
+def test_rule_that_is_not_a_string_is_a_bad_request(logged_in, court):
+    start = datetime.now().replace(hour=18, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    response = logged_in.post('/book/recurring', json={
+        'courts': [court.id], 'start': start.isoformat(), 'duration': 60, 'rule': 5
+    })
+    assert response.status_code == 400
@@ -0,0 +1,28 @@
+from models.models import db
+
+def test_utilization_report_requires_admin(app, logged_in, user):
+    response = logged_in.get('/reports/utilization')
+    assert response.status_code == 302
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['set-admin', user.email])
+    assert 'Granted' in result.output
+    assert db.session.get(type(user), user.id).is_admin
+
+    response = logged_in.get('/reports/utilization')
+    assert response.status_code == 200
+    assert 'from' in response.get_json()
+
+def test_utilization_report_requires_login(client):
+    assert client.get('/reports/utilization').status_code == 302
+
+def test_revoked_admin_loses_access_while_snapshot_is_cached(app, logged_in, user):
+    runner = app.test_cli_runner()
+    runner.invoke(args=['set-admin', user.email])
+    assert logged_in.get('/reports/utilization').status_code == 200
+
+    # The CLI runs in its own process in production, so no cache in the web workers hears of it
+    with db.engine.begin() as connection:
+        connection.execute(type(user).__table__.update().values(is_admin=False))
+
+    assert logged_in.get('/reports/utilization').status_code == 302
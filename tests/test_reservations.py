@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import func, select
+from models.models import db, Booking, CourtSlot
+from services.reservations import SlotTaken, backfill_court_slots, find_conflicts, reservation_slots, reserve
+
+def _legacy_booking(connection, court, user, start, minutes):
+    return connection.execute(Booking.__table__.insert().values(
+        user_id=user.id, tennis_court_id=court.id, booking_time=start, duration=minutes,
+        end_time=start + timedelta(minutes=minutes), status='confirmed'
+    )).inserted_primary_key[0]
+
+def test_backfill_claims_future_reservations_and_skips_overlaps(court, user):
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    with db.engine.begin() as connection:
+        past = _legacy_booking(connection, court, user, start - timedelta(days=3), 60)
+        first = _legacy_booking(connection, court, user, start, 60)
+        overlapping = _legacy_booking(connection, court, user, start + timedelta(minutes=30), 60)
+        later = _legacy_booking(connection, court, user, start + timedelta(hours=2), 30)
+
+    assert backfill_court_slots(batch_size=2) == 6
+
+    claims = dict(db.session.execute(
+        select(CourtSlot.booking_id, func.count()).group_by(CourtSlot.booking_id)
+    ).all())
+    assert claims == {first: 4, later: 2}
+    assert past not in claims and overlapping not in claims
+    # Nothing left to claim on a second run
+    assert backfill_court_slots() == 0
+
+def _next_day_at(hour):
+    return datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+def test_reservation_slots_cover_aligned_reservation():
+    start = datetime(2030, 6, 3, 10)
+    assert reservation_slots(start, start + timedelta(minutes=45)) == [
+        start, start + timedelta(minutes=15), start + timedelta(minutes=30)
+    ]
+
+def test_overlapping_reservation_cannot_claim_slots(court, user):
+    start = _next_day_at(10)
+    reserve(Booking(user_id=user.id, tennis_court_id=court.id, booking_time=start,
+                    duration=60, status='confirmed'))
+
+    with pytest.raises(SlotTaken):
+        reserve(Booking(user_id=user.id, tennis_court_id=court.id, booking_time=start + timedelta(minutes=45),
+                        duration=30, status='confirmed'))
+    assert db.session.scalar(select(func.count()).select_from(CourtSlot)) == 4
+
+    reserve(Booking(user_id=user.id, tennis_court_id=court.id, booking_time=start + timedelta(hours=1),
+                    duration=30, status='confirmed'))
+
+def test_find_conflicts_reports_stored_and_requested_overlaps(court, user):
+    start = _next_day_at(10)
+    reserve(Booking(user_id=user.id, tennis_court_id=court.id, booking_time=start,
+                    duration=60, status='confirmed'))
+    hour = timedelta(hours=1)
+
+    assert find_conflicts([
+        (court.id, start + timedelta(minutes=30), start + hour),
+        (court.id, start + hour, start + 2 * hour),
+        (court.id, start + hour + timedelta(minutes=30), start + 3 * hour),
+    ]) == ['reserved', None, 'overlaps_request']
+
+def test_book_rejects_misaligned_times(logged_in, court):
+    start = _next_day_at(10)
+    for booking_time, duration in ((start + timedelta(minutes=10), 60), (start, 50)):
+        logged_in.post(f'/book/{court.id}', data={'booking_time': booking_time.strftime('%Y-%m-%d %H:%M'),
+                                                  'duration': duration})
+    assert Booking.query.count() == 0
+
+    response = logged_in.post(f'/book/{court.id}', data={'booking_time': start.strftime('%Y-%m-%d %H:%M'),
+                                                         'duration': 45})
+    assert response.status_code == 302
+    assert Booking.query.count() == 1
+
+def test_recurring_booking_rejects_misaligned_start(logged_in, court):
+    start = _next_day_at(10) + timedelta(minutes=5)
+    response = logged_in.post('/book/recurring', json={
+        'courts': [court.id], 'start': start.isoformat(), 'duration': 60, 'rule': 'FREQ=DAILY;COUNT=2'
+    })
+    assert response.status_code == 400
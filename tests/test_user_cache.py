@@ -0,0 +1,17 @@
+import services.user_cache as user_cache
+from models.models import db
+from services.user_cache import UserCache
+
+def test_commit_clears_shared_entry_in_process_without_a_cache(app, user, tmp_path, monkeypatch):
+    # A web worker sharing the directory has cached the user
+    worker = UserCache(ttl=300, directory=str(tmp_path / 'users'))
+    assert worker.load(user.id).email == 'player@example.com'
+    app.config['USER_CACHE_DIR'] = str(tmp_path / 'users')
+
+    # This process (e.g. the CLI) has no user cache yet
+    monkeypatch.setattr(user_cache, '_user_cache', None)
+    user.email = 'renamed@example.com'
+    db.session.commit()
+
+    worker.local.clear()
+    assert worker.load(user.id).email == 'renamed@example.com'
@@ -0,0 +1,204 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with an optional time-to-live.
+
+    Hit and miss counters are kept so callers can report cache effectiveness.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = None):
+        """
+        Initialize an empty cache.
+
+        Args:
+            maxsize (int): Maximum number of entries before the oldest is evicted
+            ttl (Optional[float]): Seconds an entry stays valid, None for no expiry
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a key, marking it as recently used.
+
+        Args:
+            key (Hashable): Cache key
+            default (Any): Value returned on a miss
+
+        Returns:
+            Any: Cached value or default
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key (Hashable): Cache key
+            value (Any): Value to store
+        """
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for a key, computing and storing it on a miss.
+
+        Args:
+            key (Hashable): Cache key
+            factory (Callable[[], Any]): Computes the value on a miss
+
+        Returns:
+            Any: Cached or freshly computed value
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def delete(self, key: Hashable):
+        """Remove a key if it is present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current size."""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+class FileCache:
+    """
+    Byte-string cache stored as files in a directory, shared by every process using it.
+
+    Writes go to a temporary file that is renamed into place, so readers never see
+    partial entries. Keys are grouped by a namespace so stale groups can be pruned.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize the cache, creating the directory if needed.
+
+        Args:
+            directory (str): Directory holding the cache files
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, namespace: str, key: str) -> str:
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{namespace}-{digest}")
+
+    def get(self, namespace: str, key: str, max_age: Optional[float] = None) -> Optional[bytes]:
+        """
+        Read an entry.
+
+        Args:
+            namespace (str): Group the key belongs to
+            key (str): Cache key
+            max_age (Optional[float]): Treat entries written more than this many seconds
+                ago as missing
+
+        Returns:
+            Optional[bytes]: Stored bytes, or None on a miss
+        """
+        path = self._path(namespace, key)
+        try:
+            if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.error(f"Error reading file cache entry: {str(e)}")
+            return None
+
+    def set(self, namespace: str, key: str, value: bytes):
+        """
+        Write an entry atomically.
+
+        Args:
+            namespace (str): Group the key belongs to
+            key (str): Cache key
+            value (bytes): Bytes to store
+        """
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(namespace, key))
+        except OSError as e:
+            logger.error(f"Error writing file cache entry: {str(e)}")
+
+    def delete(self, namespace: str, key: str):
+        """
+        Remove an entry if it exists.
+
+        Args:
+            namespace (str): Group the key belongs to
+            key (str): Cache key
+        """
+        try:
+            os.remove(self._path(namespace, key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Error deleting file cache entry: {str(e)}")
+
+    def prune(self, family: str, keep: Callable[[str], bool]):
+        """
+        Delete the entries of a family of namespaces, except those of the namespaces kept.
+
+        Args:
+            family (str): Only namespaces starting with this prefix are pruned
+            keep (Callable[[str], bool]): Called with a namespace, True to keep its entries
+        """
+        for name in os.listdir(self.directory):
+            if name.startswith('.tmp-') or not name.startswith(family):
+                continue
+            namespace = name.rsplit('-', 1)[0]
+            if keep(namespace):
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
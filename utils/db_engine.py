@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterable, MutableMapping
+import logging
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+logger = logging.getLogger(__name__)
+
+# Bind key of the optional read replica
+REPLICA_BIND = 'replica'
+
+def _is_memory_sqlite(uri: str) -> bool:
+    url = make_url(uri)
+    return (url.get_backend_name() == 'sqlite' and
+            (url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'))
+
+def engine_options(uri: str, config: MutableMapping[str, Any]) -> Dict[str, Any]:
+    """
+    Build create_engine options for a database URL from the pool settings.
+
+    In-memory SQLite databases live in a single connection, so they get no pool settings.
+
+    Args:
+        uri (str): Database URL
+        config (MutableMapping): App config with the DB_POOL_* settings
+
+    Returns:
+        Dict[str, Any]: Keyword arguments for create_engine
+    """
+    if _is_memory_sqlite(uri):
+        return {}
+    return {
+        'pool_size': config.get('DB_POOL_SIZE', 10),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)
+    }
+
+def configure_engines(config: MutableMapping[str, Any]):
+    """
+    Fill in engine options and the read replica bind before Flask-SQLAlchemy is initialized.
+
+    Options already present in SQLALCHEMY_ENGINE_OPTIONS win over the pool settings.
+
+    Args:
+        config (MutableMapping): App config
+    """
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(config['SQLALCHEMY_DATABASE_URI'], config),
+        **config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+    replica = config.get('DATABASE_REPLICA_URL')
+    if replica:
+        config['SQLALCHEMY_BINDS'] = {
+            **config.get('SQLALCHEMY_BINDS', {}),
+            REPLICA_BIND: {'url': replica, **engine_options(replica, config)}
+        }
+
+def install_sqlite_pragmas(engines: Iterable[Engine], config: MutableMapping[str, Any]):
+    """
+    Apply the SQLITE_* pragmas to every new connection of the SQLite engines.
+
+    WAL lets readers proceed while a write is in progress, and the busy timeout makes
+    a writer wait for the lock instead of failing with "database is locked".
+
+    Args:
+        engines (Iterable[Engine]): Engines of the app; non-SQLite engines are skipped
+        config (MutableMapping): App config with the SQLITE_* settings
+    """
+    pragmas = [
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE', 'WAL')),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('busy_timeout', config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        ('cache_size', -int(config.get('SQLITE_CACHE_SIZE_KB', 20000))),
+        ('temp_store', 'MEMORY')
+    ]
+    pragmas = [(name, value) for name, value in pragmas if value not in (None, '')]
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        except Exception as e:
+            logger.error(f"Error applying SQLite pragmas: {str(e)}")
+        finally:
+            cursor.close()
+
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', set_pragmas)
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to the read replica inside replica_reads views.
+
+    Flushes and DML statements always go to the primary, as does everything outside
+    those views or when no replica is configured.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not getattr(clause, 'is_dml', False) and
+                has_app_context() and g.get('replica_reads')):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def replica_reads(view):
+    """
+    Decorator letting a view read from the replica on GET and HEAD requests.
+
+    The replica may lag behind the primary, so only use it for views that can show
+    slightly stale data and never read their own writes.
+    """
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            g.replica_reads = True
+        return view(*args, **kwargs)
+    return decorated_function
+
+@contextmanager
+def primary_reads():
+    """
+    Send the reads inside the block to the primary, even within a replica_reads view.
+
+    Used when loading process-wide indexes that commit hooks keep current afterwards,
+    where anything missing from a lagging replica would stay missing.
+    """
+    if not has_app_context():
+        yield
+        return
+    previous = g.get('replica_reads', False)
+    g.replica_reads = False
+    try:
+        yield
+    finally:
+        g.replica_reads = previous
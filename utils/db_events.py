@@ -0,0 +1,53 @@
+from typing import Callable, Dict, Optional
+import logging
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = 'pending_commit_handlers'
+
+def on_commit(model, handler: Callable[[str, Dict, Optional[Dict]], None]):
+    """
+    Run a handler once for every row of a model that was changed by a committed transaction.
+
+    Rows are captured at flush time so handlers never touch expired ORM instances, and
+    nothing is reported for transactions that are rolled back.
+
+    Args:
+        model: Mapped model class to watch
+        handler (Callable): Called as handler(op, row, old) where op is 'insert', 'update'
+            or 'delete', row is a dict of column values and old holds the previous values
+            of changed columns (updates only)
+    """
+    def record(op):
+        def listener(mapper, connection, target):
+            state = inspect(target)
+            session = state.session
+            if session is None:
+                return
+            row = {attr.key: getattr(target, attr.key) for attr in mapper.column_attrs}
+            old = None
+            if op == 'update':
+                old = {}
+                for attr in mapper.column_attrs:
+                    history = state.attrs[attr.key].history
+                    if history.deleted:
+                        old[attr.key] = history.deleted[0]
+            session.info.setdefault(_PENDING_KEY, []).append((handler, op, row, old))
+        return listener
+
+    for op in ('insert', 'update', 'delete'):
+        event.listen(model, f'after_{op}', record(op))
+
+@event.listens_for(Session, 'after_commit')
+def _run_commit_handlers(session):
+    for handler, op, row, old in session.info.pop(_PENDING_KEY, ()):
+        try:
+            handler(op, row, old)
+        except Exception as e:
+            logger.error(f"Error in commit handler {handler.__name__}: {str(e)}")
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_commit_handlers(session):
+    session.info.pop(_PENDING_KEY, None)
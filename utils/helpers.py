@@ -67,48 +67,56 @@ def calculate_booking_cost(duration_minutes: int, price_per_hour: float) -> floa
 def is_valid_booking_time(booking_time: datetime, 
                          duration_minutes: int,
                          opening_time: str = "06:00",
-                         closing_time: str = "22:00") -> bool:
+                         closing_time: str = "22:00",
+                         hours=None) -> bool:
     """
     Check if a booking time is valid.
     
     Args:
         booking_time (datetime): Proposed booking time
         duration_minutes (int): Duration of booking in minutes
-        opening_time (str): Facility opening time (HH:MM)
-        closing_time (str): Facility closing time (HH:MM)
+        opening_time (str): Facility opening time (HH:MM), used when hours is not given
+        closing_time (str): Facility closing time (HH:MM), used when hours is not given
+        hours (OpeningHours, optional): The court's compiled opening hours
         
     Returns:
         bool: True if booking time is valid
     """
+    from services.opening_hours import OpeningHours
+    
     try:
-        # Convert opening and closing times to datetime objects for today
-        today = datetime.now().date()
-        opening_dt = datetime.combine(today, 
-                                    datetime.strptime(opening_time, "%H:%M").time())
-        closing_dt = datetime.combine(today, 
-                                    datetime.strptime(closing_time, "%H:%M").time())
-        
-        # Calculate booking end time
-        booking_end = booking_time + timedelta(minutes=duration_minutes)
-        
         # Check if booking is in the future
         if booking_time <= datetime.now():
             return False
         
         # Check if booking is within operating hours
-        booking_time_of_day = booking_time.time()
-        booking_end_time_of_day = booking_end.time()
-        
-        if (booking_time_of_day < datetime.strptime(opening_time, "%H:%M").time() or
-            booking_end_time_of_day > datetime.strptime(closing_time, "%H:%M").time()):
-            return False
-            
-        return True
+        if hours is None:
+            hours = OpeningHours.daily(opening_time, closing_time)
+        return hours.is_open(booking_time, duration_minutes)
         
     except Exception as e:
         logger.error(f"Error validating booking time: {str(e)}")
         return False
 
+def is_slot_aligned(start: datetime, duration_minutes: int) -> bool:
+    """
+    Check that a reservation starts and ends on a slot boundary.
+    
+    Reservations claim whole slots, so a misaligned one would block more of the
+    court than it books.
+    
+    Args:
+        start (datetime): Start of the reservation
+        duration_minutes (int): Duration of the reservation in minutes
+        
+    Returns:
+        bool: True if both the start and the duration are whole slots
+    """
+    from services.availability import SLOT_MINUTES
+    
+    return (start.second == 0 and start.microsecond == 0 and start.minute % SLOT_MINUTES == 0
+            and duration_minutes % SLOT_MINUTES == 0)
+
 def format_price(amount: Union[int, float]) -> str:
     """
     Format a price amount with currency symbol.
@@ -128,12 +136,22 @@ def format_price(amount: Union[int, float]) -> str:
 def admin_required(f):
     """
     Decorator to require admin access for a route.
+
+    The flag is read from the primary on every call rather than from the cached
+    user snapshot, so a revoked admin loses access immediately in every worker.
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated or not getattr(current_user, 'is_admin', False):
+        from models.models import db, User
+        from utils.db_engine import primary_reads
+
+        is_admin = False
+        if current_user.is_authenticated:
+            with primary_reads():
+                is_admin = bool(db.session.query(User.is_admin).filter(User.id == current_user.id).scalar())
+        if not is_admin:
             flash('You do not have permission to access this page.', 'error')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -141,7 +159,7 @@ def handle_booking_conflict(booking_time: datetime,
                           court_id: int, 
                           duration_minutes: int) -> bool:
     """
-    Check for booking conflicts.
+    Check for conflicts with the bookings and matches already on a court.
     
     Args:
         booking_time (datetime): Proposed booking time
@@ -151,23 +169,13 @@ def handle_booking_conflict(booking_time: datetime,
     Returns:
         bool: True if there is a conflict
     """
-    from models.models import Booking
+    from services.court_calendar import get_calendar_index
     
     try:
         booking_end = booking_time + timedelta(minutes=duration_minutes)
         
-        # Check for overlapping bookings
-        conflicting_bookings = Booking.query.filter(
-            Booking.tennis_court_id == court_id,
-            Booking.status != 'cancelled',
-            # Check if the new booking overlaps with existing bookings
-            ((Booking.booking_time <= booking_time) & 
-             (Booking.booking_time + timedelta(minutes=Booking.duration) > booking_time)) |
-            ((Booking.booking_time < booking_end) & 
-             (Booking.booking_time + timedelta(minutes=Booking.duration) >= booking_end))
-        ).count()
-        
-        return conflicting_bookings > 0
+        # Bookings and matches on the court are kept in an in-memory interval index
+        return get_calendar_index().has_conflict(court_id, booking_time, booking_end)
         
     except Exception as e:
         logger.error(f"Error checking booking conflicts: {str(e)}")
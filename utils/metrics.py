@@ -0,0 +1,305 @@
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from flask import Flask, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Statements remembered per request for the slow request log
+MAX_RECORDED_STATEMENTS = 200
+
+Labels = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+class Metric:
+    """Named family of samples sharing a set of label names."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[Tuple[str, Labels, Sequence[str], float]]:
+        """Return (sample name, label names, label values, value) tuples."""
+        raise NotImplementedError
+
+class Counter(Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Labels, float] = defaultdict(float)
+
+    def inc(self, labels: Labels = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] += amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self.labelnames, labels, value) for labels, value in self._values.items()]
+
+class Gauge(Counter):
+    """Value per label set that can go up and down."""
+
+    kind = 'gauge'
+
+    def dec(self, labels: Labels = (), amount: float = 1.0):
+        self.inc(labels, -amount)
+
+    def set(self, labels: Labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(Metric):
+    """Observations counted into fixed cumulative buckets, per label set."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: one count per bucket plus +Inf, then the sum
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[position] += 1
+            counts[-1] += value
+
+    def samples(self):
+        names = self.labelnames + ('le',)
+        samples = []
+        with self._lock:
+            for labels, counts in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    samples.append((f'{self.name}_bucket', names, labels + (le,), cumulative))
+                samples.append((f'{self.name}_sum', self.labelnames, labels, counts[-1]))
+                samples.append((f'{self.name}_count', self.labelnames, labels, cumulative))
+        return samples
+
+class MetricsRegistry:
+    """Metric families and cache statistics, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._caches: Dict[str, Callable[[], Optional[Dict[str, int]]]] = {}
+        self._collectors: Dict[str, Callable[[], List[Metric]]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, description, labelnames))
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, description, labelnames))
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, labelnames, buckets))
+
+    def register_cache(self, name: str, stats: Callable[[], Optional[Dict[str, int]]]):
+        """
+        Report a cache's hit rate on every scrape.
+
+        Args:
+            name (str): Value of the `cache` label
+            stats (Callable): Returns a dict with 'hits', 'misses' and 'size', or None
+                while the cache has not been created
+        """
+        self._caches[name] = stats
+
+    def register_collector(self, name: str, collect: Callable[[], List[Metric]]):
+        """
+        Add metrics computed on every scrape, e.g. from a database query.
+
+        Args:
+            name (str): Name used when logging collection errors
+            collect (Callable): Returns freshly built metrics
+        """
+        self._collectors[name] = collect
+
+    def _collected_metrics(self) -> List[Metric]:
+        metrics = []
+        for name, collect in self._collectors.items():
+            try:
+                metrics.extend(collect())
+            except Exception as e:
+                logger.error(f"Error collecting {name} metrics: {str(e)}")
+        return metrics
+
+    def _cache_metrics(self) -> List[Metric]:
+        # Snapshots of counters kept by the caches themselves
+        hits = Gauge('cache_hits_total', 'Cache lookups answered from the cache', ('cache',))
+        misses = Gauge('cache_misses_total', 'Cache lookups that missed', ('cache',))
+        hits.kind = misses.kind = 'counter'
+        entries = Gauge('cache_entries', 'Entries currently cached', ('cache',))
+        for name, stats in self._caches.items():
+            try:
+                values = stats()
+            except Exception as e:
+                logger.error(f"Error reading stats of cache {name}: {str(e)}")
+                continue
+            if values:
+                hits.set((name,), values.get('hits', 0))
+                misses.set((name,), values.get('misses', 0))
+                entries.set((name,), values.get('size', 0))
+        return [hits, misses, entries]
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        lines = []
+        for metric in list(self._metrics.values()) + self._cache_metrics() + self._collected_metrics():
+            lines.append(f'# HELP {metric.name} {metric.description}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for sample_name, names, values, value in metric.samples():
+                value = int(value) if float(value).is_integer() else float(value)
+                lines.append(f'{sample_name}{_format_labels(names, values)} {value}')
+        return '\n'.join(lines) + '\n'
+
+_registry = MetricsRegistry()
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return _registry
+
+REQUESTS = _registry.counter('http_requests_total', 'Requests handled',
+                             ('endpoint', 'method', 'status'))
+REQUEST_LATENCY = _registry.histogram('http_request_duration_seconds', 'Time spent handling requests',
+                                      ('endpoint',))
+IN_FLIGHT = _registry.gauge('http_requests_in_flight', 'Requests currently being handled')
+SLOW_REQUESTS = _registry.counter('http_slow_requests_total', 'Requests slower than the slow request threshold',
+                                  ('endpoint',))
+REQUEST_STATEMENTS = _registry.histogram('db_statements_per_request', 'SQL statements executed per request',
+                                         ('endpoint',), STATEMENT_BUCKETS)
+STATEMENT_TIME = _registry.counter('db_statement_seconds_total', 'Time spent executing SQL statements',
+                                   ('endpoint',))
+
+class _RequestState(threading.local):
+    active = False
+    started = 0.0
+    statements = 0
+    statement_time = 0.0
+    recorded: List[Tuple[float, str]] = []
+
+_state = _RequestState()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _state.active:
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_started')
+    if not _state.active or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    _state.statements += 1
+    _state.statement_time += elapsed
+    if len(_state.recorded) < MAX_RECORDED_STATEMENTS:
+        _state.recorded.append((elapsed, statement))
+
+def _query_breakdown(recorded: List[Tuple[float, str]], top: int) -> str:
+    """Summarize the statements of a request by total time, slowest first."""
+    totals: Dict[str, List[float]] = {}
+    for elapsed, statement in recorded:
+        entry = totals.setdefault(' '.join(statement.split())[:200], [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+    slowest = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    return '; '.join(f'{count}x {total * 1000:.1f} ms: {statement}' for statement, (count, total) in slowest)
+
+def instrument_app(app: Flask):
+    """
+    Record latency, status and SQL statistics of every request handled by an app.
+
+    Requests slower than SLOW_REQUEST_SECONDS are logged with the statements that
+    took the most time. Streamed responses are timed until the response object is
+    returned, not until the body has been sent.
+
+    Args:
+        app (Flask): Application to instrument
+    """
+    slow_threshold = app.config.get('SLOW_REQUEST_SECONDS', 1.0)
+    top_statements = app.config.get('SLOW_REQUEST_TOP_STATEMENTS', 5)
+
+    @app.before_request
+    def _start_request():
+        IN_FLIGHT.inc()
+        _state.active = True
+        _state.started = time.perf_counter()
+        _state.statements = 0
+        _state.statement_time = 0.0
+        _state.recorded = []
+
+    @app.after_request
+    def _record_request(response):
+        if not _state.active:
+            return response
+        elapsed = time.perf_counter() - _state.started
+        endpoint = request.endpoint or 'unmatched'
+        REQUESTS.inc((endpoint, request.method, str(response.status_code)))
+        REQUEST_LATENCY.observe(elapsed, (endpoint,))
+        REQUEST_STATEMENTS.observe(_state.statements, (endpoint,))
+        STATEMENT_TIME.inc((endpoint,), _state.statement_time)
+        if elapsed >= slow_threshold:
+            SLOW_REQUESTS.inc((endpoint,))
+            message = (f"Slow request {request.method} {request.path} ({endpoint}) took "
+                       f"{elapsed * 1000:.0f} ms with {_state.statements} SQL statements in "
+                       f"{_state.statement_time * 1000:.0f} ms")
+            if _state.recorded:
+                message += f": {_query_breakdown(_state.recorded, top_statements)}"
+            logger.warning(message)
+        return response
+
+    @app.teardown_request
+    def _finish_request(exception):
+        if _state.active:
+            _state.active = False
+            _state.recorded = []
+            IN_FLIGHT.dec()